@@ -0,0 +1,234 @@
+"""
+    Synthesis of mutex invariants of STRIPS planning problems, in the style of the monotonicity-based invariant
+    synthesis of Helmert, "Concise finite-domain representations for PDDL planning tasks" (AIJ 2009).
+"""
+import itertools
+from collections import defaultdict, namedtuple
+
+from .. import fstrips as fs
+from ..fstrips.representation import collect_literals_from_conjunction
+from ..grounding.ops import approximate_symbol_fluency
+from ..syntax import Atom, Predicate, Variable, Tautology, symref
+from ..syntax.builtins import BuiltinPredicateSymbol, is_builtin_predicate
+
+
+class InvariantPart(namedtuple('InvariantPart', ['predicate', 'order', 'omitted'])):
+    """ A part of an invariant: the atoms of the given predicate, where the argument at position `order[i]`
+    corresponds to the i-th parameter of the invariant, and the argument at position `omitted`, if not -1, is the
+    "counted" argument, which can take any value. """
+
+    def arguments(self, args):
+        """ Return the values of the invariant parameters for an atom of the part with the given arguments """
+        return tuple(args[i] for i in self.order)
+
+
+class Invariant:
+    """ A (lifted) mutex invariant, i.e. a set of invariant parts with the same number of parameters such that, for
+    every instantiation of the parameters, at most one of the atoms that match the parts with those parameter values
+    is true in any reachable state. """
+    def __init__(self, parts):
+        self.parts = frozenset(parts)
+        self.arity = len(next(iter(self.parts)).order)
+        self.predicates = {part.predicate: part for part in self.parts}
+
+    def ground_groups(self, atoms):
+        """ Return the list of mutex groups that result from instantiating the invariant over the given ground atoms,
+        each of them a pair (predicate, tuple of object names): one list of atoms for each instantiation of the
+        invariant parameters. """
+        groups = defaultdict(list)
+        names = {p.name: part for p, part in self.predicates.items()}
+        for atom in atoms:
+            part = names.get(atom[0])
+            if part is not None:
+                groups[part.arguments(atom[1])].append(atom)
+        return list(groups.values())
+
+    def __eq__(self, other):
+        return isinstance(other, Invariant) and self.parts == other.parts
+
+    def __hash__(self):
+        return hash(self.parts)
+
+    def __str__(self):
+        def part_str(part):
+            args = ['*' if i == part.omitted else f'?{part.order.index(i)}' for i in range(part.predicate.arity)]
+            return '{}({})'.format(part.predicate.name, ', '.join(args))
+        return '{{{}}}'.format(', '.join(sorted(part_str(part) for part in self.parts)))
+
+    __repr__ = __str__
+
+
+class _ActionInfo:
+    """ The information about an action schema that is relevant for the invariant synthesis, with atoms represented
+    as pairs (predicate, tuple of symrefs to the arguments). """
+    def __init__(self, action):
+        self.name = action.name
+        self.adds, self.dels, self.unsafe = [], [], set()
+        self.pre, self.distinct = set(), set()
+
+        literals = set() if isinstance(action.precondition, Tautology) else \
+            collect_literals_from_conjunction(action.precondition) or set()
+        for atom, positive in literals:
+            symbol = atom.predicate.symbol
+            if positive and not is_builtin_predicate(atom.predicate):
+                self.pre.add(_atom(atom))
+            elif symbol == (BuiltinPredicateSymbol.NE if positive else BuiltinPredicateSymbol.EQ):
+                self.distinct.add(frozenset(symref(t) for t in atom.subterms))
+
+        for eff in action.effects:
+            if isinstance(eff, (fs.AddEffect, fs.DelEffect)) and isinstance(eff.condition, Tautology):
+                (self.adds if isinstance(eff, fs.AddEffect) else self.dels).append(_atom(eff.atom))
+            else:  # Conditional and other effects are not analyzed: no invariant can mention their predicates
+                self.unsafe.update(_affected_predicates(eff))
+
+    def unify(self, args1, args2):
+        """ Return a function that maps each argument to the representative of its class under the most general
+        unifier of the two given tuples of arguments, or None if they cannot denote the same objects, either
+        because they contain different constants or because the precondition requires two of them to differ. """
+        representative = dict()
+
+        def find(x):
+            while x in representative:
+                x = representative[x]
+            return x
+
+        for x, y in zip(args1, args2):
+            x, y = find(x), find(y)
+            if x == y:
+                continue
+            if not isinstance(x.expr, Variable) and not isinstance(y.expr, Variable):
+                return None
+            if isinstance(x.expr, Variable):
+                representative[x] = y
+            else:
+                representative[y] = x
+
+        if any(len({find(x) for x in pair}) == 1 for pair in self.distinct):
+            return None
+        return find
+
+    def too_heavy(self, args1, args2, parts):
+        """ Return true iff the action might add two atoms with the given invariant arguments to the same instance
+        of the invariant, i.e. if the arguments can be unified without making the precondition require two atoms of
+        the same instance, which would make the action inapplicable in any state that satisfies the invariant. """
+        find = self.unify(args1, args2)
+        if find is None:
+            return False
+        required = [tuple(find(x) for x in parts[atom[0]].arguments(atom[1])) for atom in self.pre if atom[0] in parts]
+        return len(required) == len(set(required))
+
+
+def _atom(atom):
+    return atom.predicate, tuple(symref(t) for t in atom.subterms)
+
+
+def _affected_predicates(eff):
+    if isinstance(eff, (fs.AddEffect, fs.DelEffect)):
+        return {eff.atom.predicate}
+    if isinstance(eff, fs.LiteralEffect):
+        lit = eff.lit if isinstance(eff.lit, Atom) else eff.lit.subformulas[0]
+        return {lit.predicate}
+    if isinstance(eff, fs.UniversalEffect):
+        return set().union(*(_affected_predicates(sub) for sub in eff.effects))
+    return set()
+
+
+def synthesize_invariants(problem, max_parts=4, max_candidates=10000):
+    """ Return the list of mutex invariants of the given problem found by a monotonicity-based invariant synthesis.
+
+    The initial candidates are all single-part invariants over the fluent predicates of the problem with at most one
+    counted argument. A candidate is proven to be an invariant if, for each action schema, every add effect that
+    matches one of its parts is balanced by a delete effect of an atom of the same invariant instance that is
+    required by the precondition, and no two add effects of the same action can add atoms of the same instance.
+    Candidates that have some unbalanced add effect are refined with new parts built from the delete effects of the
+    offending action, up to `max_parts` parts and a total of `max_candidates` candidates.
+
+    Note that the invariants are proven to hold in all states reachable from any state that satisfies them, but it is
+    not checked that they hold in the initial state; this is done when they are instantiated into mutex groups, see
+    `compute_mutex_groups`. Only unconditional add and delete effects are analyzed; any predicate affected by some
+    other effect is excluded from all invariants.
+    """
+    fluents, _ = approximate_symbol_fluency(problem)
+    actions = [_ActionInfo(action) for action in problem.actions.values()]
+    unsafe = set().union(*(a.unsafe for a in actions))
+    predicates = sorted((s for s in fluents if isinstance(s, Predicate) and s not in unsafe), key=lambda p: p.name)
+
+    queue = []
+    for predicate in predicates:
+        for omitted in range(-1, predicate.arity):
+            order = tuple(i for i in range(predicate.arity) if i != omitted)
+            queue.append(frozenset([InvariantPart(predicate, order, omitted)]))
+
+    seen = set(queue)
+    invariants = []
+    while queue:
+        candidate = queue.pop(0)
+        refinements = []
+        if _is_invariant(candidate, actions, refinements):
+            invariants.append(Invariant(candidate))
+            continue
+        for refined in refinements:
+            if len(refined) <= max_parts and refined not in seen and len(seen) < max_candidates:
+                seen.add(refined)
+                queue.append(refined)
+    return invariants
+
+
+def _is_invariant(candidate, actions, refinements):
+    parts = {part.predicate: part for part in candidate}
+    for action in actions:
+        matched = [(atom, parts[atom[0]].arguments(atom[1])) for atom in action.adds if atom[0] in parts]
+
+        for (atom1, args1), (atom2, args2) in itertools.combinations(matched, 2):
+            if atom1 != atom2 and action.too_heavy(args1, args2, parts):
+                return False  # The action might add two atoms of the same instance of the invariant
+
+        for atom, args in matched:
+            if not _is_balanced(args, action, parts):
+                refinements.extend(_refine(candidate, args, action, parts))
+                return False
+    return True
+
+
+def _is_balanced(args, action, parts):
+    """ Return true iff the action deletes some atom of the invariant instance given by `args` that is required to
+    be true by the precondition of the action. """
+    return any(d[0] in parts and parts[d[0]].arguments(d[1]) == args and d in action.pre for d in action.dels)
+
+
+def _refine(candidate, args, action, parts):
+    """ Return the candidates that result from adding to the given candidate a part that would balance the add
+    effect with invariant arguments `args` through some delete effect of the action. """
+    refined = []
+    for predicate, dargs in action.dels:
+        if predicate in parts or (predicate, dargs) not in action.pre:
+            continue
+        order = []
+        for arg in args:
+            positions = [i for i, x in enumerate(dargs) if x == arg and i not in order]
+            if not positions:
+                break
+            order.append(positions[0])
+        else:
+            rest = [i for i in range(len(dargs)) if i not in order]
+            if len(rest) <= 1:
+                part = InvariantPart(predicate, tuple(order), rest[0] if rest else -1)
+                refined.append(candidate | {part})
+    return refined
+
+
+def compute_mutex_groups(invariants, atoms, init_atoms):
+    """ Return the list of distinct mutex groups with at least two atoms that result from instantiating the given
+    invariants over the given ground atoms, i.e. pairs (predicate name, tuple of object names). Invariants that do not
+    hold in the initial state, given as a set of true atoms, are discarded. """
+    groups, seen = [], set()
+    for invariant in invariants:
+        instances = invariant.ground_groups(atoms)
+        if any(sum(1 for atom in group if atom in init_atoms) > 1 for group in instances):
+            continue
+        for group in instances:
+            key = frozenset(group)
+            if len(group) > 1 and key not in seen:
+                seen.add(key)
+                groups.append(group)
+    return groups
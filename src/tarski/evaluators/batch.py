@@ -0,0 +1,198 @@
+"""
+    Vectorized evaluation of one formula or term over a batch of packed states.
+"""
+import operator
+
+from .. import modules
+from .. import errors as err
+from ..syntax import Connective, Atom, CompoundFormula, builtins, Variable, Constant, CompoundTerm, Tautology, \
+    Contradiction, IfThenElse, symref
+from .compiled import compile_expression
+
+
+def evaluate_batch(element, states, sigma=None):
+    """ Evaluate the given formula or term over all of the given packed states at once, which must all share the same
+    `StateLayout`. Return a NumPy array with one entry per state: a boolean for formulas, a number for numeric terms,
+    and a `Constant` for object-valued terms.
+
+    Connectives, builtin comparisons and arithmetic are evaluated with vectorized NumPy operations over the bit matrix
+    of the truth values of all state atoms and the matrix of all state values. Any other subexpression (e.g. a
+    quantified formula, or an atom whose arguments are not constants) is evaluated state by state.
+    """
+    np = modules.import_numpy()
+    states = list(states)
+    if not states:
+        return np.zeros(0, dtype=bool)
+
+    layout = states[0].layout
+    if any(s.layout is not layout for s in states):
+        raise RuntimeError('Batch evaluation requires all states to share the same state layout')
+
+    batch = _Batch(np, layout, states, sigma if sigma is not None else {})
+    result = batch.evaluate(element)
+    if not isinstance(result, np.ndarray):
+        result = np.full(len(states), result)
+
+    if _is_term(element) and not element.sort.builtin:  # Decode the objects
+        objects = np.empty(len(states), dtype=object)
+        for i, code in enumerate(result):
+            objects[i] = layout.objects[int(code)]
+        return objects
+    return result
+
+
+class _Batch:
+    """ A batch of states, with the lazily-computed matrices of atom truth values and state values. Within this
+    class, the value of an object-valued term is represented by the integer code given to the object by the layout.
+    """
+    def __init__(self, np, layout, states, sigma):
+        self.np = np
+        self.layout = layout
+        self.states = states
+        self.sigma = sigma
+        self._atoms = None
+        self._values = None
+
+    @property
+    def atoms(self):
+        """ The boolean matrix with the truth value of each atom (column) in each state (row) """
+        if self._atoms is None:
+            np = self.np
+            nbytes = (self.layout.num_atoms + 7) // 8
+            data = b''.join(s.atoms.to_bytes(nbytes, 'little') for s in self.states)
+            bits = np.frombuffer(data, dtype=np.uint8).reshape(len(self.states), nbytes)
+            self._atoms = np.unpackbits(bits, axis=1, bitorder='little')[:, :self.layout.num_atoms].astype(bool)
+        return self._atoms
+
+    @property
+    def values(self):
+        """ The matrix with the value of each slot (column) in each state (row) """
+        if self._values is None:
+            np = self.np
+            dtype = np.int64 if self.layout.typecode == 'q' else np.float64
+            data = b''.join(s.values.tobytes() for s in self.states)
+            self._values = np.frombuffer(data, dtype=dtype).reshape(len(self.states), self.layout.num_slots)
+        return self._values
+
+    def evaluate(self, element):
+        np = self.np
+        if isinstance(element, Tautology):
+            return True
+
+        if isinstance(element, Contradiction):
+            return False
+
+        if isinstance(element, CompoundFormula):
+            subformulas = [self.evaluate(sub) for sub in element.subformulas]
+            if element.connective == Connective.Not:
+                return np.logical_not(subformulas[0])
+            reduction = np.logical_and if element.connective == Connective.And else np.logical_or
+            result = subformulas[0]
+            for sub in subformulas[1:]:
+                result = reduction(result, sub)
+            return result
+
+        if isinstance(element, Atom):
+            if builtins.is_builtin_predicate(element.predicate):
+                lhs, rhs = (self.evaluate(t) for t in element.subterms)
+                return _comparison_operators[element.predicate.symbol](lhs, rhs)
+            if all(isinstance(t, Constant) for t in element.subterms):
+                return self._ground_atom(element.predicate, tuple(element.subterms))
+
+        if isinstance(element, Variable):
+            try:
+                return self._encode_constant(self.sigma[symref(element)])
+            except KeyError:
+                raise err.UnboundVariable(element) from None
+
+        if isinstance(element, Constant):
+            return self._encode_constant(element)
+
+        if isinstance(element, CompoundTerm):
+            if builtins.is_builtin_function(element.symbol):
+                operation = _vectorized_function(np, element.symbol.symbol)
+                if operation is not None:
+                    return operation(*(self.evaluate(t) for t in element.subterms))
+            elif all(isinstance(t, Constant) for t in element.subterms):
+                return self._ground_term(element, tuple(element.subterms))
+
+        if isinstance(element, IfThenElse):
+            return np.where(self.evaluate(element.condition), self.evaluate(element.subterms[0]),
+                            self.evaluate(element.subterms[1]))
+
+        return self._evaluate_state_by_state(element)
+
+    def _ground_atom(self, predicate, point):
+        index = self.layout.atom_index(predicate, point)
+        if index is None:  # A static atom
+            return self.layout.static.holds(predicate, point)
+        return self.atoms[:, index]
+
+    def _ground_term(self, term, point):
+        slot = self.layout.slot_index(term.symbol, point)
+        if slot is None:  # A static term
+            try:
+                return self._encode_constant(self.layout.static.value(term.symbol, point))
+            except KeyError:
+                raise err.UndefinedTerm(term) from None
+
+        column = self.values[:, slot]
+        undefined = self.np.isnan(column) if self.layout.typecode == 'd' else column == self.layout.undefined
+        if undefined.any():
+            raise err.UndefinedTerm(term)
+        return column
+
+    def _encode_constant(self, constant):
+        if constant.sort.builtin:
+            return constant.symbol
+        return self.layout.object_codes[constant.symbol]
+
+    def _evaluate_state_by_state(self, element):
+        compiled = compile_expression(element)
+        results = [compiled(state, self.sigma) for state in self.states]
+        if _is_term(element):
+            return self.np.array([self._encode_constant(c) for c in results])
+        return self.np.array(results, dtype=bool)
+
+
+def _is_term(element):
+    return isinstance(element, (Variable, Constant, CompoundTerm, IfThenElse))
+
+
+_comparison_operators = {
+    builtins.BuiltinPredicateSymbol.EQ: operator.eq,
+    builtins.BuiltinPredicateSymbol.NE: operator.ne,
+    builtins.BuiltinPredicateSymbol.LT: operator.lt,
+    builtins.BuiltinPredicateSymbol.LE: operator.le,
+    builtins.BuiltinPredicateSymbol.GT: operator.gt,
+    builtins.BuiltinPredicateSymbol.GE: operator.ge,
+}
+
+
+def _vectorized_function(np, symbol):
+    """ Return the NumPy operation that implements the given builtin function symbol, or None if there is none """
+    bif = builtins.BuiltinFunctionSymbol
+    if symbol in (bif.ERF, bif.ERFC):
+        sci = modules.import_scipy_special()
+        return sci.erf if symbol == bif.ERF else sci.erfc
+
+    return {
+        bif.ADD: np.add,
+        bif.SUB: np.subtract,
+        bif.MUL: np.multiply,
+        bif.DIV: np.true_divide,
+        bif.POW: np.power,
+        bif.MOD: np.mod,
+        bif.MIN: np.minimum,
+        bif.MAX: np.maximum,
+        bif.ABS: np.abs,
+        bif.SIN: np.sin,
+        bif.COS: np.cos,
+        bif.TAN: np.tan,
+        bif.ATAN: np.arctan,
+        bif.ASIN: np.arcsin,
+        bif.EXP: np.exp,
+        bif.LOG: np.log,
+        bif.SGN: np.sign,
+        bif.SQRT: np.sqrt,
+    }.get(symbol)
@@ -0,0 +1,246 @@
+"""
+    Compilation of formulas and terms into Python closures, for repeated evaluation over different models.
+"""
+import operator
+
+from .. import funcsym
+from .. import errors as err
+from ..syntax import ops, Connective, Atom, CompoundFormula, QuantifiedFormula, builtins, Variable, Constant, \
+    CompoundTerm, Tautology, Contradiction, IfThenElse, AggregateCompoundTerm, symref
+from ..syntax.algebra import Matrix
+from . import simple
+
+
+class StaticDenotations:
+    """ A table with the denotations of the atoms and terms whose head symbol is static, i.e. has the same denotation
+    in all models over which compiled expressions will be evaluated. The static symbols are typically those returned
+    by `approximate_symbol_fluency`, and the model the initial state of the problem. Denotations are retrieved from
+    the model only the first time they are needed, and are keyed by the symbol and (the symbols of) the arguments.
+    """
+    def __init__(self, static_symbols, model):
+        self.symbols = set(static_symbols)
+        self.model = model
+        self.table = dict()
+
+    def is_static(self, symbol):
+        return symbol in self.symbols
+
+    def holds(self, predicate, point):
+        key = (predicate, tuple(c.symbol for c in point))
+        try:
+            return self.table[key]
+        except KeyError:
+            value = self.table[key] = self.model.holds(predicate, point)
+            return value
+
+    def value(self, function, point):
+        """ Return the value of the given function on the given point, or raise a KeyError if undefined. """
+        key = (function, tuple(c.symbol for c in point))
+        try:
+            value = self.table[key]
+        except KeyError:
+            try:
+                value = self.model.value(function, point)
+            except KeyError:
+                value = None
+            self.table[key] = value
+        if value is None:
+            raise KeyError(key)
+        return value
+
+
+def compile_expression(element, static: StaticDenotations = None):
+    """ Compile the given formula or term into a Python function `f(model, sigma=None)` that returns the denotation of
+    the element in the given model, under the given substitution of values to its free variables, exactly as
+    `tarski.evaluators.simple.evaluate(element, model, sigma)` would. The dispatch on the type of each node of the
+    expression, as well as the resolution of builtin symbols, is done once and for all at compilation time.
+
+    If a table of static denotations is given, the denotation of atoms and terms over static symbols is taken from
+    the table, rather than from the model of evaluation, and ground builtin subexpressions whose arguments are all
+    static are evaluated once, at compilation time.
+    """
+    compiled = _compile(element, static)
+
+    def evaluator(model, sigma=None):
+        return compiled(model, sigma)
+    return evaluator
+
+
+def _compile(element, static):
+    if isinstance(element, Tautology):
+        return lambda m, s: True
+
+    if isinstance(element, Contradiction):
+        return lambda m, s: False
+
+    if isinstance(element, Atom):
+        return _compile_atom(element, static)
+
+    if isinstance(element, CompoundFormula):
+        return _compile_compound_formula(element, static)
+
+    if isinstance(element, Variable):
+        return _compile_variable(element)
+
+    if isinstance(element, Constant):
+        return _constant(element)
+
+    if isinstance(element, CompoundTerm):
+        if builtins.is_builtin_function(element.symbol):
+            return _compile_builtin_function(element, static)
+        return _compile_compound_term(element, static)
+
+    if isinstance(element, IfThenElse):
+        condition, then, else_ = (_compile(e, static) for e in (element.condition, ) + tuple(element.subterms))
+        return lambda m, s: then(m, s) if condition(m, s) else else_(m, s)
+
+    if isinstance(element, (QuantifiedFormula, Matrix, AggregateCompoundTerm)):
+        # These are delegated to the non-compiled evaluator
+        return lambda m, s: simple.evaluate(element, m, s)
+
+    raise err.UnexpectedElementType(element)
+
+
+def _constant(value):
+    """ Return a compiled expression that always evaluates to the given value """
+    def evaluate_constant(m, s):
+        return value
+    evaluate_constant.constant = True
+    return evaluate_constant
+
+
+def _fold(compiled, arguments):
+    """ Return the given compiled expression, or a constant expression with its value if all of its arguments are
+    constant and it can be evaluated without error. """
+    if not all(hasattr(arg, 'constant') for arg in arguments):
+        return compiled
+    try:
+        return _constant(compiled(None, None))
+    except Exception:  # pylint: disable=broad-except
+        return compiled  # e.g. a division by zero, which will only be reported if the expression is evaluated
+
+
+def _compile_compound_formula(formula, static):
+    subformulas = tuple(_compile(sub, static) for sub in formula.subformulas)
+
+    if formula.connective == Connective.Not:
+        phi = subformulas[0]
+        return lambda m, s: not phi(m, s)
+
+    if formula.connective == Connective.And:
+        if len(subformulas) == 2:
+            phi1, phi2 = subformulas
+            return lambda m, s: phi1(m, s) and phi2(m, s)
+        return lambda m, s: all(phi(m, s) for phi in subformulas)
+
+    if formula.connective == Connective.Or:
+        return lambda m, s: any(phi(m, s) for phi in subformulas)
+
+    raise err.UnexpectedElementType(formula)
+
+
+_builtin_predicate_operators = {
+    builtins.BuiltinPredicateSymbol.EQ: operator.eq,
+    builtins.BuiltinPredicateSymbol.NE: operator.ne,
+    builtins.BuiltinPredicateSymbol.LT: operator.lt,
+    builtins.BuiltinPredicateSymbol.LE: operator.le,
+    builtins.BuiltinPredicateSymbol.GT: operator.gt,
+    builtins.BuiltinPredicateSymbol.GE: operator.ge,
+}
+
+
+def _compile_atom(atom, static):
+    predicate = atom.predicate
+    subterms = tuple(_compile(t, static) for t in atom.subterms)
+    if builtins.is_builtin_predicate(predicate):
+        operation = _builtin_predicate_operators[predicate.symbol]
+        lhs, rhs = subterms
+        return _fold(lambda m, s: operation(lhs(m, s).symbol, rhs(m, s).symbol), subterms)
+
+    if static is not None and static.is_static(predicate):
+        return _fold(lambda m, s: static.holds(predicate, tuple(t(m, s) for t in subterms)), subterms)
+
+    if all(isinstance(t, Constant) for t in atom.subterms):
+        point = tuple(atom.subterms)
+        return lambda m, s: m.holds(predicate, point)
+
+    return lambda m, s: m.holds(predicate, tuple(t(m, s) for t in subterms))
+
+
+def _compile_variable(variable):
+    ref = symref(variable)
+
+    def evaluate_variable(m, s):
+        try:
+            return s[ref]
+        except (KeyError, TypeError):
+            raise err.UnboundVariable(variable) from None
+    return evaluate_variable
+
+
+def _compile_compound_term(term, static):
+    function = term.symbol
+    subterms = tuple(_compile(t, static) for t in term.subterms)
+
+    if static is not None and static.is_static(function):
+        def evaluate_static_term(m, s):
+            try:
+                return static.value(function, tuple(t(m, s) for t in subterms))
+            except KeyError:
+                raise err.UndefinedTerm(term) from None
+        return _fold(evaluate_static_term, subterms)
+
+    if all(isinstance(t, Constant) for t in term.subterms):
+        point = tuple(term.subterms)
+
+        def evaluate_ground_term(m, s):
+            try:
+                return m.value(function, point)
+            except KeyError:
+                raise err.UndefinedTerm(term) from None
+        return evaluate_ground_term
+
+    def evaluate_term(m, s):
+        try:
+            return m.value(function, [t(m, s) for t in subterms])
+        except KeyError:
+            raise err.UndefinedTerm(term) from None
+    return evaluate_term
+
+
+_builtin_function_operators = {
+    builtins.BuiltinFunctionSymbol.ADD: operator.add,
+    builtins.BuiltinFunctionSymbol.SUB: operator.sub,
+    builtins.BuiltinFunctionSymbol.MUL: operator.mul,
+    builtins.BuiltinFunctionSymbol.DIV: operator.truediv,
+    builtins.BuiltinFunctionSymbol.POW: operator.pow,
+    builtins.BuiltinFunctionSymbol.MOD: operator.mod,
+}
+
+
+def _compile_builtin_function(term, static):
+    symbol = term.symbol.symbol
+    if symbol == builtins.BuiltinFunctionSymbol.MATMUL:
+        return lambda m, s: simple.evaluate(term, m, s)
+
+    operation = _builtin_function_operators.get(symbol) or funcsym.impl(symbol.value)
+    language = term.language
+    subterms = tuple(_compile(t, static) for t in term.subterms)
+
+    if len(subterms) == 1:
+        arg = subterms[0]
+
+        def evaluate_unary(m, s):
+            value = operation(arg(m, s).symbol)
+            return Constant(value, ops.infer_numeric_sort(value, language))
+        return _fold(evaluate_unary, subterms)
+
+    lhs, rhs = subterms
+
+    def evaluate_binary(m, s):
+        x, y = lhs(m, s), rhs(m, s)
+        if isinstance(x, Matrix) or isinstance(y, Matrix):
+            return simple.evaluate(term, m, s)
+        value = operation(x.symbol, y.symbol)
+        return Constant(value, ops.infer_numeric_sort(value, language))
+    return _fold(evaluate_binary, subterms)
@@ -0,0 +1,145 @@
+"""
+    Incremental evaluation of formulas over sequences of states that differ in a few state variables only.
+"""
+from ..syntax import Atom, CompoundTerm, Constant, Connective, CompoundFormula, Contradiction, Tautology, builtins
+from ..syntax.ops import collect_unique_nodes
+from .compiled import compile_expression
+
+_LEAF, _AND, _OR, _NOT = range(4)
+
+
+class IncrementalEvaluation:
+    """ The status of the evaluation of a formula over some state, as maintained by an `IncrementalEvaluator`.
+    For each node of the formula, `values` holds: for leaves and negations, their truth value; for conjunctions,
+    the number of conjuncts that are false; and for disjunctions, the number of disjuncts that are true. """
+    __slots__ = ('evaluator', 'values')
+
+    def __init__(self, evaluator, values):
+        self.evaluator = evaluator
+        self.values = values
+
+    @property
+    def value(self):
+        """ The truth value of the formula """
+        return self.evaluator.truth(self.values, 0)
+
+    def num_unsatisfied(self):
+        """ The number of conjuncts of the formula that are false, if the formula is a conjunction (e.g. the number of
+        unsatisfied goal atoms), or 0 or 1 depending on the truth value of the formula otherwise. """
+        if self.evaluator.kinds[0] == _AND:
+            return self.values[0]
+        return 0 if self.value else 1
+
+
+class IncrementalEvaluator:
+    """ An evaluator that keeps track of the truth value of all the subformulas of a given formula, so that after a
+    number of state variables change (e.g. through the application of an action), only the subformulas that depend
+    on them need to be re-evaluated, and their new truth values propagated upwards to the root of the formula.
+
+    The formula is decomposed into a tree of conjunctions, disjunctions and negations, the leaves of which are any
+    other formula (e.g. atoms or arithmetic comparisons). Each leaf is indexed by the state variables it mentions,
+    identified by pairs (symbol, tuple of object names); leaves that mention some symbol applied to non-constant
+    arguments (e.g. clear(loc(b))) are indexed by the symbol instead, and re-evaluated when any state variable of
+    that symbol changes.
+    """
+    def __init__(self, formula, static=None):
+        self.kinds = []
+        self.parents = []
+        self.children = []
+        self.leaves = dict()  # The compiled formula of each leaf node
+        self.index = dict()  # The leaf nodes that depend on each state variable, or on each symbol
+        self._add_node(formula, -1, static)
+
+    def _add_node(self, formula, parent, static):
+        node = len(self.kinds)
+        self.parents.append(parent)
+        self.children.append([])
+        if isinstance(formula, CompoundFormula):
+            self.kinds.append({Connective.And: _AND, Connective.Or: _OR, Connective.Not: _NOT}[formula.connective])
+            for sub in formula.subformulas:
+                self.children[node].append(self._add_node(sub, node, static))
+            return node
+
+        self.kinds.append(_LEAF)
+        self.leaves[node] = compile_expression(formula, static)
+        if not isinstance(formula, (Tautology, Contradiction)):
+            for key in dependencies(formula):
+                self.index.setdefault(key, []).append(node)
+        return node
+
+    def truth(self, values, node):
+        kind = self.kinds[node]
+        if kind == _AND:
+            return values[node] == 0
+        if kind == _OR:
+            return values[node] > 0
+        return values[node]
+
+    def evaluate(self, state):
+        """ Evaluate the formula from scratch over the given state, and return the resulting evaluation status. """
+        values = [None] * len(self.kinds)
+        for node in reversed(range(len(self.kinds))):  # Children always come after their parents
+            kind = self.kinds[node]
+            if kind == _LEAF:
+                values[node] = bool(self.leaves[node](state))
+            elif kind == _NOT:
+                values[node] = not self.truth(values, self.children[node][0])
+            elif kind == _AND:
+                values[node] = sum(1 for c in self.children[node] if not self.truth(values, c))
+            else:
+                values[node] = sum(1 for c in self.children[node] if self.truth(values, c))
+        return IncrementalEvaluation(self, values)
+
+    def progress(self, evaluation: IncrementalEvaluation, state, changes):
+        """ Return the evaluation status over the given state, given the status `evaluation` over some previous state
+        and the keys of all state variables that might have a different value in the new state, such as those
+        returned by `tarski.search.applicability.progress`. The given status is not modified. """
+        affected = set()
+        for key in changes:
+            affected.update(self.index.get(key, ()))
+            affected.update(self.index.get(key[0], ()))
+
+        values = evaluation.values
+        if not affected:
+            return evaluation
+
+        values = values.copy()
+        for leaf in affected:
+            new = bool(self.leaves[leaf](state))
+            if new != values[leaf]:
+                values[leaf] = new
+                self._propagate(values, leaf, new)
+        return IncrementalEvaluation(self, values)
+
+    def _propagate(self, values, node, became_true):
+        parent = self.parents[node]
+        while parent >= 0:
+            before = self.truth(values, parent)
+            kind = self.kinds[parent]
+            if kind == _NOT:
+                values[parent] = not became_true
+            elif kind == _AND:
+                values[parent] += -1 if became_true else 1
+            else:
+                values[parent] += 1 if became_true else -1
+
+            after = self.truth(values, parent)
+            if after == before:
+                return
+            node, parent, became_true = parent, self.parents[parent], after
+
+
+def dependencies(formula):
+    """ Return the keys of the state variables and symbols that the denotation of the given formula depends on: a
+    pair (symbol, tuple of object names) for each atom or function term with constant arguments, and the symbol
+    itself for atoms and terms with some non-constant argument. """
+    keys = set()
+    for node in collect_unique_nodes(formula, lambda x: isinstance(x, (Atom, CompoundTerm))):
+        symbol = node.symbol
+        if builtins.is_builtin_predicate(symbol) or builtins.is_builtin_function(symbol):
+            continue
+        if all(isinstance(t, Constant) for t in node.subterms):
+            keys.add((symbol, tuple(t.symbol for t in node.subterms)))
+        else:
+            keys.add(symbol)
+    return keys
@@ -0,0 +1,313 @@
+"""
+    Evaluation of conjunctive queries over the extensions of a model, through (indexed) nested-loop joins.
+"""
+import weakref
+
+from ..errors import UnboundVariable
+from ..syntax import Atom, CompoundTerm, Constant, Variable, Tautology, Contradiction, Predicate, Quantifier, \
+    BuiltinPredicateSymbol, symref, is_and, is_or, is_neg, land, lor, neg, top, bot
+from ..syntax.ops import free_variables
+from .compiled import compile_expression
+
+
+class ConjunctiveQuery:
+    """ A conjunctive query over the given variables. The query is made up of a number of relational atoms, i.e.
+    pairs (symbol, arguments), where the symbol is a predicate or a function and the arguments are variables and
+    constants; for a function of arity n, the relation has n+1 arguments, the last one standing for the value of the
+    function. In addition, the query can contain arbitrary formulas as filters, which are evaluated as soon as all of
+    their free variables are bound.
+
+    The answers to the query on a given model are computed through a left-deep join of the relational atoms, in an
+    order chosen greedily for that model, using hash indexes over the bound arguments of each atom that are built
+    for that model only. Query variables that do not appear in any relational atom range over the domain of their
+    sort. Variables in atoms and filters that are not query variables must be given a value in the substitution
+    passed to `answers`. Filters are compiled with the given table of static denotations, if any.
+    """
+    def __init__(self, variables, atoms, filters=(), static=None):
+        self.variables = list(variables)
+        self.refs = [symref(v) for v in self.variables]
+        self.position = {ref: i for i, ref in enumerate(self.refs)}
+        self.atoms = [(symbol, tuple(arguments)) for symbol, arguments in atoms]
+        self.filters = [(compile_expression(phi, static),
+                         [self.position[symref(v)] for v in free_variables(phi) if symref(v) in self.position])
+                        for phi in filters]
+        language = self.variables[0].language if self.variables else None
+        self.constants = {c.symbol: c for c in language.constants()} if language is not None else {}
+
+        # For each variable, the (symbols of the) objects that it can take as value, or None if all values that can
+        # appear in the model extensions are acceptable
+        self.domains = [None if v.sort.builtin else {c.symbol for c in v.sort.domain()} for v in self.variables]
+        self._domains_rows = dict()
+
+    def answers(self, model, sigma=None, restrictions=None):
+        """ Return an iterator over all answers to the query on the given model, where each answer is a tuple with the
+        values of the query variables, in order. If given, `restrictions` maps the index of some query variables to
+        the set of (symbols of) objects that the variable is allowed to take as value. """
+        sigma = sigma if sigma is not None else {}
+        steps = self._plan(model, sigma, restrictions or {})
+        values = [None] * len(self.variables)
+        constants = self.constants
+
+        def expand(k):
+            if k == len(steps):
+                yield tuple(constants[x] for x in values)
+                return
+
+            step = steps[k]
+            for match in step.matches(values):
+                for i, x in zip(step.variables, match):
+                    values[i] = x
+                if step.accept(model, sigma, values, self):
+                    yield from expand(k + 1)
+
+        return expand(0)
+
+    def _plan(self, model, sigma, restrictions):
+        """ Choose a join order for the query atoms on the given model and return the corresponding list of steps """
+        extensions = dict()
+        for symbol, _ in self.atoms:
+            if symbol not in extensions:
+                extensions[symbol] = model.get_extension(symbol)
+
+        # Filters that do not depend on the query variables are checked before anything else
+        steps = [FilterStep()] if any(not indexes for _, indexes in self.filters) else []
+        bound = set()
+        pending = list(range(len(self.atoms)))
+        while pending:
+            def score(a):
+                arguments = self.atoms[a][1]
+                nbound = sum(1 for t in arguments if not isinstance(t, Variable) or self._index(t) in bound)
+                return nbound < len(arguments), -nbound, len(extensions[self.atoms[a][0]])
+            best = min(pending, key=score)
+            pending.remove(best)
+            symbol, arguments = self.atoms[best]
+            rows = _lazy_relation_rows(symbol, extensions[symbol], self.constants)
+            steps.append(self._create_join_step(symbol, arguments, rows, bound, sigma, restrictions))
+
+        for i, variable in enumerate(self.variables):
+            if i not in bound:
+                steps.append(self._create_join_step(None, (variable, ), self._domain_rows(i), bound, sigma,
+                                                    restrictions))
+
+        # Attach each filter to the first step after which all of its variables are bound
+        for phi, indexes in self.filters:
+            step = next((step for step in steps if all(i in step.bound_after for i in indexes)), None)
+            if step is None:
+                step = FilterStep()
+                steps.append(step)
+            step.filters.append(phi)
+        return steps
+
+    def _domain_rows(self, i):
+        """ Return a function that returns the rows of the relation that contains all objects in the domain of the
+        i-th query variable. The relation is computed only once. """
+        def rows():
+            if i not in self._domains_rows:
+                domain = list(self.variables[i].sort.domain())
+                self.constants.update((c.symbol, c) for c in domain if c.symbol not in self.constants)
+                self._domains_rows[i] = [(c.symbol, ) for c in domain]
+            return self._domains_rows[i]
+        return rows
+
+    def _index(self, variable):
+        return self.position.get(symref(variable))
+
+    def _create_join_step(self, symbol, arguments, rows, bound, sigma, restrictions):
+        keys, outputs, checks = [], [], []
+        fresh = dict()
+        for pos, t in enumerate(arguments):
+            i = self._index(t) if isinstance(t, Variable) else None
+            if i is None:  # A constant, or a variable bound externally
+                keys.append((pos, None, _external_value(t, sigma).symbol))
+            elif i in bound:
+                keys.append((pos, i, None))
+            elif i in fresh:
+                checks.append((fresh[i], pos))
+            else:
+                fresh[i] = pos
+                outputs.append((i, pos))
+
+        typechecks = [(j, self.domains[i]) for j, (i, pos) in enumerate(outputs)
+                      if self.domains[i] is not None and
+                      not (symbol is not None and _sort_within(symbol, pos, self.variables[i].sort))]
+        typechecks += [(j, restrictions[i]) for j, (i, _) in enumerate(outputs) if i in restrictions]
+
+        bound.update(fresh.keys())
+        return JoinStep(rows, keys, outputs, checks, typechecks, frozenset(bound))
+
+
+class JoinStep:
+    """ A step of a left-deep join: extends the current partial assignment with all matching rows of a relation """
+    def __init__(self, rows, keys, outputs, checks, typechecks, bound_after):
+        self.rows = rows  # A function that returns the rows of the relation, called only if the step is reached
+        self.keys = keys  # Pairs (argument position, variable index or None, constant symbol or None)
+        self.outputs = outputs  # Pairs (variable index, argument position) for the variables bound in this step
+        self.checks = checks  # Pairs of argument positions that must have the same value
+        self.typechecks = typechecks  # Pairs (index in output tuple, set of allowed values)
+        self.bound_after = bound_after
+        self.variables = [i for i, _ in outputs]
+        self.filters = []
+        self.index = None
+
+    def matches(self, values):
+        """ Return the list of tuples of values for the variables bound in this step that are consistent with the
+        current (partial) assignment of values to variables. """
+        if self.index is None:
+            self.index = self._build_index()
+        return self.index.get(tuple(values[i] if i is not None else c for _, i, c in self.keys), ())
+
+    def _build_index(self):
+        index = dict()
+        for row in self.rows():
+            if any(row[p1] != row[p2] for p1, p2 in self.checks):
+                continue
+            out = tuple(row[pos] for _, pos in self.outputs)
+            if any(out[j] not in allowed for j, allowed in self.typechecks):
+                continue
+            index.setdefault(tuple(row[pos] for pos, _, _ in self.keys), []).append(out)
+        return index
+
+    def accept(self, model, sigma, values, query):
+        if not self.filters:
+            return True
+        substitution = dict(sigma)
+        for i in self.bound_after:
+            substitution[query.refs[i]] = query.constants[values[i]]
+        return all(phi(model, substitution) for phi in self.filters)
+
+
+class FilterStep(JoinStep):
+    """ A step that only evaluates a number of filters, for queries without relational atoms nor variables """
+    def __init__(self):
+        super().__init__(lambda: [()], [], [], [], [], frozenset())
+
+
+def _external_value(term, sigma):
+    if not isinstance(term, Variable):
+        return term
+    try:
+        return sigma[symref(term)]
+    except KeyError:
+        raise UnboundVariable(term) from None
+
+
+def _lazy_relation_rows(symbol, extension, constants):
+    return lambda: relation_rows(symbol, extension, constants)
+
+
+def relation_rows(symbol, extension, constants):
+    """ Return the given extension of the given predicate or function symbol as a list of tuples of (the symbols of)
+    constants. All constants found are registered in the given table, keyed by their symbol. """
+    rows = []
+    if isinstance(symbol, Predicate):
+        for point in extension:
+            rows.append(_register_row(point, constants))
+        return rows
+
+    for point, value in extension:
+        row = _register_row(point, constants) + (value.symbol, )
+        if row[-1] not in constants:
+            constants[row[-1]] = value
+        rows.append(row)
+    return rows
+
+
+def _register_row(point, constants):
+    """ Return the tuple of the symbols of the constants in the given point, registering them in the given table """
+    row = tuple(ref.expr.symbol for ref in point)
+    for ref, c in zip(point, row):
+        if c not in constants:
+            constants[c] = ref.expr
+    return row
+
+
+def _sort_within(symbol, position, sort):
+    """ Return true iff all values that the given symbol can take at the given argument position belong to the given
+    sort, hence there is no need to check them. """
+    domain = symbol.domain if isinstance(symbol, Predicate) else symbol.domain + (symbol.codomain, )
+    return symbol.language.is_subtype(domain[position], sort)
+
+
+def decompose_conjunction(phi):
+    """ Decompose the given formula, which is assumed to be a conjunction, into a list of relational atoms that can be
+    used in a `ConjunctiveQuery`, and a list of filter formulas with the remaining conjuncts. A relational atom is
+    extracted from each positive atom of a non-builtin predicate whose arguments are variables or constants, and from
+    each equality f(t_1, ..., t_n) = t between a term of a non-builtin function and a variable or constant. """
+    atoms, filters = [], []
+    _decompose(phi, atoms, filters)
+    return atoms, filters
+
+
+def _decompose(phi, atoms, filters):
+    if isinstance(phi, Tautology):
+        return
+
+    if is_and(phi):
+        for sub in phi.subformulas:
+            _decompose(sub, atoms, filters)
+        return
+
+    if isinstance(phi, Atom):
+        if not phi.predicate.builtin and all(_is_simple(t) for t in phi.subterms):
+            atoms.append((phi.predicate, tuple(phi.subterms)))
+            return
+
+        if phi.predicate.builtin and phi.predicate.symbol == BuiltinPredicateSymbol.EQ:
+            lhs, rhs = phi.subterms
+            if not isinstance(lhs, CompoundTerm):
+                lhs, rhs = rhs, lhs
+            if isinstance(lhs, CompoundTerm) and not lhs.symbol.builtin and _is_simple(rhs) and \
+                    all(_is_simple(t) for t in lhs.subterms):
+                atoms.append((lhs.symbol, tuple(lhs.subterms) + (rhs, )))
+                return
+
+    filters.append(phi)
+
+
+def _is_simple(term):
+    return isinstance(term, (Variable, Constant))
+
+
+# The queries of the quantified formulas evaluated so far, keyed by the identity of the formula. Formulas compare
+# structurally, and structurally equal formulas of different languages must not share their queries, which refer to
+# the constants and sorts of the language. Each entry keeps a weak reference to its formula, to detect reused ids.
+_quantified_queries = dict()
+_MAX_CACHED_QUERIES = 1024
+
+
+def quantified_formula_query(formula):
+    """ Return a pair (query, universal), where `query` is a conjunctive query over the variables of the given
+    quantified formula whose answers are the witnesses of the formula, if existential, or its counterexamples, if
+    universal, in which case the body of the formula is negated, with the negation pushed inwards through conjunctions
+    and disjunctions so that e.g. a formula forall x: (p(x) -> q(x)) results in the query p(x) and not q(x).
+    The query is computed once for each formula object.
+    """
+    entry = _quantified_queries.get(id(formula))
+    if entry is not None and entry[0]() is formula:
+        return entry[1]
+    if len(_quantified_queries) >= _MAX_CACHED_QUERIES:
+        _quantified_queries.clear()
+    result = _build_quantified_formula_query(formula)
+    _quantified_queries[id(formula)] = (weakref.ref(formula), result)
+    return result
+
+
+def _build_quantified_formula_query(formula):
+    universal = formula.quantifier == Quantifier.Forall
+    body = _negate(formula.formula) if universal else formula.formula
+    atoms, filters = decompose_conjunction(body)
+    return ConjunctiveQuery(formula.variables, atoms, filters), universal
+
+
+def _negate(phi):
+    if is_neg(phi):
+        return phi.subformulas[0]
+    if is_and(phi):
+        return lor(*(_negate(sub) for sub in phi.subformulas), flat=True)
+    if is_or(phi):
+        return land(*(_negate(sub) for sub in phi.subformulas), flat=True)
+    if isinstance(phi, Tautology):
+        return bot
+    if isinstance(phi, Contradiction):
+        return top
+    return neg(phi)
@@ -3,16 +3,15 @@ from typing import List
 
 from .. import funcsym
 from .. import errors as err
-from ..syntax import ops, Connective, Atom, Formula, CompoundFormula, QuantifiedFormula, builtins, Variable, \
-    Constant, CompoundTerm, Tautology, Contradiction, IfThenElse, AggregateCompoundTerm, Term
+from ..syntax import ops, Connective, Atom, CompoundFormula, QuantifiedFormula, builtins, Variable, \
+    Constant, CompoundTerm, Tautology, Contradiction, IfThenElse, AggregateCompoundTerm, Term, symref
 from ..syntax.algebra import Matrix
 from ..model import Model
 
 
-# TODO We will need to extend this so that the interpretation depends on a certain, given sigma of values to
-# TODO the free variables in the given termn / sentence, as is standard in textbook-FOL
 def evaluate(element, m: Model, sigma=None):
-    """ Evaluate the denotation of a given formula or term over a given model """
+    """ Evaluate the denotation of a given formula or term over a given model, under the given substitution `sigma`
+    of values to the free variables of the element, which maps TermReferences of variables to constants. """
     sigma = sigma if sigma is not None else {}
 
     # Formulas
@@ -33,7 +32,7 @@ def evaluate(element, m: Model, sigma=None):
 
     # Terms
     if isinstance(element, Variable):
-        return sigma[element]  # TODO Finish this, ATM it will raise a runtime error
+        return evaluate_variable(element, sigma)
 
     if isinstance(element, (Constant, CompoundTerm, IfThenElse, Matrix, AggregateCompoundTerm)):
         return evaluate_term(element, m, sigma)
@@ -57,12 +56,28 @@ def evaluate_atom(atom: Atom, m: Model, sigma):
     return m.holds(atom.predicate, point)
 
 
-def evaluate_quantified(formula: Formula, m: Model, sigma):
-    # pylint: disable=unused-argument
-    raise NotImplementedError()
+def evaluate_quantified(formula: QuantifiedFormula, m: Model, sigma):
+    """ Evaluate the given quantified formula by searching for a witness of the formula, if existential, or for a
+    counterexample, if universal. The search binds the quantified variables from the atoms of the formula that hold
+    in the model whenever possible, rather than enumerating the full cross product of the variable domains, and
+    stops as soon as the first witness or counterexample is found. """
+    from .joins import quantified_formula_query
+    query, universal = quantified_formula_query(formula)
+    found = next(query.answers(m, sigma), None) is not None
+    return not found if universal else found
+
+
+def evaluate_variable(variable: Variable, sigma):
+    try:
+        return sigma[symref(variable)]
+    except KeyError:
+        raise err.UnboundVariable(variable) from None
 
 
 def evaluate_term(term, m: Model, sigma):
+    if isinstance(term, Variable):
+        return evaluate_variable(term, sigma)
+
     if isinstance(term, IfThenElse):
         if evaluate(term.condition, m, sigma):  # condition is true
             term = term.subterms[0]
@@ -107,17 +122,18 @@ def evaluate_term(term, m: Model, sigma):
 
 
 def evaluate_builtin_predicate(atom, model, sigma):
-    bip = builtins.BuiltinPredicateSymbol
-    _evaluators = {
-        bip.EQ: lambda f, m, s: evaluate(f.subterms[0], m, s).symbol == evaluate(f.subterms[1], m, s).symbol,
-        bip.NE: lambda f, m, s: evaluate(f.subterms[0], m, s).symbol != evaluate(f.subterms[1], m, s).symbol,
-        bip.LT: lambda f, m, s: evaluate(f.subterms[0], m, s).symbol < evaluate(f.subterms[1], m, s).symbol,
-        bip.LE: lambda f, m, s: evaluate(f.subterms[0], m, s).symbol <= evaluate(f.subterms[1], m, s).symbol,
-        bip.GT: lambda f, m, s: evaluate(f.subterms[0], m, s).symbol > evaluate(f.subterms[1], m, s).symbol,
-        bip.GE: lambda f, m, s: evaluate(f.subterms[0], m, s).symbol >= evaluate(f.subterms[1], m, s).symbol,
-    }
+    return _builtin_predicate_evaluators[atom.predicate.symbol](atom, model, sigma)
 
-    return _evaluators[atom.predicate.symbol](atom, model, sigma)
+
+_bip = builtins.BuiltinPredicateSymbol
+_builtin_predicate_evaluators = {
+    _bip.EQ: lambda f, m, s: evaluate(f.subterms[0], m, s).symbol == evaluate(f.subterms[1], m, s).symbol,
+    _bip.NE: lambda f, m, s: evaluate(f.subterms[0], m, s).symbol != evaluate(f.subterms[1], m, s).symbol,
+    _bip.LT: lambda f, m, s: evaluate(f.subterms[0], m, s).symbol < evaluate(f.subterms[1], m, s).symbol,
+    _bip.LE: lambda f, m, s: evaluate(f.subterms[0], m, s).symbol <= evaluate(f.subterms[1], m, s).symbol,
+    _bip.GT: lambda f, m, s: evaluate(f.subterms[0], m, s).symbol > evaluate(f.subterms[1], m, s).symbol,
+    _bip.GE: lambda f, m, s: evaluate(f.subterms[0], m, s).symbol >= evaluate(f.subterms[1], m, s).symbol,
+}
 
 
 def symbolic_matrix_multiplication(lhs: Matrix, rhs: Matrix):
@@ -133,36 +149,7 @@ def symbolic_matrix_multiplication(lhs: Matrix, rhs: Matrix):
 
 
 def evaluate_builtin_function(term, model, sigma):
-    bif = builtins.BuiltinFunctionSymbol
-    ae1 = _arithmetic_evaluator_1
-    ae2 = _arithmetic_evaluator_2
-    _evaluators = {
-        bif.ADD: lambda f, m, s: ae2(operator.add, f.subterms[0], f.subterms[1], m, s),
-        bif.SUB: lambda f, m, s: ae2(operator.sub, f.subterms[0], f.subterms[1], m, s),
-        bif.MUL: lambda f, m, s: ae2(operator.mul, f.subterms[0], f.subterms[1], m, s),
-        bif.MATMUL: lambda f, m, s: ae2(symbolic_matrix_multiplication, f.subterms[0], f.subterms[1], m, s),
-        bif.DIV: lambda f, m, s: ae2(operator.truediv, f.subterms[0], f.subterms[1], m, s),
-        bif.POW: lambda f, m, s: ae2(operator.pow, f.subterms[0], f.subterms[1], m, s),
-        bif.MOD: lambda f, m, s: ae2(operator.mod, f.subterms[0], f.subterms[1], model, s),
-        bif.MIN: lambda f, m, s: ae2(funcsym.impl(bif.MIN.value), f.subterms[0], f.subterms[1], m, s),
-        bif.MAX: lambda f, m, s: ae2(funcsym.impl(bif.MAX.value), f.subterms[0], f.subterms[1], m, s),
-        bif.ABS: lambda f, m, s: ae1(funcsym.impl(bif.ABS.value), f.subterms[0], m, s),
-        bif.SIN: lambda f, m, s: ae1(funcsym.impl(bif.SIN.value), f.subterms[0], m, s),
-        bif.COS: lambda f, m, s: ae1(funcsym.impl(bif.COS.value), f.subterms[0], m, s),
-        bif.TAN: lambda f, m, s: ae1(funcsym.impl(bif.TAN.value), f.subterms[0], m, s),
-        bif.ATAN: lambda f, m, s: ae1(funcsym.impl(bif.ATAN.value), f.subterms[0], m, s),
-        bif.ASIN: lambda f, m, s: ae1(funcsym.impl(bif.ASIN.value), f.subterms[0], m, s),
-        bif.EXP: lambda f, m, s: ae1(funcsym.impl(bif.EXP.value), f.subterms[0], m, s),
-        bif.LOG: lambda f, m, s: ae1(funcsym.impl(bif.LOG.value), f.subterms[0], m, s),
-        bif.ERF: lambda f, m, s: ae1(funcsym.impl(bif.ERF.value), f.subterms[0], m, s),
-        bif.ERFC: lambda f, m, s: ae1(funcsym.impl(bif.ERFC.value), f.subterms[0], m, s),
-        bif.SGN: lambda f, m, s: ae1(funcsym.impl(bif.SGN.value), f.subterms[0], m, s),
-        bif.SQRT: lambda f, m, s: ae1(funcsym.impl(bif.SQRT.value), f.subterms[0], m, s),
-        bif.NORMAL: lambda f, m, s: ae2(funcsym.impl(bif.NORMAL.value), f.subterms[0], f.subterms[1], m, s),
-        bif.GAMMA: lambda f, m, s: ae2(funcsym.impl(bif.GAMMA.value), f.subterms[0], f.subterms[1], m, s),
-    }
-
-    return _evaluators[term.symbol.symbol](term, model, sigma)
+    return _builtin_function_evaluators[term.symbol.symbol](term, model, sigma)
 
 
 def _arithmetic_evaluator_1(operation, expr, model, sigma):
@@ -198,3 +185,32 @@ def _arithmetic_evaluator_2(operation, lhs, rhs, model, sigma):
     value = operation(ops.cast_to_number(lhs), ops.cast_to_number(rhs))
     sort = ops.infer_numeric_sort(value, lhs.language)
     return Constant(value, sort)
+
+
+_ae1, _ae2 = _arithmetic_evaluator_1, _arithmetic_evaluator_2
+_bif = builtins.BuiltinFunctionSymbol
+_builtin_function_evaluators = {
+    _bif.ADD: lambda f, m, s: _ae2(operator.add, f.subterms[0], f.subterms[1], m, s),
+    _bif.SUB: lambda f, m, s: _ae2(operator.sub, f.subterms[0], f.subterms[1], m, s),
+    _bif.MUL: lambda f, m, s: _ae2(operator.mul, f.subterms[0], f.subterms[1], m, s),
+    _bif.MATMUL: lambda f, m, s: _ae2(symbolic_matrix_multiplication, f.subterms[0], f.subterms[1], m, s),
+    _bif.DIV: lambda f, m, s: _ae2(operator.truediv, f.subterms[0], f.subterms[1], m, s),
+    _bif.POW: lambda f, m, s: _ae2(operator.pow, f.subterms[0], f.subterms[1], m, s),
+    _bif.MOD: lambda f, m, s: _ae2(operator.mod, f.subterms[0], f.subterms[1], m, s),
+    _bif.MIN: lambda f, m, s: _ae2(funcsym.impl(_bif.MIN.value), f.subterms[0], f.subterms[1], m, s),
+    _bif.MAX: lambda f, m, s: _ae2(funcsym.impl(_bif.MAX.value), f.subterms[0], f.subterms[1], m, s),
+    _bif.ABS: lambda f, m, s: _ae1(funcsym.impl(_bif.ABS.value), f.subterms[0], m, s),
+    _bif.SIN: lambda f, m, s: _ae1(funcsym.impl(_bif.SIN.value), f.subterms[0], m, s),
+    _bif.COS: lambda f, m, s: _ae1(funcsym.impl(_bif.COS.value), f.subterms[0], m, s),
+    _bif.TAN: lambda f, m, s: _ae1(funcsym.impl(_bif.TAN.value), f.subterms[0], m, s),
+    _bif.ATAN: lambda f, m, s: _ae1(funcsym.impl(_bif.ATAN.value), f.subterms[0], m, s),
+    _bif.ASIN: lambda f, m, s: _ae1(funcsym.impl(_bif.ASIN.value), f.subterms[0], m, s),
+    _bif.EXP: lambda f, m, s: _ae1(funcsym.impl(_bif.EXP.value), f.subterms[0], m, s),
+    _bif.LOG: lambda f, m, s: _ae1(funcsym.impl(_bif.LOG.value), f.subterms[0], m, s),
+    _bif.ERF: lambda f, m, s: _ae1(funcsym.impl(_bif.ERF.value), f.subterms[0], m, s),
+    _bif.ERFC: lambda f, m, s: _ae1(funcsym.impl(_bif.ERFC.value), f.subterms[0], m, s),
+    _bif.SGN: lambda f, m, s: _ae1(funcsym.impl(_bif.SGN.value), f.subterms[0], m, s),
+    _bif.SQRT: lambda f, m, s: _ae1(funcsym.impl(_bif.SQRT.value), f.subterms[0], m, s),
+    _bif.NORMAL: lambda f, m, s: _ae2(funcsym.impl(_bif.NORMAL.value), f.subterms[0], f.subterms[1], m, s),
+    _bif.GAMMA: lambda f, m, s: _ae2(funcsym.impl(_bif.GAMMA.value), f.subterms[0], f.subterms[1], m, s),
+}
@@ -0,0 +1,298 @@
+"""
+    Translation of ground STRIPS problems into a finite-domain representation (FDR, also known as SAS+), where each
+    state variable takes one of several values, each of them corresponding to one atom of some mutex group.
+"""
+from ..analysis.invariants import synthesize_invariants, compute_mutex_groups
+from ..errors import TarskiError
+from ..evaluators.simple import evaluate
+from ..syntax import Atom, Predicate, Tautology, create_substitution, term_substitution, Constant
+from ..syntax.transform.action_grounding import ground_schema_into_plain_operator_from_grounding
+from .. import fstrips as fs
+from .representation import collect_literals_from_conjunction
+
+NONE_OF_THOSE = '<none of those>'
+
+
+class FDRTranslationError(TarskiError):
+    def __init__(self, msg=None):
+        msg = msg or 'Unspecified error when translating problem into a finite-domain representation'
+        super().__init__(msg)
+
+
+class FDRVariable:
+    """ A finite-domain state variable. Each of its values is the name of an atom (e.g. "Atom on(b1, b2)"), of a
+    negated atom (for binary variables), or `NONE_OF_THOSE`, for groups of atoms that can all be false. """
+    __slots__ = ('name', 'values')
+
+    def __init__(self, name, values):
+        self.name = name
+        self.values = values
+
+    def __str__(self):
+        return '{}: [{}]'.format(self.name, ', '.join(self.values))
+
+    __repr__ = __str__
+
+
+class FDROperator:
+    """ A ground FDR operator. `prevail` is a list of pairs (variable, value) for the preconditions on variables
+    that the operator does not change; each effect is a tuple (conditions, variable, pre, post), where conditions
+    is a list of pairs (variable, value) and `pre` is the value that the variable must have, or -1 if any. """
+    __slots__ = ('name', 'prevail', 'effects', 'cost')
+
+    def __init__(self, name, prevail, effects, cost=1):
+        self.name = name
+        self.prevail = prevail
+        self.effects = effects
+        self.cost = cost
+
+    def __str__(self):
+        return self.name
+
+    __repr__ = __str__
+
+
+class FDRTask:
+    """ A planning problem in finite-domain representation """
+    def __init__(self, variables, mutex_groups, init, goal, operators, use_costs=False):
+        self.variables = variables
+        self.mutex_groups = mutex_groups  # Lists of pairs (variable, value) that are mutually exclusive
+        self.init = init  # The initial value of each variable
+        self.goal = goal  # A list of pairs (variable, value)
+        self.operators = operators
+        self.use_costs = use_costs
+
+    def state_size(self):
+        """ The number of bits needed to encode a state, as opposed to one bit per atom """
+        return sum(max(1, (len(v.values) - 1).bit_length()) for v in self.variables)
+
+
+def translate_to_fdr(problem, grounding=None, invariants=None):
+    """ Translate the given STRIPS problem, possibly with negative preconditions and conditional effects, into a
+    finite-domain representation. The ground atoms and actions are those given by the given grounding strategy,
+    which by default is a `LPGroundingStrategy`. Atoms are grouped into multi-valued state variables with the help of
+    the given mutex invariants, which by default are computed with `synthesize_invariants`. Mutex groups are chosen
+    greedily, largest first, as in the Fast Downward translator; atoms not covered by any chosen group, as well as
+    atoms that appear in negative conditions, are encoded as binary variables.
+    """
+    if grounding is None:
+        from ..grounding import LPGroundingStrategy
+        grounding = LPGroundingStrategy(problem)
+    if invariants is None:
+        invariants = synthesize_invariants(problem)
+    init = problem.init
+
+    atoms = []
+    for variable in grounding.ground_state_variables():
+        if not isinstance(variable.symbol, Predicate):
+            raise FDRTranslationError(f'State variable "{variable}" is not an atom')
+        atoms.append((variable.symbol.name, tuple(c.symbol for c in variable.binding)))
+    atoms.sort(key=lambda atom: (atom[0], tuple(map(str, atom[1]))))  # Sort everything, for determinism
+    atom_set = set(atoms)
+
+    operators = []
+    for name, bindings in sorted(grounding.ground_actions().items()):
+        action = problem.get_action(name)
+        for binding in sorted(bindings, key=lambda b: tuple(map(str, b))):
+            operators.append((action, binding, ground_schema_into_plain_operator_from_grounding(action, binding)))
+
+    negative = set()
+    for _, _, op in operators:
+        for atom, positive in _literals(op.precondition):
+            if not positive:
+                negative.add(_key(atom))
+        for eff in op.effects:
+            for atom, positive in _literals(eff.condition):
+                if not positive:
+                    negative.add(_key(atom))
+    for atom, positive in _literals(problem.goal):
+        if not positive:
+            negative.add(_key(atom))
+
+    init_atoms = {atom for atom in atoms if init.holds(problem.language.get(atom[0]), _constants(problem, atom[1]))}
+    groups = compute_mutex_groups(invariants, atoms, init_atoms)
+    encoding = _choose_variables(groups, atoms, negative, operators, init_atoms)
+
+    translator = _Translator(problem, atom_set, encoding)
+    variables = [FDRVariable(f'var{i}', values) for i, values in enumerate(encoding.values)]
+    task_init = [encoding.initial_value(i, init_atoms) for i in range(len(variables))]
+    goal = translator.conditions(problem.goal)
+    if goal is None:
+        raise FDRTranslationError('The goal of the problem is statically false')
+
+    use_costs = any(action.cost is not None for action in problem.actions.values())
+    fdr_operators = []
+    for action, binding, op in operators:
+        fdr_op = translator.operator(op, _cost(problem, action, binding) if use_costs else 1)
+        if fdr_op is not None:
+            fdr_operators.append(fdr_op)
+
+    mutexes = [[encoding.lookup[atom] for atom in group] for group in groups]
+    return FDRTask(variables, mutexes, task_init, sorted(goal.items()), fdr_operators, use_costs)
+
+
+class _Encoding:
+    """ The assignment of ground atoms (pairs of predicate name and tuple of object names) to variable values """
+    def __init__(self):
+        self.values = []  # The names of the values of each variable
+        self.atoms = []  # The atoms of each variable, in the order of their values
+        self.lookup = dict()  # The pair (variable, value) of each atom
+        self.none = []  # The value that denotes that none of the atoms of each variable is true, if any
+
+    def add(self, atoms, exactly_one):
+        var = len(self.values)
+        self.atoms.append(atoms)
+        if len(atoms) == 1:  # A binary variable
+            self.values.append([_atom_name(atoms[0]), _atom_name(atoms[0], 'NegatedAtom')])
+            self.none.append(1)
+        else:
+            self.values.append([_atom_name(atom) for atom in atoms] + ([] if exactly_one else [NONE_OF_THOSE]))
+            self.none.append(None if exactly_one else len(atoms))
+        for value, atom in enumerate(atoms):
+            self.lookup[atom] = (var, value)
+
+    def initial_value(self, var, init_atoms):
+        for value, atom in enumerate(self.atoms[var]):
+            if atom in init_atoms:
+                return value
+        return self.none[var]
+
+
+def _choose_variables(groups, atoms, negative, operators, init_atoms):
+    """ Choose greedily the mutex groups that make up the multi-valued variables, largest groups first. A group
+    needs no "none of those" value if exactly one of its atoms is true in the initial state, and every operator that
+    deletes one of its atoms adds another one. """
+    uncovered = [atom for atom in atoms if atom not in negative]
+    remaining = set(uncovered)
+    candidates = [list(group) for group in groups]
+    encoding = _Encoding()
+
+    while True:
+        candidates = [[a for a in group if a in remaining] for group in candidates]
+        candidates = [group for group in candidates if len(group) > 1]
+        if not candidates:
+            break
+        best = max(candidates, key=len)
+        remaining.difference_update(best)
+        encoding.add(best, _is_exactly_one(best, operators, init_atoms))
+
+    for atom in atoms:
+        if atom not in encoding.lookup:
+            encoding.add([atom], False)
+    return encoding
+
+
+def _is_exactly_one(group, operators, init_atoms):
+    if sum(1 for atom in group if atom in init_atoms) != 1:
+        return False
+    members = set(group)
+    for _, _, op in operators:
+        adds = {_key(eff.atom) for eff in op.effects
+                if isinstance(eff, fs.AddEffect) and isinstance(eff.condition, Tautology)}
+        for eff in op.effects:
+            if isinstance(eff, fs.DelEffect) and _key(eff.atom) in members:
+                if not isinstance(eff.condition, Tautology) or not adds & members:
+                    return False
+    return True
+
+
+class _Translator:
+    def __init__(self, problem, atoms, encoding):
+        self.problem = problem
+        self.atoms = atoms
+        self.encoding = encoding
+
+    def conditions(self, phi):
+        """ Return the dictionary of variable values required by the given conjunction of literals, or None if it
+        is unsatisfiable, either because of some static literal or because of conflicting values. """
+        literals = _literals(phi)
+        if literals is None:
+            raise FDRTranslationError(f'Formula "{phi}" is not a conjunction of literals')
+
+        required = dict()
+        for atom, positive in literals:
+            key = _key(atom)
+            if key not in self.atoms:  # A static (or unreachable) atom
+                if bool(evaluate(atom, self.problem.init)) != positive:
+                    return None
+                continue
+
+            var, value = self.encoding.lookup[key]
+            if not positive:  # Atoms in negative literals are always binary variables
+                value = 1 - value
+            if required.setdefault(var, value) != value:
+                return None
+        return required
+
+    def operator(self, op, cost):
+        pre = self.conditions(op.precondition)
+        if pre is None:
+            return None
+
+        added = {_key(eff.atom) for eff in op.effects
+                 if isinstance(eff, fs.AddEffect) and isinstance(eff.condition, Tautology)}
+        effects = []
+        for eff in op.effects:
+            if not isinstance(eff, (fs.AddEffect, fs.DelEffect)):
+                raise FDRTranslationError(f'Effect "{eff}" of operator "{op}" is not a STRIPS effect')
+            conditions = self.conditions(eff.condition)
+            key = _key(eff.atom)
+            if conditions is None or key not in self.atoms:
+                continue
+
+            var, value = self.encoding.lookup[key]
+            if isinstance(eff, fs.DelEffect):
+                if key in added:
+                    continue  # Add effects take precedence over delete effects
+                if any(self.encoding.lookup[a][0] == var for a in added if a in self.encoding.lookup):
+                    continue  # The variable gets a new value anyway
+                if pre.get(var, value) != value:
+                    continue  # The atom is known to be false
+                if var not in pre and self.encoding.none[var] != 1:
+                    conditions = {**conditions, var: value}  # Otherwise, the variable keeps its value
+                post = self.encoding.none[var]
+                if post is None:
+                    raise FDRTranslationError(f'Operator "{op}" deletes atom {key} without adding an alternative')
+            else:
+                post = value
+            effects.append((conditions, var, post))
+
+        affected = {var for _, var, _ in effects}
+        prevail = sorted((var, value) for var, value in pre.items() if var not in affected)
+        fdr_effects = [(sorted(conditions.items()), var, pre.get(var, -1), post) for conditions, var, post in effects]
+        return FDROperator(_operator_name(op.name), prevail, fdr_effects, cost)
+
+
+def _literals(phi):
+    if isinstance(phi, Tautology):
+        return set()
+    return collect_literals_from_conjunction(phi)
+
+
+def _key(atom: Atom):
+    return atom.predicate.name, tuple(t.symbol for t in atom.subterms)
+
+
+def _constants(problem, names):
+    return tuple(problem.language.get(name) for name in names)
+
+
+def _atom_name(atom, prefix='Atom'):
+    return '{} {}({})'.format(prefix, atom[0], ', '.join(map(str, atom[1])))
+
+
+def _operator_name(name):
+    """ Turn the name of a ground operator, e.g. "stack(b1, b2)", into the format "stack b1 b2" """
+    if name.endswith(')') and '(' in name:
+        head, args = name[:-1].split('(', 1)
+        return ' '.join([head] + [a.strip() for a in args.split(',') if a.strip()])
+    return name
+
+
+def _cost(problem, action, binding):
+    if action.cost is None:
+        return 1
+    values = [problem.language.get(c) if isinstance(c, str) else c for c in binding]
+    addend = term_substitution(action.cost.addend, create_substitution(action.parameters, values))
+    cost = addend if isinstance(addend, Constant) else evaluate(addend, problem.init)
+    return int(cost.symbol if isinstance(cost, Constant) else cost)
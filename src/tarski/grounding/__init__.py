@@ -1,3 +1,6 @@
 
 from .naive_grounding import ProblemGrounding, create_all_possible_state_variables, NaiveGroundingStrategy
 from .lp_grounding import LPGroundingStrategy
+from .cache import GroundingCache, problem_fingerprint
+from .relevance import RelevanceGroundingStrategy
+from .domain import CompiledDomain
@@ -0,0 +1,197 @@
+"""
+    A persistent, content-addressed cache for the results of grounding planning problems.
+"""
+import hashlib
+import os
+import zlib
+from array import array
+
+from ..syntax.sorts import parent
+from ..util import SymbolIndex
+from .common import StateVariableLite
+
+_MAGIC = b'TGC1'
+
+
+def problem_fingerprint(problem):
+    """ Return a stable hash (a hex string) of the given problem, which depends only on its language (sorts,
+    objects and symbols), initial state, goal, constraints and actions, and not e.g. on the order in which objects or
+    initial atoms were declared, so that the same problem parsed twice gets the same fingerprint in any process. """
+    lang = problem.language
+    h = hashlib.sha256()
+
+    def update(*tokens):
+        for token in tokens:
+            h.update(str(token).encode())
+            h.update(b'\0')
+        h.update(b'\1')
+
+    update(problem.name, problem.domain_name)
+    for sort in sorted(lang.sorts, key=lambda s: s.name):
+        p = parent(sort) if not sort.builtin else None
+        update('sort', sort.name, p.name if p is not None else '')
+    for c in sorted(lang.constants(), key=lambda c: str(c.symbol)):
+        update('constant', c.symbol, c.sort.name)
+    signatures = ((type(s).__name__, ) + tuple(map(str, s.signature)) for s in lang.predicates + lang.functions)
+    for signature in sorted(signatures):
+        update(*signature)
+
+    for atom in sorted(str(a) for a in problem.init.as_atoms()):
+        update('init', atom)
+    update('goal', problem.goal)
+    for constraint in problem.constraints:
+        update('constraint', constraint)
+    for name, derived in sorted(problem.derived_predicates.items()):
+        update('derived', name, *derived.parameters, derived.formula)
+    for name, action in sorted(problem.actions.items()):
+        update('action', action.ident(), action.precondition, action.cost, *action.effects)
+    return h.hexdigest()
+
+
+class GroundingCache:
+    """ An on-disk cache of grounding results, each of which is a dictionary mapping names to lists of tuples of
+    strings, e.g. the state variables of a problem, keyed by their symbol name. Each result is stored in a separate
+    file within the given directory, named after a hash of its key, in a compact binary format: a table with all
+    distinct strings, followed by the rows of each entry encoded as indexes into the table, all of it compressed.
+
+    The total size of the cache is bounded by `max_size` bytes: whenever a new result is stored, the results that
+    have been used least recently are removed until the bound is satisfied. If no directory is given, the one in the
+    `TARSKI_CACHE_DIR` environment variable is used, or `~/.cache/tarski/grounding` otherwise.
+    """
+    def __init__(self, directory=None, max_size=256 * 1024 * 1024):
+        if directory is None:
+            directory = os.environ.get('TARSKI_CACHE_DIR',
+                                       os.path.join(os.path.expanduser('~'), '.cache', 'tarski', 'grounding'))
+        self.directory = directory
+        self.max_size = max_size
+
+    @staticmethod
+    def key(problem, *options):
+        """ Return the cache key for the given problem and grounding options """
+        h = hashlib.sha256(problem_fingerprint(problem).encode())
+        for option in options:
+            h.update(b'\0' + repr(option).encode())
+        return h.hexdigest()
+
+    def _filename(self, key):
+        return os.path.join(self.directory, key + '.bin')
+
+    def get(self, key):
+        """ Return the result stored under the given key, or None if there is none """
+        filename = self._filename(key)
+        try:
+            with open(filename, 'rb') as f:
+                data = f.read()
+            os.utime(filename)  # Mark the result as recently used
+        except OSError:
+            return None
+        try:
+            return decode_relations(data)
+        except (ValueError, IndexError, zlib.error):  # A corrupt file, e.g. written by an interrupted process
+            return None
+
+    def put(self, key, relations):
+        """ Store the given result under the given key, and evict the least recently used results if necessary """
+        os.makedirs(self.directory, exist_ok=True)
+        filename = self._filename(key)
+        temporary = f'{filename}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(encode_relations(relations))
+        os.replace(temporary, filename)  # Atomically, so that concurrent readers never see a partial file
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.bin'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        """ Remove all results from the cache """
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.bin'):
+                    os.remove(entry.path)
+
+
+def encode_relations(relations):
+    """ Encode a dictionary mapping names to iterables of tuples of strings into a compact sequence of bytes """
+    strings, table, codes = [], dict(), array('I')
+
+    def code(string):
+        index = table.get(string)
+        if index is None:
+            index = table[string] = len(strings)
+            strings.append(string)
+        return index
+
+    for name, rows in relations.items():
+        rows = list(rows)
+        codes.extend((code(name), len(rows)))
+        for row in rows:
+            codes.append(len(row))
+            codes.extend(code(x) for x in row)
+
+    text = '\0'.join(strings).encode()
+    header = array('I', [len(strings), len(text), len(codes)]).tobytes()
+    return _MAGIC + zlib.compress(header + text + codes.tobytes())
+
+
+def decode_relations(data):
+    """ Decode the result of `encode_relations` into a dictionary mapping names to lists of tuples of strings """
+    if data[:len(_MAGIC)] != _MAGIC:
+        raise ValueError('Not a grounding cache file')
+    data = zlib.decompress(data[len(_MAGIC):])
+    itemsize = array('I').itemsize
+    nstrings, ntext, ncodes = array('I', data[:3 * itemsize])
+    strings = data[3 * itemsize:3 * itemsize + ntext].decode().split('\0') if nstrings else []
+    codes = array('I', data[3 * itemsize + ntext:])
+    if len(codes) != ncodes or len(strings) != nstrings:
+        raise ValueError('Corrupt grounding cache file')
+
+    relations, i = dict(), 0
+    while i < len(codes):
+        name, nrows = strings[codes[i]], codes[i + 1]
+        i += 2
+        rows = []
+        for _ in range(nrows):
+            arity = codes[i]
+            rows.append(tuple(strings[c] for c in codes[i + 1:i + 1 + arity]))
+            i += 1 + arity
+        relations[name] = rows
+    return relations
+
+
+def state_variable_rows(variables):
+    """ Return the given index of state variables as a list of rows (symbol name, object name, ...), in order """
+    return [(v.symbol.name, ) + tuple(str(c.symbol) for c in v.binding) for v in variables]
+
+
+def state_variables_from_rows(language, rows):
+    """ Return an index of the state variables in the given rows, as returned by `state_variable_rows` """
+    constants = {str(c.symbol): c for c in language.constants()}
+    variables = SymbolIndex()
+    for row in rows:
+        variables.add(StateVariableLite(language.get(row[0]), tuple(constants[c] for c in row[1:])))
+    return variables
+
+
+def is_cacheable(language, constants):
+    """ Return true iff all of the given constants can be retrieved by name from the given language, e.g. they are
+    not elements of the domain of some builtin sort, and hence results that mention them can be cached. """
+    names = {str(c.symbol) for c in language.constants()}
+    return all(str(c.symbol) in names for c in constants)
@@ -0,0 +1,66 @@
+"""
+    Compilation of the instance-independent part of the grounding of the problems of a planning domain.
+"""
+from ..io.fstrips import FstripsReader
+from ..reachability import ReachabilityLPTemplate
+from .ops import approximate_symbol_fluency
+
+
+class CompiledDomain:
+    """ The parts of the parsing and grounding of a planning problem that depend only on its domain, computed once
+    and shared by all problems of the domain that are read or grounded through it:
+
+        - The parse tree of the domain file, if any, which `read_instance` processes into the language and action
+          schemas of each problem, so that the domain file is parsed only once.
+        - The classification of predicate and function symbols into fluent and static symbols.
+        - The rules of the reachability logic program that correspond to the action schemas, except for those with
+          quantified formulas or universal effects, see `ReachabilityLPTemplate`. The type hierarchy rules and the
+          facts of the initial state are still generated for each problem.
+
+    Everything but the parse tree is computed from the first problem for which it is needed, and all problems are
+    assumed to share the same domain, e.g.
+
+        domain = CompiledDomain('domain.pddl')
+        for filename in instances:
+            problem = domain.read_instance(filename)
+            actions = domain.grounding_strategy(problem).ground_actions()
+    """
+    def __init__(self, domain_filename=None, **reader_options):
+        self.reader_options = reader_options
+        self.tree = None
+        if domain_filename is not None:
+            self.tree = FstripsReader(**reader_options).parse_tree(domain_filename, 'domain')
+        self.fluent_names = None
+        self.static_names = None
+        self.templates = dict()
+
+    def read_instance(self, filename):
+        """ Return the problem that results from the domain plus the given instance file """
+        if self.tree is None:
+            raise RuntimeError('Cannot read instances of a compiled domain created without a domain file')
+        reader = FstripsReader(**self.reader_options)
+        reader.parse_domain_tree(self.tree)
+        return reader.parse_instance(filename)
+
+    def symbol_fluency(self, problem):
+        """ Return the fluent and static symbols of the language of the given problem, as `approximate_symbol_fluency`
+        does, but computed only once for all problems of the domain. """
+        if self.fluent_names is None:
+            fluents, statics = approximate_symbol_fluency(problem)
+            self.fluent_names = {s.name for s in fluents}
+            self.static_names = {s.name for s in statics}
+        lang = problem.language
+        return {lang.get(name) for name in self.fluent_names}, {lang.get(name) for name in self.static_names}
+
+    def reachability_lp_template(self, problem, ground_actions=True, include_variable_inequalities=False):
+        """ Return the template with the rules of the reachability LP of the action schemas of the domain """
+        key = (ground_actions, include_variable_inequalities)
+        template = self.templates.get(key)
+        if template is None:
+            template = self.templates[key] = ReachabilityLPTemplate(problem, *key)
+        return template
+
+    def grounding_strategy(self, problem, **options):
+        """ Return a `LPGroundingStrategy` for the given problem of the domain that relies on this compilation """
+        from .lp_grounding import LPGroundingStrategy
+        return LPGroundingStrategy(problem, domain=self, **options)
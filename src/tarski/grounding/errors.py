@@ -12,3 +12,10 @@ class ReachabilityLPUnsolvable(TarskiError):
     def __init__(self, msg=None):
         msg = msg or 'The relaxed-reachabilty logic program is not solvable'
         super().__init__(msg)
+
+
+class GroundingTooLarge(TarskiError):
+    def __init__(self, what, estimate, budget):
+        self.estimate = estimate
+        self.budget = budget
+        super().__init__(f'Grounding of up to {estimate} {what} exceeds the budget of {budget}')
@@ -1,9 +1,12 @@
 """
  Classes and methods related to the Logic-Program based grounding  strategy of planning problems.
 """
-from ..utils.command import silentremove
-from ..grounding.ops import approximate_symbol_fluency
-from ..reachability import create_reachability_lp, run_clingo, parse_model
+import shutil
+from collections import defaultdict
+
+from ..grounding.ops import approximate_symbol_fluency, estimate_action_groundings, estimate_state_variables, \
+    check_grounding_budget
+from ..reachability import create_reachability_lp, run_clingo_streaming, run_datalog
 from ..reachability.asp import GOAL
 from .errors import ReachabilityLPUnsolvable
 from ..util import SymbolIndex
@@ -16,13 +19,29 @@ class LPGroundingStrategy:
     The type of LP created depends on the value of `ground_actions`. If true, it will include atoms for obtaining
     the parameter groundings of all reachable ground actions; if false, it will not, which should result in a smaller
     and cheaper logic program.
+    The logic program is solved with the gringo ASP grounder if `solver` is "gringo", or with the built-in Datalog
+    engine if it is "datalog". The default, "auto", uses gringo if the binary is on the PATH, and the built-in engine
+    otherwise. Both solvers compute the same model.
+    If a `GroundingCache` is given, the relevant part of the model of the logic program is looked up in the cache
+    before creating and solving the program, and stored in the cache afterwards.
+    If a `CompiledDomain` is given, the symbol fluency and the rules of the action schemas are taken from it, rather
+    than recomputed for the problem.
     """
-    def __init__(self, problem, ground_actions=True, include_variable_inequalities=False):
+    def __init__(self, problem, ground_actions=True, include_variable_inequalities=False, solver='auto', cache=None,
+                 domain=None):
+        if solver not in ('auto', 'gringo', 'datalog'):
+            raise RuntimeError(f'Unknown LP solver "{solver}"')
         self.problem = problem
         self.do_ground_actions = ground_actions
         self.include_variable_inequalities = include_variable_inequalities
+        self.solver = solver
+        self.cache = cache
+        self.domain = domain
         self.model = None  # We'll cache the solution of the LP here
-        self.fluent_symbols, self.static_symbols = approximate_symbol_fluency(problem)
+        if domain is not None:
+            self.fluent_symbols, self.static_symbols = domain.symbol_fluency(problem)
+        else:
+            self.fluent_symbols, self.static_symbols = approximate_symbol_fluency(problem)
 
     def ground_state_variables(self):
         """ Create and index all state variables of the problem by exhaustively grounding all predicate and function
@@ -30,17 +49,9 @@ class LPGroundingStrategy:
         fluent predicate "p" and one static predicate "q", and constants "a", "b", "c", the result of this operation
         will be the state variables "p(a)", "p(b)" and "p(c)".
         """
-        model = self._solve_lp()
-
         variables = SymbolIndex()
-        for symbol in self.fluent_symbols:
-            lang = symbol.language
-            key = 'atom_' + symbol.name
-            if key in model:  # in case there is no reachable ground state variable from that fluent symbol
-                for binding in model[key]:
-                    binding_with_constants = tuple(lang.get(c) for c in binding)
-                    variables.add(StateVariableLite(symbol, binding_with_constants))
-
+        for variable in self._iterate_state_variables():
+            variables.add(variable)
         return variables
 
     def ground_actions(self):
@@ -60,28 +71,84 @@ class LPGroundingStrategy:
     def iterate_over_schema_groundings(self, schema_name: str):
         """  Iterate over all reachable parameter groundings of the given action schema. """
         model = self._solve_lp()
-        return (x for x in model[schema_name]) if schema_name in model else []
+        key = "action_" + schema_name
+        return (x for x in model[key]) if key in model else iter(())
+
+    def estimate_state_variables(self):
+        """ Return an upper bound on the number of state variables of the problem, computed without solving the
+        logic program, from the cardinality of the sorts of the arguments of the fluent symbols. """
+        return estimate_state_variables(self.fluent_symbols)
+
+    def estimate_action_groundings(self):
+        """ Return a dictionary mapping the name of each action schema of the problem to an upper bound on the
+        number of its reachable parameter groundings, computed without solving the logic program. """
+        return estimate_action_groundings(self.problem)
+
+    def iterate_state_variables(self, budget=None):
+        """ Return an iterator over the state variables returned by `ground_state_variables`, which are created
+        lazily from the model of the logic program, one at a time. If a `budget` is given and the estimated number of
+        state variables exceeds it, `GroundingTooLarge` is raised right away, before the logic program is solved. """
+        check_grounding_budget(self.estimate_state_variables(), budget, 'state variables')
+        return self._iterate_state_variables()
+
+    def _iterate_state_variables(self):
+        model = self._solve_lp()
+        for symbol in self.fluent_symbols:
+            lang = symbol.language
+            for binding in model.get('atom_' + symbol.name, ()):
+                yield StateVariableLite(symbol, tuple(lang.get(c) for c in binding))
+
+    def iterate_ground_actions(self, budget=None):
+        """ Return an iterator over pairs (schema name, parameter grounding) with the groundings returned by
+        `ground_actions`. If a `budget` is given and the estimated number of ground actions exceeds it,
+        `GroundingTooLarge` is raised right away, before the logic program is solved. """
+        if not self.do_ground_actions:
+            raise RuntimeError('Cannot retrieve set of ground actions from LPGroundingStrategy '
+                               'configured with ground_actions=False')
+        check_grounding_budget(sum(self.estimate_action_groundings().values()), budget, 'ground actions')
+        return ((name, grounding) for name in self.problem.actions
+                for grounding in self.iterate_over_schema_groundings(name))
 
     def _solve_lp(self):
-        if self.model is None:
-            lp, tr = create_reachability_lp(self.problem, self.do_ground_actions, self.include_variable_inequalities)
-            model_filename, theory_filename = run_clingo(lp)
-            self.model = parse_model(model_filename, tr)
+        if self.model is None and self.cache is not None:
+            key = self.cache.key(self.problem, 'lp', self.do_ground_actions, self.include_variable_inequalities)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.model = defaultdict(set, ((symbol, set(rows)) for symbol, rows in cached.items()))
+            else:
+                self.model = self._compute_model()
+                # Only the atoms of state variables and actions, and the goal, are used in the grounding
+                self.cache.put(key, {symbol: extension for symbol, extension in self.model.items()
+                                     if symbol == GOAL or symbol.startswith(('atom_', 'action_'))})
 
-            # Remove the input and output files for Gringo
-            silentremove(model_filename)
-            silentremove(theory_filename)
+        if self.model is None:
+            self.model = self._compute_model()
 
-            if len(self.model[GOAL]) != 1:
-                raise ReachabilityLPUnsolvable()
+        if len(self.model[GOAL]) != 1:
+            raise ReachabilityLPUnsolvable()
         return self.model
 
+    def _compute_model(self):
+        template = None
+        if self.domain is not None:
+            template = self.domain.reachability_lp_template(
+                self.problem, self.do_ground_actions, self.include_variable_inequalities)
+
+        if self.solver == 'datalog' or (self.solver == 'auto' and shutil.which("gringo") is None):
+            lp, tr = create_reachability_lp(self.problem, self.do_ground_actions, self.include_variable_inequalities,
+                                            template=template)
+            return run_datalog(lp, tr)
+
+        # Stream the rules into gringo as they are generated
+        return run_clingo_streaming(lambda lp: create_reachability_lp(
+            self.problem, self.do_ground_actions, self.include_variable_inequalities, lp=lp, template=template)[1])
+
     def __str__(self):
         return 'LPGroundingStrategy["{}"]'.format(self.problem.name)
 
     __repr__ = __str__
 
 
-def compute_action_groundings(problem, include_variable_inequalities=False):
-    grounding = LPGroundingStrategy(problem, True, include_variable_inequalities)
+def compute_action_groundings(problem, include_variable_inequalities=False, solver='auto'):
+    grounding = LPGroundingStrategy(problem, True, include_variable_inequalities, solver=solver)
     return grounding.ground_actions()
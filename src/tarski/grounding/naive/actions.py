@@ -3,6 +3,7 @@ import itertools
 import copy
 
 from ...syntax import create_substitution, TermSubstitution
+from ...syntax.transform.templates import ExpressionTemplate
 from ... import fstrips as fs
 from ...util import SymbolIndex
 from . import instantiation
@@ -25,12 +26,19 @@ class ActionGrounder:
     def calculate_actions(self):
         for act_schema in self.schemas:
             k, syms, substs = instantiation.enumerate_groundings(act_schema.parameters)
+            # Choice effects are processed with a full substitution, as they bind further variables
+            precondition = ExpressionTemplate(act_schema.precondition, syms)
+            effects = [None if isinstance(eff, fs.ChoiceEffect) else ExpressionTemplate(eff, syms)
+                       for eff in act_schema.effects]
             for values in itertools.product(*substs):
-                subst = create_substitution(syms, values)
-                op = TermSubstitution(subst)
-                g_prec = process_expression(self.L, act_schema.precondition, op)
+                op = None
+                g_prec = precondition.instantiate(values)
                 g_effs = []
-                for eff in act_schema.effects:
+                for eff, template in zip(act_schema.effects, effects):
+                    if template is not None:
+                        g_effs.append(template.instantiate(values))
+                        continue
+                    op = op or TermSubstitution(create_substitution(syms, values))
                     g_eff = copy.deepcopy(eff)
                     g_eff.condition = process_expression(self.L, g_eff.condition, op, False)
                     g_eff = process_effect(self.L, g_eff, op)
@@ -3,14 +3,19 @@
 """
 import itertools
 
-from ..grounding.ops import approximate_symbol_fluency
-from ..syntax import Constant, Variable, CompoundTerm, Atom, create_substitution, term_substitution,\
-    termlists_are_equal, termlist_hash
+from ..grounding.ops import approximate_symbol_fluency, estimate_action_groundings, estimate_state_variables, \
+    check_grounding_budget
+from ..evaluators.joins import ConjunctiveQuery, decompose_conjunction
+from ..syntax import Constant, Variable, CompoundTerm, Atom, Tautology, create_substitution, term_substitution,\
+    termlists_are_equal, termlist_hash, is_and, builtins
+from ..syntax.ops import collect_unique_nodes
 from ..errors import DuplicateDefinition
 from .errors import UnableToGroundError
 from .common import StateVariableLite
 from ..util import SymbolIndex
 from ..fstrips.visitors import FluentSymbolCollector, FluentHeuristic
+from .cache import state_variable_rows, state_variables_from_rows, is_cacheable
+from .parallel import can_ground_in_parallel, ground_schemas_in_parallel
 
 
 class ProblemGrounding:
@@ -110,9 +115,21 @@ class NaiveGroundingStrategy:
     """ A naive problem grounding grounds actions and state variables of a lifted Tarski problem by (type-informed)
     exhaustive enumeration of all possible subsitutions of the representation variables.
     Note: This is a lightweight version of the ProblemGrounding class above, hoping that it can eventually replace it.
+    If a `GroundingCache` is given, results are looked up in it before computing them, and stored in it afterwards.
+    If `workers` is larger than one, action schemas are grounded in parallel by that number of worker processes,
+    where the platform allows it.
+    If `static_pruning` is true, only the groundings of each action schema that satisfy the static part of its
+    precondition in the initial state are returned, i.e. the conjuncts of the precondition that mention static symbols
+    only. These groundings are enumerated by joining the extensions of the static atoms of the precondition, see
+    `static_query`, rather than by exhaustive enumeration.
     """
-    def __init__(self, problem, ignore_symbols=None):
+    def __init__(self, problem, ignore_symbols=None, cache=None, workers=1, static_pruning=False):
         self.problem = problem
+        self.ignore_symbols = sorted(ignore_symbols) if ignore_symbols else []
+        self.cache = cache
+        self.workers = workers
+        self.static_pruning = static_pruning
+        self._queries = dict()
         self.fluent_symbols, self.static_symbols = approximate_symbol_fluency(problem)
         if ignore_symbols:  # Remove undesired symbols if necessary
             self.fluent_symbols = {s for s in self.fluent_symbols if s.name not in ignore_symbols}
@@ -124,33 +141,131 @@ class NaiveGroundingStrategy:
         fluent predicate "p" and one static predicate "q", and constants "a", "b", "c", the result of this operation
         will be the state variables "p(a)", "p(b)" and "p(c)".
         """
-        return ground_symbols_exhaustively(self.fluent_symbols)
+        lang = self.problem.language
+        key, cached = self._lookup('variables')
+        if cached is not None:
+            return state_variables_from_rows(lang, cached['variables'])
+
+        variables = ground_symbols_exhaustively(self.fluent_symbols)
+        if key is not None and all(is_cacheable(lang, v.binding) for v in variables):
+            self.cache.put(key, {'variables': state_variable_rows(variables)})
+        return variables
+
+    def estimate_state_variables(self):
+        """ Return an upper bound on the number of state variables of the problem, computed without grounding """
+        return estimate_state_variables(self.fluent_symbols)
+
+    def estimate_action_groundings(self):
+        """ Return a dictionary mapping the name of each action schema of the problem to an upper bound on the
+        number of its parameter groundings, computed without grounding. """
+        return estimate_action_groundings(self.problem)
+
+    def iterate_state_variables(self, budget=None):
+        """ Return an iterator over the state variables returned by `ground_state_variables`, which are generated
+        lazily, one at a time. If a `budget` is given and the estimated number of state variables exceeds it,
+        `GroundingTooLarge` is raised right away, before generating any state variable. """
+        check_grounding_budget(self.estimate_state_variables(), budget, 'state variables')
+        return iterate_symbol_groundings(self.fluent_symbols)
+
+    def iterate_ground_actions(self, budget=None):
+        """ Return an iterator over pairs (schema name, parameter grounding) with the groundings returned by
+        `ground_actions`, which are generated lazily, one at a time, and in the same order. If a `budget` is given and
+        the estimated number of ground actions exceeds it, `GroundingTooLarge` is raised right away, before generating
+        any ground action. """
+        check_grounding_budget(sum(self.estimate_action_groundings().values()), budget, 'ground actions')
+        return ((action.name, grounding) for action in self.problem.actions.values()
+                for grounding in self.schema_groundings(action))
 
     def ground_actions(self):
         """  Return a dictionary mapping each action schema of the problem to the set of parameter groundings that
         make that schema a reachable ground action. """
-        groundings = dict()
-        for aname, action in self.problem.actions.items():
-            domains = [p.sort.domain() for p in action.parameters]
-            groundings[aname] = list(itertools.product(*domains))
+        lang = self.problem.language
+        key, cached = self._lookup('actions')
+        if cached is not None:
+            constants = {str(c.symbol): c for c in lang.constants()}
+            return {aname: [tuple(constants[c] for c in row) for row in rows] for aname, rows in cached.items()}
+
+        schemas = list(self.problem.actions.values())
+        if self.workers > 1 and can_ground_in_parallel():
+            groundings = ground_schemas_in_parallel(self, schemas, self.workers)
+        else:
+            groundings = {action.name: list(self.schema_groundings(action)) for action in schemas}
+
+        if key is not None and all(is_cacheable(lang, p.sort.domain()) for action in self.problem.actions.values()
+                                   for p in action.parameters):
+            self.cache.put(key, {aname: [tuple(str(c.symbol) for c in grounding) for grounding in groundings_]
+                                 for aname, groundings_ in groundings.items()})
         return groundings
 
+    def schema_groundings(self, action, restriction=None):
+        """ Return an iterator over all parameter groundings of the given action schema, or only over those where the
+        first parameter takes a value in the given list of objects, if `restriction` is not None. """
+        if self.static_pruning:
+            restrictions = None if restriction is None else {0: {c.symbol for c in restriction}}
+            return self.static_query(action).answers(self.problem.init, restrictions=restrictions)
+
+        domains = [p.sort.domain() for p in action.parameters]
+        if restriction is not None:
+            domains[0] = restriction
+        return itertools.product(*domains)
+
+    def static_query(self, action):
+        """ Return the conjunctive query over the parameters of the given action schema whose answers in the initial
+        state are the groundings that satisfy the static part of the schema precondition. The answers are computed by
+        joining the extensions of the static atoms through hash indexes on their bound arguments, in an order that
+        starts with the most selective atoms, as estimated from the size of their extensions. """
+        query = self._queries.get(action.name)
+        if query is None:
+            atoms, filters = [], []
+            for phi in _conjuncts(action.precondition):
+                if self._is_static(phi):
+                    a, f = decompose_conjunction(phi)
+                    atoms += a
+                    filters += f
+            query = self._queries[action.name] = ConjunctiveQuery(action.parameters, atoms, filters)
+        return query
+
+    def _is_static(self, phi):
+        symbols = (node.symbol for node in collect_unique_nodes(phi, lambda x: isinstance(x, (Atom, CompoundTerm))))
+        return all(s in self.static_symbols or builtins.is_builtin_predicate(s) or builtins.is_builtin_function(s)
+                   for s in symbols)
+
+    def _lookup(self, what):
+        """ Return the cache key for the given kind of result, plus the cached result, if any """
+        if self.cache is None:
+            return None, None
+        key = self.cache.key(self.problem, 'naive', what, self.ignore_symbols, self.static_pruning)
+        return key, self.cache.get(key)
+
     def __str__(self):
         return 'NaiveGroundingStrategy["{}"]'.format(self.problem.name)
 
     __repr__ = __str__
 
 
+def _conjuncts(phi):
+    """ Return the list of conjuncts of the given formula, flattening nested conjunctions """
+    if isinstance(phi, Tautology):
+        return []
+    if is_and(phi):
+        return [c for sub in phi.subformulas for c in _conjuncts(sub)]
+    return [phi]
+
+
 def ground_symbols_exhaustively(symbols):
     """ Creates an index with all possible groundings of the given predicate and function symbols
     in the given language """
     variables = SymbolIndex()
+    for variable in iterate_symbol_groundings(symbols):
+        variables.add(variable)
+    return variables
+
 
+def iterate_symbol_groundings(symbols):
+    """ Iterate lazily over all possible groundings of the given predicate and function symbols, as state variables """
     for symbol in symbols:
         # We need to consider full sort for predicates, domain only for functions
         domains = [s.domain() for s in symbol.domain]
 
         for binding in itertools.product(*domains):
-            variables.add(StateVariableLite(symbol, binding))
-
-    return variables
+            yield StateVariableLite(symbol, binding)
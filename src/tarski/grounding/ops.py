@@ -1,6 +1,7 @@
 
 from ..syntax.util import get_symbols
 from ..fstrips.ops import collect_affected_symbols
+from .errors import GroundingTooLarge
 
 
 def approximate_symbol_fluency(problem, include_builtin=False):
@@ -24,3 +25,30 @@ def approximate_symbol_fluency(problem, include_builtin=False):
     allsymbols = set(get_symbols(problem.language, include_builtin=include_builtin))
     statics = allsymbols.difference(fluents)
     return fluents, statics
+
+
+def estimate_groundings(sorts):
+    """ Return an upper bound on the number of groundings of a sequence of variables with the given sorts, i.e. the
+    product of the cardinalities of the sorts, without enumerating any of them. """
+    estimate = 1
+    for sort in sorts:
+        estimate *= sort.cardinality()
+    return estimate
+
+
+def estimate_action_groundings(problem):
+    """ Return a dictionary mapping the name of each action schema of the given problem to an upper bound on the
+    number of its ground actions, based on the cardinality of the sorts of its parameters. """
+    return {name: estimate_groundings(p.sort for p in action.parameters) for name, action in problem.actions.items()}
+
+
+def estimate_state_variables(symbols):
+    """ Return an upper bound on the number of state variables that result from grounding the given predicate and
+    function symbols, based on the cardinality of the sorts of their arguments. """
+    return sum(estimate_groundings(symbol.domain) for symbol in symbols)
+
+
+def check_grounding_budget(estimate, budget, what):
+    """ Raise `GroundingTooLarge` if the given estimated number of elements exceeds the given budget, if any """
+    if budget is not None and estimate > budget:
+        raise GroundingTooLarge(what, estimate, budget)
@@ -0,0 +1,62 @@
+"""
+    Parallel grounding of action schemas over a pool of worker processes.
+"""
+import multiprocessing
+
+# The grounding strategy used by the worker processes, which inherit it from the parent process when forked, so that
+# neither the problem nor its language need to be serialized
+_strategy = None
+
+
+def can_ground_in_parallel():
+    """ Return true iff worker processes can be forked on this platform """
+    return 'fork' in multiprocessing.get_all_start_methods()
+
+
+def ground_schemas_in_parallel(strategy, schemas, workers, chunks_per_worker=4):
+    """ Return a dictionary mapping the name of each of the given action schemas to the list of its parameter
+    groundings computed by the given strategy. The order of the groundings is deterministic: the groundings of each
+    chunk (see below) come in the order in which the strategy enumerates them, and chunks come in order; for an
+    exhaustive enumeration this is exactly the order of a sequential execution.
+
+    The strategy must implement a method `schema_groundings(action, restriction)` that returns an iterable over the
+    groundings (tuples of constants) of the given schema whose first parameter takes a value in the given list of
+    objects, or all of them if `restriction` is None. The groundings of each schema are split into chunks according
+    to the value of the first parameter, so that the work can be balanced over the given number of workers even when
+    there are few schemas. Workers are forked from the current process, and thus share the problem with it at no cost,
+    and send back each grounding as the tuple of the positions of its objects in the domains of the parameter sorts.
+    """
+    tasks, domains = [], dict()
+    for action in schemas:
+        domains[action.name] = [list(p.sort.domain()) for p in action.parameters]
+        if not action.parameters:
+            tasks.append((action.name, None, None))
+            continue
+        n = len(list(action.parameters[0].sort.domain()))
+        size = max(1, -(-n // (workers * chunks_per_worker)))  # i.e. ceil(n / (workers * chunks_per_worker))
+        tasks.extend((action.name, i, i + size) for i in range(0, n, size))
+
+    global _strategy  # pylint: disable=global-statement
+    _strategy = strategy
+    try:
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            results = pool.map(_ground_chunk, tasks, chunksize=1)
+    finally:
+        _strategy = None
+
+    groundings = {action.name: [] for action in schemas}
+    for (name, _, _), positions in zip(tasks, results):
+        parameter_domains = domains[name]
+        groundings[name].extend(tuple(domain[i] for domain, i in zip(parameter_domains, grounding))
+                                for grounding in positions)
+    return groundings
+
+
+def _ground_chunk(task):
+    name, start, stop = task
+    action = _strategy.problem.get_action(name)
+    domains = [list(p.sort.domain()) for p in action.parameters]
+    positions = [{c.symbol: i for i, c in enumerate(domain)} for domain in domains]
+    restriction = None if start is None else domains[0][start:stop]
+    return [tuple(index[c.symbol] for index, c in zip(positions, grounding))
+            for grounding in _strategy.schema_groundings(action, restriction)]
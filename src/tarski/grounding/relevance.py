@@ -0,0 +1,184 @@
+"""
+    Backward relevance analysis, to prune the ground actions and state variables that cannot contribute to
+    achieving the goal of a planning problem.
+"""
+from collections import defaultdict
+
+from .. import fstrips as fs
+from ..evaluators.incremental import dependencies
+from ..fstrips.action import PlainOperator
+from ..syntax import Constant
+from ..syntax.transform.action_grounding import ground_schema_into_plain_operator_from_grounding
+from ..util import SymbolIndex
+
+
+class RelevanceGroundingStrategy:
+    """ A grounding strategy that refines the (forward) reachability analysis of some other grounding strategy, e.g.
+    a `LPGroundingStrategy`, with a backward relevance analysis: the goal atoms are relevant; so are the atoms
+    mentioned in the precondition or effect conditions of any ground action with an effect on some relevant atom,
+    and so on until a fixpoint is reached. Ground actions without an effect on any relevant atom, and state variables
+    that are not relevant, are then removed from the output of the underlying strategy.
+
+    Atoms are identified by their symbol and the names of their arguments. Expressions whose arguments are not all
+    constants, e.g. clear(loc(b)) or atoms with quantified variables, make all atoms of their symbol relevant.
+    State constraints are taken to be as relevant as the goal.
+
+    A relevant ground action can still have effects on irrelevant atoms. The ground operators returned by
+    `ground_operators` have these effects removed, so that they only change the state variables returned by
+    `ground_state_variables`. The latter thus also keeps the atoms that a kept effect can change besides relevant
+    ones, e.g. those of a universal effect, and all atoms of the symbols that a kept effect changes through
+    non-constant arguments, e.g. the atoms clear(p) for an effect on clear(loc(b)). Ground actions obtained from the
+    groundings returned by `ground_actions` keep all of their effects instead.
+    """
+    def __init__(self, grounding):
+        self.grounding = grounding
+        self.problem = grounding.problem
+        self._relevant = None
+
+    def ground_state_variables(self):
+        """ Return the index of state variables of the underlying strategy that are relevant to the goal, or that
+        can be changed by the operators returned by `ground_operators` """
+        relevant = self._compute()
+        variables = SymbolIndex()
+        for variable in self.grounding.ground_state_variables():
+            key = (variable.symbol, tuple(c.symbol for c in variable.binding))
+            if relevant.is_relevant(key) or key in relevant.changed_keys or variable.symbol in relevant.changed_symbols:
+                variables.add(variable)
+        return variables
+
+    def ground_actions(self):
+        """ Return a dictionary mapping each action schema of the problem to the list of parameter groundings of the
+        underlying strategy that result in a ground action with some effect on an atom relevant to the goal. """
+        return self._compute().actions
+
+    def ground_operators(self):
+        """ Return the list of ground operators that result from the groundings returned by `ground_actions`, in the
+        same order, without their effects on atoms that are not relevant to the goal. """
+        return self._compute().operators
+
+    def _compute(self):
+        if self._relevant is None:
+            self._relevant = RelevanceAnalysis(self.problem, self.grounding.ground_actions())
+        return self._relevant
+
+    def __str__(self):
+        return 'RelevanceGroundingStrategy["{}"]'.format(self.problem.name)
+
+    __repr__ = __str__
+
+
+class RelevanceAnalysis:
+    """ The fixpoint of the backward relevance analysis of the given problem over the given ground actions, a
+    dictionary from schema names to parameter groundings. After construction, `actions` holds the relevant
+    groundings of each schema, in their original order, `operators` the corresponding ground operators without
+    their effects on irrelevant atoms, and `is_relevant` tells whether an atom is relevant. """
+    def __init__(self, problem, groundings):
+        self.keys = set()  # The relevant atoms and terms, as pairs (symbol, tuple of argument names)
+        self.symbols = set()  # The symbols all of whose atoms and terms are relevant
+        self.by_key = defaultdict(list)  # The indexes of the ground actions with an effect on each atom
+        self.by_symbol = defaultdict(list)  # The indexes of the ground actions with an effect on atoms of each symbol
+        self.any_of_symbol = defaultdict(list)  # The indexes of the actions with an effect on unknown atoms of a symbol
+        self.queue = []
+
+        operators, self.triggers = [], []
+        for name, bindings in groundings.items():
+            action = problem.get_action(name)
+            for binding in bindings:
+                operator = ground_schema_into_plain_operator_from_grounding(action, binding)
+                targets, requirements, unconditional = set(), set(), False
+                for eff in operator.effects:
+                    unconditional |= _analyze_effect(eff, targets, requirements)
+                operators.append((name, binding, operator))
+                self.triggers.append(dependencies(operator.precondition) | requirements)
+                index = len(operators) - 1
+                if unconditional:
+                    self.queue.append(index)
+                for target in targets:
+                    if isinstance(target, tuple):
+                        self.by_key[target].append(index)
+                        self.by_symbol[target[0]].append(index)
+                    else:
+                        self.any_of_symbol[target].append(index)
+
+        self.relevant = [False] * len(operators)
+        self._require(dependencies(problem.goal))
+        for constraint in problem.constraints:
+            self._require(dependencies(constraint))
+        self._propagate()
+
+        self.actions = {name: [] for name in groundings}
+        self.operators = []
+        self.changed_keys = set()  # The atoms and terms that some kept effect can change
+        self.changed_symbols = set()  # The symbols of the atoms changed by some kept effect with non-constant arguments
+        self._relevant_symbols = self.symbols | {key[0] for key in self.keys}
+        for index, (name, binding, operator) in enumerate(operators):
+            if self.relevant[index]:
+                self.actions[name].append(binding)
+                effects = [eff for eff in operator.effects if self._is_relevant_effect(eff)]
+                self.operators.append(PlainOperator(operator.language, operator.name, operator.precondition, effects))
+
+    def is_relevant(self, key):
+        """ Return true iff the atom or term with the given key (symbol, tuple of argument names) is relevant """
+        return key in self.keys or key[0] in self.symbols
+
+    def _is_relevant_effect(self, eff):
+        """ Return true iff the given effect can change some relevant atom or term, or is of an unknown type """
+        targets = set()
+        if _analyze_effect(eff, targets, set()):
+            return True
+        keys = [t for t in targets if isinstance(t, tuple)]
+        symbols = [t for t in targets if not isinstance(t, tuple)]
+        if not any(self.is_relevant(key) for key in keys) and not any(s in self._relevant_symbols for s in symbols):
+            return False
+        self.changed_keys.update(keys)
+        self.changed_symbols.update(symbols)
+        return True
+
+    def _require(self, keys):
+        for key in keys:
+            if isinstance(key, tuple):
+                if key in self.keys or key[0] in self.symbols:
+                    continue
+                self.keys.add(key)
+                self.queue.extend(self.by_key.get(key, ()))
+                self.queue.extend(self.any_of_symbol.get(key[0], ()))
+            elif key not in self.symbols:
+                self.symbols.add(key)
+                self.queue.extend(self.by_symbol.get(key, ()))
+                self.queue.extend(self.any_of_symbol.get(key, ()))
+
+    def _propagate(self):
+        while self.queue:
+            index = self.queue.pop()
+            if not self.relevant[index]:
+                self.relevant[index] = True
+                self._require(self.triggers[index])
+
+
+def _analyze_effect(eff, targets, requirements):
+    """ Add to `targets` the keys of the atoms and terms the given effect can change, and to `requirements` those of
+    the atoms and terms that the effect depends on. Return true iff the effect is of an unknown type, in which case
+    the action is conservatively considered relevant. """
+    requirements.update(dependencies(eff.condition))
+    if isinstance(eff, (fs.AddEffect, fs.DelEffect)):
+        _add_target(eff.atom, targets, requirements)
+    elif isinstance(eff, fs.LiteralEffect):
+        for key in dependencies(eff.lit):
+            targets.add(key)
+    elif isinstance(eff, fs.FunctionalEffect):
+        _add_target(eff.lhs, targets, requirements)
+        requirements.update(dependencies(eff.rhs))
+    elif isinstance(eff, fs.UniversalEffect):
+        return any([_analyze_effect(sub, targets, requirements) for sub in eff.effects])
+    else:
+        return True
+    return False
+
+
+def _add_target(expression, targets, requirements):
+    if all(isinstance(t, Constant) for t in expression.subterms):
+        targets.add((expression.symbol, tuple(t.symbol for t in expression.subterms)))
+        return
+    targets.add(expression.symbol)
+    for t in expression.subterms:
+        requirements.update(dependencies(t))
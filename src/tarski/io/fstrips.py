@@ -50,12 +50,22 @@ class FstripsReader:
         return self.problem
 
     def parse_file(self, filename, start_rule):
+        self.parser.visit(self.parse_tree(filename, start_rule))
+
+    def parse_tree(self, filename, start_rule):
+        """ Return the parse tree of the given file, without processing it. The tree can be processed later on by this
+        or any other reader, e.g. through `parse_domain_tree`, so that a domain file shared by many problems needs to
+        be parsed only once. """
         logging.debug('Parsing filename "{}" from grammar rule "{}"'.format(filename, start_rule))
-        domain_parse_tree, _ = self.parser.parse_file(filename, start_rule)
-        self.parser.visit(domain_parse_tree)
+        tree, _ = self.parser.parse_file(filename, start_rule)
+        return tree
 
     def parse_domain(self, filename):
-        self.parse_file(filename, 'domain')
+        self.parse_domain_tree(self.parse_tree(filename, 'domain'))
+
+    def parse_domain_tree(self, tree):
+        """ Process the given domain parse tree, as returned by `parse_tree` """
+        self.parser.visit(tree)
         uniformize_costs(self.problem)
 
     def parse_instance(self, filename):
@@ -0,0 +1,48 @@
+"""
+    A writer for the SAS format of the Fast Downward planner, see https://www.fast-downward.org/TranslatorOutputFormat
+"""
+
+
+class SASWriter:
+    """ Write a planning problem in finite-domain representation, as returned by
+    `tarski.fstrips.fdr.translate_to_fdr`, in the SAS format that the Fast Downward search component reads. """
+
+    def __init__(self, task):
+        self.task = task
+
+    def write(self, filename):
+        with open(filename, 'w') as file:
+            file.write(self.print())
+
+    def print(self):
+        """ Return the content of the SAS file as a string """
+        task = self.task
+        lines = ['begin_version', '3', 'end_version', 'begin_metric', '1' if task.use_costs else '0', 'end_metric']
+
+        lines.append(str(len(task.variables)))
+        for variable in task.variables:
+            lines += ['begin_variable', variable.name, '-1', str(len(variable.values))]
+            lines += variable.values
+            lines.append('end_variable')
+
+        lines.append(str(len(task.mutex_groups)))
+        for group in task.mutex_groups:
+            lines += ['begin_mutex_group', str(len(group))]
+            lines += [f'{var} {value}' for var, value in group]
+            lines.append('end_mutex_group')
+
+        lines += ['begin_state'] + [str(value) for value in task.init] + ['end_state']
+        lines += ['begin_goal', str(len(task.goal))] + [f'{var} {value}' for var, value in task.goal] + ['end_goal']
+
+        lines.append(str(len(task.operators)))
+        for op in task.operators:
+            lines += ['begin_operator', op.name, str(len(op.prevail))]
+            lines += [f'{var} {value}' for var, value in op.prevail]
+            lines.append(str(len(op.effects)))
+            for conditions, var, pre, post in op.effects:
+                tokens = [str(len(conditions))] + [f'{v} {x}' for v, x in conditions] + [str(var), str(pre), str(post)]
+                lines.append(' '.join(tokens))
+            lines += [str(op.cost), 'end_operator']
+
+        lines.append('0')  # No axioms
+        return '\n'.join(lines) + '\n'
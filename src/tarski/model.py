@@ -1,6 +1,7 @@
 from . import errors as err
 from .syntax import Function, Constant, CompoundTerm, symref
 from .syntax.predicate import Predicate
+from .utils.hashing import mix64
 
 
 def _check_assignment(fun, point, value=None):
@@ -22,6 +23,10 @@ def _check_assignment(fun, point, value=None):
             element = Constant(expected_type.cast(element), expected_type)
             # raise err.IncorrectExtensionDefinition(fun, point, value)
 
+        elif expected_type.builtin and element.sort.builtin and element.sort != expected_type:
+            # e.g. the Integer that results from some arithmetic operation, to be assigned to a term of interval sort
+            element = Constant(expected_type.cast(element.symbol), expected_type)
+
         if element.language != language:
             raise err.LanguageMismatch(element, element.language, language)
 
@@ -38,13 +43,62 @@ def _check_assignment(fun, point, value=None):
 
 
 class Model:
-    """ A First Order Language Model """
+    """ A First Order Language Model.
+
+    Models support cheap copies through the `copy()` method: the copy shares all predicate and function extensions
+    with the original model, and an extension is only duplicated (by whichever of the two models) the first time it
+    gets modified. This makes the progression of a state through an action proportional to the size of the
+    extensions of the symbols affected by the action, rather than to the size of the full state.
+
+    Models are hashable and can be compared for equality, which makes it possible to e.g. store them on sets for the
+    purpose of duplicate detection. The hash is a Zobrist-like hash, i.e. the XOR of a pseudo-random key for each
+    true atom and each function value of the model, which is updated incrementally every time the model is modified.
+    Note that, as a consequence, modifying a model that has been inserted in some set or dictionary will break that
+    container.
+    """
 
     def __init__(self, language, evaluator=None):
         self.evaluator = evaluator
         self.language = language
         self.function_extensions = dict()
         self.predicate_extensions = dict()
+        # The signatures of those extensions that are not shared with any other model, and can hence be modified inplace
+        self._owned_predicates = set()
+        self._owned_functions = set()
+        self._hash = 0
+
+    def copy(self):
+        """ Return a copy of the current model that shares all extensions with it until they are modified. """
+        other = Model(self.language, self.evaluator)
+        other.predicate_extensions = self.predicate_extensions.copy()
+        other.function_extensions = self.function_extensions.copy()
+        other._hash = self._hash
+        # From now on, all extensions are shared, hence neither this model nor the copy can modify them inplace
+        self._owned_predicates.clear()
+        self._owned_functions.clear()
+        return other
+
+    def _writable_predicate_extension(self, signature):
+        """ Return the extension of the predicate with given signature, making sure it is safe to modify it inplace. """
+        definition = self.predicate_extensions.get(signature)
+        if definition is None:
+            definition = self.predicate_extensions[signature] = set()
+        elif signature not in self._owned_predicates:
+            definition = self.predicate_extensions[signature] = definition.copy()
+        self._owned_predicates.add(signature)
+        return definition
+
+    def _writable_function_extension(self, signature):
+        """ Return the extension of the function with given signature, making sure it is safe to modify it inplace. """
+        definition = self.function_extensions.get(signature)
+        if definition is None:
+            definition = self.function_extensions[signature] = ExtensionalFunctionDefinition()
+        elif not isinstance(definition, ExtensionalFunctionDefinition):
+            raise err.SemanticError("Cannot define extension of intensional definition")
+        elif signature not in self._owned_functions:
+            definition = self.function_extensions[signature] = definition.copy()
+        self._owned_functions.add(signature)
+        return definition
 
     def setx(self, term: CompoundTerm, value: Constant):
         """ Set the value of the interpretation on the given term to be equal to `value`. """
@@ -56,11 +110,23 @@ class Model:
             if not isinstance(st, Constant):
                 raise err.SemanticError(f"Model.set(): subterms of '{term}' need to be constants")
         point, value = _check_assignment(term.symbol, tuple(term.subterms), value)
-        definition = self.function_extensions.setdefault(term.symbol.signature, ExtensionalFunctionDefinition())
-        if not isinstance(definition, ExtensionalFunctionDefinition):
-            raise err.SemanticError("Cannot define extension of intensional definition")
-
-        definition.set(point, value)
+        signature = term.symbol.signature
+        definition = self._writable_function_extension(signature)
+        point = wrap_tuple(point)
+        previous = definition.data.get(point)
+        if previous is not None:
+            self._hash ^= _zobrist_key(signature, point, symref(previous))
+        definition.data[point] = value
+        self._hash ^= _zobrist_key(signature, point, symref(value))
+
+    def unset(self, term: CompoundTerm):
+        """ Remove the value of the interpretation on the given term, which must have some value. """
+        point, signature = wrap_tuple(tuple(term.subterms)), term.symbol.signature
+        definition = self.function_extensions.get(signature)
+        if not isinstance(definition, ExtensionalFunctionDefinition) or point not in definition.data:
+            raise KeyError(point)
+        value = self._writable_function_extension(signature).data.pop(point)
+        self._hash ^= _zobrist_key(signature, point, symref(value))
 
     def set(self, fun, *args):
         """ Set the value of fun(args[:-1]) to be args[-1] for the current interpretation """
@@ -78,12 +144,19 @@ class Model:
             raise err.SemanticError("Model.add() can only set the value of predicate symbols")
         if predicate.builtin:
             raise err.SemanticError(f"Model.add() attempted to redefine builtin symbol '{predicate}'")
-        point = _check_assignment(predicate, args)
-        definition = self.predicate_extensions.setdefault(predicate.signature, set())
-        definition.add(wrap_tuple(point))
+        point = wrap_tuple(_check_assignment(predicate, args))
+        signature = predicate.signature
+        definition = self.predicate_extensions.get(signature)
+        if definition is None or point not in definition:
+            self._writable_predicate_extension(signature).add(point)
+            self._hash ^= _zobrist_key(signature, point)
 
     def remove(self, predicate: Predicate, *args):
-        self.predicate_extensions[predicate.signature].remove(wrap_tuple(args))
+        point, signature = wrap_tuple(args), predicate.signature
+        if point not in self.predicate_extensions.get(signature, ()):
+            raise KeyError(point)
+        self._writable_predicate_extension(signature).remove(point)
+        self._hash ^= _zobrist_key(signature, point)
 
     def value(self, fun: Function, point):
         """ Return the value of the given function on the given point in the current model """
@@ -152,6 +225,17 @@ class Model:
             # MRJ: This for expressions that have the __getitem__ operator overloaded
             return self.evaluator(arg, self)
 
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, Model) or self._hash != other._hash or self.language != other.language:
+            return False
+        return _extensions_are_equal(self.predicate_extensions, other.predicate_extensions, _sets_are_equal) and \
+            _extensions_are_equal(self.function_extensions, other.function_extensions, _definitions_are_equal)
+
     def __str__(self):
         npreds = len(self.predicate_extensions)
         nfuns = len(self.function_extensions)
@@ -176,6 +260,12 @@ class ExtensionalFunctionDefinition:
     def get(self, point):
         return self.data[wrap_tuple(point)]
 
+    def copy(self):
+        """ Return a shallow copy of the definition, i.e. one that can be modified without affecting this one. """
+        other = ExtensionalFunctionDefinition()
+        other.data = self.data.copy()
+        return other
+
     def __len__(self):
         return len(self.data)
 
@@ -186,6 +276,36 @@ class ExtensionalFunctionDefinition:
 #     pass
 
 
+def _zobrist_key(*elements):
+    """ Return a pseudo-random 64-bit key for the atom or function assignment given by the given elements """
+    return mix64(hash(elements))
+
+
+def _extensions_are_equal(extensions1, extensions2, are_equal):
+    """ Return true iff the two given mappings from signatures to extensions contain the same non-empty extensions """
+    for signature in set(extensions1.keys()) | set(extensions2.keys()):
+        ext1, ext2 = extensions1.get(signature), extensions2.get(signature)
+        if ext1 is not ext2 and not are_equal(ext1 or (), ext2 or ()):
+            return False
+    return True
+
+
+def _sets_are_equal(ext1, ext2):
+    return len(ext1) == len(ext2) and all(x in ext2 for x in ext1)
+
+
+def _definitions_are_equal(def1, def2):
+    data1 = def1.data if def1 else {}
+    data2 = def2.data if def2 else {}
+    if len(data1) != len(data2):
+        return False
+    for point, value in data1.items():
+        other = data2.get(point)
+        if other is None or not value.is_syntactically_equal(other):
+            return False
+    return True
+
+
 def wrap_tuple(tup):
     """ Create a tuple of Term references from a tuple of terms """
     return tuple(symref(a) for a in tup)
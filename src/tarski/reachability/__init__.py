@@ -1,3 +1,4 @@
 
-from .asp import create_reachability_lp
-from .clingo_wrapper import run_clingo, parse_model
+from .asp import create_reachability_lp, ReachabilityLPTemplate
+from .clingo_wrapper import run_clingo, run_clingo_streaming, parse_model
+from .datalog import run_datalog
@@ -11,20 +11,62 @@ from ..syntax import Formula, Atom, CompoundFormula, Connective, Term, Variable,
     BuiltinPredicateSymbol, QuantifiedFormula, Quantifier, CompoundTerm
 from ..syntax.sorts import parent
 from ..fstrips import Problem, SingleEffect, AddEffect, DelEffect, FunctionalEffect
-from ..fstrips.representation import identify_cost_related_functions
+from ..fstrips.representation import identify_cost_related_functions, is_quantifier_free
 
 GOAL = "goal"
 
 
-def create_reachability_lp(problem: Problem, ground_actions=True, include_variable_inequalities=False):
-    """ Return a reachability logic program, along with the symbol translation dictionary used to create it """
-    lp = LogicProgram()
+def create_reachability_lp(problem: Problem, ground_actions=True, include_variable_inequalities=False, lp=None,
+                           template=None):
+    """ Return a reachability logic program, along with the symbol translation dictionary used to create it.
+    The rules are added to the given logic program, if any (e.g. an `InFileLogicProgram`), or to a new one.
+    If a `ReachabilityLPTemplate` is given, the rules of the action schemas are taken from it instead of compiled. """
+    lp = LogicProgram() if lp is None else lp
     compiler_class = ReachabilityLPCompiler if ground_actions else VariableOnlyReachabilityLPCompiler
-    compiler = compiler_class(problem, lp, include_variable_inequalities=include_variable_inequalities)
+    if template is not None and (template.ground_actions, template.include_variable_inequalities) != \
+            (ground_actions, include_variable_inequalities):
+        raise RuntimeError('The given reachability LP template was compiled with different options')
+    compiler = compiler_class(problem, lp, include_variable_inequalities=include_variable_inequalities,
+                              template=template)
     compiler.create()
     return lp, compiler.tr
 
 
+class ReachabilityLPTemplate:
+    """ The rules of the reachability logic program that correspond to the action schemas of a planning domain,
+    compiled once from some problem of the domain, so that they can be reused when creating the logic program of any
+    other problem of the same domain. Since the rules of action schemas with quantified formulas or universal effects
+    depend on the objects of each problem, these schemas are not compiled, and need to be compiled for each problem.
+    """
+    def __init__(self, problem: Problem, ground_actions=True, include_variable_inequalities=False):
+        self.ground_actions = ground_actions
+        self.include_variable_inequalities = include_variable_inequalities
+        compiler_class = ReachabilityLPCompiler if ground_actions else VariableOnlyReachabilityLPCompiler
+        lp = LogicProgram()
+        compiler = compiler_class(problem, lp, include_variable_inequalities=include_variable_inequalities)
+
+        self.actions = dict()  # The (head, body) pairs of the rules of each action schema
+        for action in problem.actions.values():
+            if not _is_object_independent(action):
+                continue
+            start = len(lp.clauses)
+            compiler.process_action(action, problem.language, lp)
+            self.actions[action.name] = lp.clauses[start:]
+        self.translator = compiler.tr
+        self.aux_atom_count = compiler.aux_atom_count
+
+
+def _is_object_independent(action):
+    """ Return true iff the compilation of the given action schema into LP rules does not depend on the objects of
+    the problem, i.e. if it has no quantified formula nor universal effect. """
+    formulas = [action.precondition]
+    for eff in action.effects:
+        if not isinstance(eff, SingleEffect):
+            return False
+        formulas.append(eff.condition)
+    return all(is_quantifier_free(phi) for phi in formulas)
+
+
 class ReachabilityLPCompiler:
     """ A class that handles the compilation of planning problem into suitable logic programs to perform reachability
     analysis. The compilation follows roughly the relaxed reachability analysis outlined in Section 6 of
@@ -34,13 +76,22 @@ class ReachabilityLPCompiler:
 
     albeit there are some differences which so far we haven't properly described and analyzed.
     """
-    def __init__(self, problem: Problem, lp, include_variable_inequalities=False, include_action_costs=False):
+    def __init__(self, problem: Problem, lp, include_variable_inequalities=False, include_action_costs=False,
+                 template=None):
         self.problem = problem
         self.lp = lp
         self.aux_atom_count = 0
         self.include_variable_inequalities = include_variable_inequalities
         self.include_action_costs = include_action_costs
         self.tr = Translator()
+        self.template = template
+        if template is not None:
+            if include_action_costs:
+                raise RuntimeError('Reachability LP templates do not support action costs')
+            # Auxiliary atoms and translated names must be consistent with those in the template rules
+            self.aux_atom_count = template.aux_atom_count
+            self.tr.d.update(template.translator.d)
+            self.tr.inv.update(template.translator.inv)
 
     def gen_aux_atom(self, args=None):
         """ Return a new auxiliary atom with the given arguments """
@@ -86,7 +137,11 @@ class ReachabilityLPCompiler:
         for _, action in problem.actions.items():
             if all(len(list(v.sort.domain())) > 0 for v in action.parameters):
                 # We process only those actions such that all their parameter types have at least one object
-                self.process_action(action, lang, lp)
+                clauses = self.template.actions.get(action.name) if self.template is not None else None
+                if clauses is None:
+                    self.process_action(action, lang, lp)
+                else:
+                    _ = [lp.rule(head, body or None) for head, body in clauses]
 
         # Process all derived predicates
         # TODO To be implemented yet
@@ -271,10 +326,11 @@ class ReachabilityLPCompiler:
 class VariableOnlyReachabilityLPCompiler(ReachabilityLPCompiler):
     """ A variation of the standard LP compiler that cares only about state variable, but not action, groundings. """
 
-    def __init__(self, problem: Problem, lp, include_variable_inequalities=False, include_action_costs=False):
+    def __init__(self, problem: Problem, lp, include_variable_inequalities=False, include_action_costs=False,
+                 template=None):
         if include_action_costs:
             raise RuntimeError(f'Cannot generate a variable-only reachability LP that includes action costs')
-        super().__init__(problem, lp, include_variable_inequalities, include_action_costs=False)
+        super().__init__(problem, lp, include_variable_inequalities, include_action_costs=False, template=template)
 
     def process_action(self, action, lang, lp):
         # See & contrast with method in parent class
@@ -377,10 +433,12 @@ class Translator:
 class LogicProgram:
     def __init__(self):
         self.rules = []
+        self.clauses = []  # The (head, body) pair of each rule, in the same order as `rules`
         self.directives = []
 
     def rule(self, head, body=None):
         self.rules.append(_print_rule(head, body))
+        self.clauses.append((head, body or []))
 
     def nrules(self):
         return len(self.rules)
@@ -390,11 +448,21 @@ class LogicProgram:
 
 
 class InFileLogicProgram:
+    """ A logic program that writes each rule to the given file-like object (e.g. a pipe) as soon as it is created,
+    rather than keeping it in memory. """
     def __init__(self, fd):
         self.fd = fd
+        self.count = 0
 
     def rule(self, head, body=None):
         self.fd.write(_print_rule(head, body) + "\n")
+        self.count += 1
+
+    def nrules(self):
+        return self.count
+
+    def directive(self, directive):
+        self.fd.write(str(directive) + "\n")
 
 
 def _print_rule(head, body):
@@ -1,24 +1,32 @@
 import logging
 import os
 import shutil
+import subprocess
 import tempfile
+import threading
 from collections import defaultdict
 
 from ..errors import CommandNotFoundError, ExternalCommandError, OutOfMemoryError, OutOfTimeError
 from ..utils import command as cmd
+from .asp import InFileLogicProgram
 
 
-def run_clingo(lp):
+def _find_gringo():
     gringo = shutil.which("gringo")
     if gringo is None:
         raise CommandNotFoundError("gringo")
+    logging.debug('Using gringo binary found in "{}"'.format(gringo))
+    return gringo
+
+
+def run_clingo(lp):
+    gringo = _find_gringo()
 
     with tempfile.NamedTemporaryFile(mode='w+t', delete=False) as f:
         _ = [print(str(r), file=f) for r in lp.rules]
         _ = [print(str(r), file=f) for r in lp.directives]
         theory_filename = f.name
 
-    logging.debug('Using gringo binary found in "{}"'.format(gringo))
     errlog = ''
     with tempfile.NamedTemporaryFile(mode='w+t', delete=False) as f:
         with tempfile.NamedTemporaryFile(mode='w+t', delete=False) as stderr:
@@ -33,29 +41,78 @@ def run_clingo(lp):
         with open(stderr.name, 'r') as file:
             errlog = file.read()
 
+    raise _gringo_error(retcode, errlog)
+
+
+def _gringo_error(retcode, errlog):
+    """ Return the exception that corresponds to the given failed execution of gringo """
     if 'std::bad_alloc' in errlog:
-        raise OutOfMemoryError(f"Gringo ran out of memory. Full error log: {errlog}")
+        return OutOfMemoryError(f"Gringo ran out of memory. Full error log: {errlog}")
     if retcode == -24:  # i.e. SIGXCPU
-        raise OutOfTimeError(f"Gringo ran out of time. Full error log: {errlog}")
+        return OutOfTimeError(f"Gringo ran out of time. Full error log: {errlog}")
+    return ExternalCommandError(f"Unknown Gringo error. Gringo exited with code {retcode}. Full error log: {errlog}")
+
 
-    raise ExternalCommandError(f"Unknown Gringo error. Gringo exited with code {retcode}. Full error log: {errlog}")
+def run_clingo_streaming(generate):
+    """ Run gringo on a logic program that is streamed into its standard input as it is generated, and parse the
+    resulting model from its standard output as it is produced, without any temporary file. The given function
+    `generate` receives an `InFileLogicProgram` that writes each rule straight into the pipe, and must return the
+    symbol mapping used to generate the program (e.g. the second element returned by `create_reachability_lp`).
+    Return the model in the same format as `parse_model`, and raise the same exceptions as `run_clingo` on errors.
+    """
+    gringo = _find_gringo()
+    # Option "-t" enforces an easier-to-parse textual output. Gringo reads the program from stdin if given no file.
+    process = subprocess.Popen([gringo, "-t"], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               universal_newlines=True)
+
+    # Drain the error log on a separate thread, so that gringo never blocks on a full stderr pipe
+    errlog = []
+    drain = threading.Thread(target=lambda: errlog.append(process.stderr.read()), daemon=True)
+    drain.start()
+
+    model = defaultdict(set)
+    try:
+        try:
+            symbol_mapping = generate(InFileLogicProgram(process.stdin))
+            process.stdin.close()
+        except BrokenPipeError:  # Gringo exited before reading the whole program; the error is reported below
+            symbol_mapping = None
+
+        if symbol_mapping is not None:
+            for line in process.stdout:
+                _parse_line(line, symbol_mapping, model)
+        retcode = process.wait()
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        drain.join()
+        process.stdout.close()
+        process.stderr.close()
+
+    if retcode != 0:
+        raise _gringo_error(retcode, ''.join(errlog))
+    return model
 
 
 def parse_model(filename, symbol_mapping):
-    tr = symbol_mapping
     model = defaultdict(set)
     with open(filename, "r") as f:
         for line in f:
-            data = line.rstrip(' \n.').rstrip(')')
-            components = data.split('(')
-            if len(components) == 1:
-                symbol = tr.back(components[0])
-                model[symbol].add(())
-            elif len(components) == 2:
-                symbol, arguments = components
-                model[tr.back(symbol)].add(tuple(tr.back(s) for s in arguments.split(',')))
-            else:
-                # No nested terms expected, so there should be at most 2 components
-                raise RuntimeError('Unexpected line "{}" in Clingo solution file'.format(line))
+            _parse_line(line, symbol_mapping, model)
 
     return model
+
+
+def _parse_line(line, tr, model):
+    data = line.rstrip(' \n.').rstrip(')')
+    components = data.split('(')
+    if len(components) == 1:
+        symbol = tr.back(components[0])
+        model[symbol].add(())
+    elif len(components) == 2:
+        symbol, arguments = components
+        model[tr.back(symbol)].add(tuple(tr.back(s) for s in arguments.split(',')))
+    else:
+        # No nested terms expected, so there should be at most 2 components
+        raise RuntimeError('Unexpected line "{}" in Clingo solution file'.format(line))
@@ -0,0 +1,299 @@
+"""
+    A bottom-up Datalog engine to compute the least model of the reachability logic programs created by
+    `ReachabilityLPCompiler`, without the need of any external ASP grounder.
+"""
+from collections import defaultdict
+
+from .asp import LPAtom
+
+
+def run_datalog(lp, symbol_mapping):
+    """ Compute the least model of the given logic program, and return it in the same format as
+    `tarski.reachability.parse_model` does with the output of gringo, i.e. a dictionary mapping each (back-translated)
+    predicate symbol to the set of tuples of (back-translated) arguments of the atoms of the model. """
+    engine = DatalogEngine(lp)
+    engine.run()
+    return engine.model(symbol_mapping)
+
+
+class DatalogEngine:
+    """ A semi-naive, bottom-up evaluator for positive Datalog programs, where rule bodies are made up of relational
+    atoms plus builtin comparisons (=, !=, <, <=, >, >=) between variables and constants.
+
+    At each iteration, every rule is evaluated once for each body atom over a predicate that got new atoms in the
+    previous iteration, joining those new atoms (the "delta") with the full extensions of the remaining body atoms,
+    so that no derivation that only involves old atoms is ever repeated. The remaining atoms are joined in a greedy
+    order that prefers atoms with more bound arguments and, among those, atoms with smaller extensions, through hash
+    indexes on the bound argument positions that are kept up to date as new atoms are derived.
+    """
+    def __init__(self, lp):
+        if lp.directives:
+            raise RuntimeError('The Datalog engine does not support logic program directives')
+        self.rules = [DatalogRule(head, body) for head, body in lp.clauses]
+        self.extensions = defaultdict(set)
+        self.indexes = defaultdict(dict)  # For each predicate, a map from argument positions to a hash index
+
+    def run(self):
+        delta = defaultdict(set)
+        for rule in self.rules:  # Evaluate first the facts and the rules with builtin atoms only
+            if not rule.atoms:
+                self._evaluate(rule, None, None, delta)
+        self._merge(delta)
+
+        while delta:
+            derived = defaultdict(set)
+            for rule in self.rules:
+                for i, (symbol, _) in enumerate(rule.atoms):
+                    if symbol in delta:
+                        self._evaluate(rule, i, delta[symbol], derived)
+            delta = derived
+            self._merge(delta)
+
+    def model(self, symbol_mapping):
+        back = symbol_mapping.back
+        model = defaultdict(set)
+        for symbol, extension in self.extensions.items():
+            if extension:
+                model[back(symbol)] = {tuple(back(x) for x in point) for point in extension}
+        return model
+
+    def _merge(self, delta):
+        for symbol, points in delta.items():
+            self.extensions[symbol].update(points)
+            for positions, index in self.indexes[symbol].items():
+                for point in points:
+                    index.setdefault(tuple(point[p] for p in positions), []).append(point)
+
+    def index(self, symbol, positions):
+        """ Return the hash index of the extension of the given predicate on the given argument positions. """
+        indexes = self.indexes[symbol]
+        index = indexes.get(positions)
+        if index is None:
+            index = indexes[positions] = dict()
+            for point in self.extensions[symbol]:
+                index.setdefault(tuple(point[p] for p in positions), []).append(point)
+        return index
+
+    def _evaluate(self, rule, position, delta, derived):
+        """ Derive all the head atoms of the given rule that result from joining the given delta (a set of new atoms
+        of the predicate of the body atom at the given position) with the current extensions. """
+        steps = rule.plan(self, position)
+        if position is not None:
+            steps[1].bind(delta)
+        head_symbol, head_args = rule.head
+        known = self.extensions[head_symbol]
+        new = derived[head_symbol]
+        binding = [None] * rule.nvariables
+
+        def expand(k):
+            if k == len(steps):
+                point = tuple(binding[x] if isvar else x for isvar, x in head_args)
+                if point not in known:
+                    new.add(point)
+                return
+
+            step = steps[k]
+            for row in step.rows(self, binding):
+                if step.checks and any(row[p] != row[q] for p, q in step.checks):
+                    continue
+                for pos, var in step.outputs:
+                    binding[var] = row[pos]
+                if all(test(binding) for test in step.tests):
+                    expand(k + 1)
+
+        expand(0)
+        if not new:
+            del derived[head_symbol]
+
+
+class DatalogRule:
+    """ A Datalog rule with a relational head, a list of relational body atoms and a list of builtin comparisons.
+    Each argument is represented by a pair (True, i) for the i-th variable of the rule, or (False, c) for a constant.
+    """
+    def __init__(self, head, body):
+        if not isinstance(head, LPAtom) or head.infix:
+            raise RuntimeError(f'The Datalog engine cannot evaluate rule with head "{head}"')
+
+        self.variables = dict()
+        self.head = (head.symbol, self._arguments(head.args))
+        self.atoms = []
+        self.comparisons = []
+        for atom in body:
+            if not isinstance(atom, LPAtom):
+                raise RuntimeError(f'The Datalog engine cannot evaluate rule body atom "{atom}"')
+            if atom.infix:
+                self.comparisons.append((atom.symbol, ) + self._arguments(atom.args))
+            else:
+                self.atoms.append((atom.symbol, self._arguments(atom.args)))
+        self.nvariables = len(self.variables)
+        self.atom_variables = [{x for isvar, x in arguments if isvar} for _, arguments in self.atoms]
+        self.nonground = [a for a, variables in enumerate(self.atom_variables) if variables]
+        self.plans = dict()
+
+    def _arguments(self, args):
+        arguments = []
+        for arg in args:
+            arg = str(arg)
+            if arg[0].isupper() or arg[0] == '_':  # An ASP variable
+                arguments.append((True, self.variables.setdefault(arg, len(self.variables))))
+            else:
+                arguments.append((False, arg))
+        return tuple(arguments)
+
+    def plan(self, engine, position):
+        """ Return the list of join steps to evaluate the rule, starting with the delta of the body atom at the given
+        position, if any. Plans are cached, and recomputed only when the size of the extension of some body atom
+        has changed by more than a factor of two since the plan was computed. """
+        signature = tuple(len(engine.extensions[self.atoms[a][0]]).bit_length() for a in self.nonground)
+        cached = self.plans.get(position)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        steps = self._plan(engine, position)
+        self.plans[position] = (signature, steps)
+        return steps
+
+    def _plan(self, engine, position):
+        steps, bound = [], set()
+        comparisons = list(self.comparisons)
+        pending = list(range(len(self.atoms)))
+
+        def add_step(step):
+            steps.append(step)
+            bound.update(var for _, var in step.outputs)
+            # Attach each comparison to the first step after which all of its variables are bound
+            for comparison in [c for c in comparisons if _is_bound(c[1], bound) and _is_bound(c[2], bound)]:
+                comparisons.remove(comparison)
+                step.tests.append(_comparison_test(*comparison))
+
+        add_step(JoinStep(None, (), [], []))  # A first step that checks the comparisons without variables
+        if position is not None:
+            pending.remove(position)
+            add_step(self._scan(self.atoms[position], bound, DeltaJoinStep))
+
+        # Ground atoms only need to be checked, and the earlier the better
+        for a in [a for a in pending if not self.atom_variables[a]]:
+            pending.remove(a)
+            add_step(self._scan(self.atoms[a], bound, JoinStep))
+
+        while True:
+            assignment = next((c for c in comparisons if _is_assignment(c, bound)), None)
+            if assignment is not None:  # An equality X = Y with Y bound is used to bind X
+                comparisons.remove(assignment)
+                _, lhs, rhs = assignment
+                target, source = (lhs, rhs) if _is_bound(rhs, bound) else (rhs, lhs)
+                add_step(AssignmentStep(source, target[1]))
+                continue
+
+            if not pending:
+                break
+
+            def score(a):
+                symbol, arguments = self.atoms[a]
+                nfree = len(self.atom_variables[a] - bound)
+                return nfree > 0, nfree - len(arguments), len(engine.extensions[symbol])
+            best = min(pending, key=score)
+            pending.remove(best)
+            add_step(self._scan(self.atoms[best], bound, JoinStep))
+
+        if comparisons or not all(_is_bound(arg, bound) for arg in self.head[1]):
+            raise RuntimeError(f'Unsafe rule with head "{self.head[0]}" cannot be evaluated by the Datalog engine')
+        return steps
+
+    @staticmethod
+    def _scan(atom, bound, step_class, *args):
+        symbol, arguments = atom
+        keys, outputs, checks, fresh = [], [], [], dict()
+        for pos, (isvar, x) in enumerate(arguments):
+            if not isvar or x in bound:
+                keys.append((pos, isvar, x))
+            elif x in fresh:
+                checks.append((fresh[x], pos))
+            else:
+                fresh[x] = pos
+                outputs.append((pos, x))
+        return step_class(symbol, keys, outputs, checks, *args)
+
+
+class JoinStep:
+    """ A step of a left-deep join, which extends the current binding with all matching atoms of a predicate """
+    def __init__(self, symbol, keys, outputs, checks):
+        self.symbol = symbol
+        self.positions = tuple(pos for pos, _, _ in keys)
+        self.keys = [(isvar, x) for _, isvar, x in keys]
+        self.outputs = outputs  # Pairs (argument position, variable) for the variables bound in this step
+        self.checks = checks  # Pairs of argument positions that must have the same value
+        self.tests = []
+
+    def rows(self, engine, binding):
+        if self.symbol is None:
+            return [()]
+        key = tuple(binding[x] if isvar else x for isvar, x in self.keys)
+        if not key:
+            return engine.extensions[self.symbol]
+        return engine.index(self.symbol, self.positions).get(key, ())
+
+
+class DeltaJoinStep(JoinStep):
+    """ The first step of a semi-naive join, which binds the variables of one body atom to the new atoms of its
+    predicate, as set through `bind`. """
+    def __init__(self, symbol, keys, outputs, checks):
+        super().__init__(symbol, keys, outputs, checks)
+        self.key = tuple(x for _, x in self.keys)  # The constant arguments of the atom
+        self.points = ()
+
+    def bind(self, points):
+        if not self.outputs and not self.checks:  # A ground atom
+            points = [self.key] if self.key in points else ()
+        elif self.key:
+            points = [p for p in points if tuple(p[pos] for pos in self.positions) == self.key]
+        self.points = points
+
+    def rows(self, engine, binding):
+        return self.points
+
+
+class AssignmentStep(JoinStep):
+    """ A step that binds a variable to the value of some constant or already-bound variable """
+    def __init__(self, source, variable):
+        super().__init__(None, (), [(0, variable)], [])
+        self.source = source
+
+    def rows(self, engine, binding):
+        isvar, x = self.source
+        return [(binding[x] if isvar else x, )]
+
+
+def _is_bound(argument, bound):
+    isvar, x = argument
+    return not isvar or x in bound
+
+
+def _is_assignment(comparison, bound):
+    symbol, lhs, rhs = comparison
+    return symbol == '=' and _is_bound(lhs, bound) != _is_bound(rhs, bound)
+
+
+def _order_key(value):
+    """ The key that orders values as ASP does, with integers before symbolic constants """
+    try:
+        return 0, int(value), ''
+    except ValueError:
+        return 1, 0, value
+
+
+def _comparison_test(symbol, lhs, rhs):
+    if symbol not in _comparisons:
+        raise RuntimeError(f'The Datalog engine cannot evaluate builtin comparison "{symbol}"')
+    compare = _comparisons[symbol]
+    (lvar, lx), (rvar, rx) = lhs, rhs
+    return lambda binding: compare(binding[lx] if lvar else lx, binding[rx] if rvar else rx)
+
+
+_comparisons = {
+    '=': lambda x, y: x == y,
+    '!=': lambda x, y: x != y,
+    '<': lambda x, y: _order_key(x) < _order_key(y),
+    '<=': lambda x, y: _order_key(x) <= _order_key(y),
+    '>': lambda x, y: _order_key(x) > _order_key(y),
+    '>=': lambda x, y: _order_key(x) >= _order_key(y),
+}
@@ -1,3 +1,8 @@
 
-from .model import SearchModel, ForwardSearchModel
+from .model import SearchModel, ForwardSearchModel, LiftedForwardSearchModel
 from .blind import BreadthFirstSearch
+from .best_first import BestFirstSearch, AStar, WeightedAStar, GreedyBestFirstSearch, SearchResult, SearchStatistics
+from .heuristics import Heuristic, BlindHeuristic, GoalCountHeuristic, DEAD_END
+from .relaxation import HMaxHeuristic, HAddHeuristic, FFHeuristic
+from .width import IteratedWidthSearch, SerializedIteratedWidthSearch, BestFirstWidthSearch
+from .parallel import HashDistributedSearch, HDAStar
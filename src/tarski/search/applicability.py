@@ -1,7 +1,8 @@
-import copy
+import itertools
 
 from tarski.fstrips import AddEffect, DelEffect, FunctionalEffect
 from ..evaluators.simple import evaluate
+from .packed import PackedState
 
 
 def is_applicable(model, operator):
@@ -9,16 +10,63 @@ def is_applicable(model, operator):
 
 
 def apply(model, operator):
-    result = copy.deepcopy(model)
+    """ Return the model that results from applying the given operator to the given model. The resulting model
+    shares with the given one the extensions of all symbols not affected by the operator.
+    The effect conditions and right-hand sides are all evaluated on the given model, then the delete effects are
+    applied before the add effects, so that an atom that is both added and deleted ends up being true. """
+    return progress(model, operator)[0]
+
+
+def progress(model, operator):
+    """ Return a pair with the model that results from applying the given operator to the given model, as in `apply`,
+    and a list with the state variables that the operator might have changed, each of them identified by a pair
+    (symbol, tuple of object names). """
+    adds, dels, assignments = [], [], []
     for eff in operator.effects:
-        apply_effect(result, eff)
-    return result
+        collect_effect_changes(model, eff, adds, dels, assignments)
+
+    changes = [(symbol, tuple(c.symbol for c in point)) for symbol, point in itertools.chain(dels, adds)]
+    changes.extend((function, tuple(c.symbol for c in point)) for function, point, _ in assignments)
+
+    if isinstance(model, PackedState):
+        return model.layout.progress(model, adds, dels, assignments), changes
+
+    result = model.copy()
+    for predicate, point in dels:
+        if result.holds(predicate, point):
+            result.remove(predicate, *point)
+    for predicate, point in adds:
+        result.add(predicate, *point)
+    for function, point, value in assignments:
+        result.setx(function(*point), value)
+    return result, changes
 
 
 def is_effect_applicable(model, effect):
     return evaluate(effect.condition, model)
 
 
+def collect_effect_changes(model, effect, adds, dels, assignments):
+    """ Add to the given lists the changes that the given effect would produce if applied on the given model,
+    in the form of pairs (predicate, point) for `adds` and `dels`, and triples (function, point, value) for
+    `assignments`. All points are tuples of constants. """
+    if not is_effect_applicable(model, effect):
+        return
+
+    if isinstance(effect, AddEffect):
+        adds.append((effect.atom.predicate, tuple(evaluate(t, model) for t in effect.atom.subterms)))
+
+    elif isinstance(effect, DelEffect):
+        dels.append((effect.atom.predicate, tuple(evaluate(t, model) for t in effect.atom.subterms)))
+
+    elif isinstance(effect, FunctionalEffect):
+        point = tuple(evaluate(t, model) for t in effect.lhs.subterms)
+        assignments.append((effect.lhs.symbol, point, evaluate(effect.rhs, model)))
+
+    else:
+        raise RuntimeError(f'Don\'t know how to apply effect "{effect}"')
+
+
 def apply_effect(model, effect):
     """ Apply the given effect to the given model. """
     if not is_effect_applicable(model, effect):
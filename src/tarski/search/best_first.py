@@ -0,0 +1,208 @@
+"""
+    Best-first heuristic search engines: A*, weighted A* and greedy best-first search, with eager or lazy heuristic
+    evaluation.
+"""
+import heapq
+import logging
+import time
+
+from .blind import SearchNode, make_root_node, make_child_node
+from .heuristics import DEAD_END
+from .model import SearchModel
+
+
+class SearchStatistics:
+    """ The counters of a search: expanded, evaluated and generated nodes, nodes reopened with a cheaper path, states
+    recognized as dead ends by the heuristic, nodes pruned by other criteria (e.g. novelty), and the search time in
+    seconds. """
+    def __init__(self):
+        self.expanded = 0
+        self.evaluated = 0
+        self.generated = 0
+        self.reopened = 0
+        self.dead_ends = 0
+        self.pruned = 0
+        self.time = 0.0
+
+    def __str__(self):
+        return 'expanded: {}, evaluated: {}, generated: {}, reopened: {}, dead ends: {}, pruned: {}, ' \
+               'time: {:.3f}s'.format(self.expanded, self.evaluated, self.generated, self.reopened, self.dead_ends,
+                                      self.pruned, self.time)
+
+    __repr__ = __str__
+
+
+class SearchResult:
+    """ The outcome of a search. `status` is one of "solved", "unsolvable", "failed" (for incomplete searches that
+    give up without proving the problem unsolvable), "expansion limit" and "time limit", and `plan` is the list of
+    operators that leads from the initial state to the goal, if one was found. """
+    def __init__(self, status, node, stats):
+        self.status = status
+        self.node = node
+        self.stats = stats
+        self.plan = None if node is None else extract_plan(node)
+        self.cost = None if node is None else node.g
+
+    @property
+    def solved(self):
+        return self.status == 'solved'
+
+    def __str__(self):
+        return 'SearchResult[{}, cost: {}, {}]'.format(self.status, self.cost, self.stats)
+
+    __repr__ = __str__
+
+
+class BestFirstSearch:
+    """ A best-first search that expands nodes in order of their evaluation `weight_g * g + weight_h * h`, where `g`
+    is the cost of the path to the node and `h` the value of the given heuristic on its state. Ties are broken in
+    favor of lower `h`, and then in the order given by `tie_breaking`: "lifo" (the default) prefers the most recently
+    generated nodes, "fifo" the oldest ones.
+
+    With eager evaluation, the heuristic is computed for each state when it is first generated, and dead ends are
+    never inserted in the open list. With lazy (deferred) evaluation, nodes enter the open list with the heuristic
+    value of their parent, and their own value is only computed when they are selected for expansion, which saves
+    many evaluations when the branching factor is large, at the cost of less informed expansion order.
+
+    Duplicate states are detected by their hash. A state that is reached again through a cheaper path is reopened
+    if `reopen` is true, which is needed to guarantee optimal solutions with heuristics that are admissible but not
+    consistent. The search stops after `max_expansions` expansions, if non-negative, or after `time_limit` seconds,
+    if given.
+    """
+    def __init__(self, model: SearchModel, heuristic, weight_g=1, weight_h=1, lazy=False, reopen=True,
+                 tie_breaking='lifo', max_expansions=-1, time_limit=None):
+        if tie_breaking not in ('lifo', 'fifo'):
+            raise RuntimeError(f'Unknown tie-breaking rule "{tie_breaking}"')
+        self.model = model
+        self.heuristic = heuristic
+        self.weight_g = weight_g
+        self.weight_h = weight_h
+        self.lazy = lazy
+        self.reopen = reopen
+        self.order = -1 if tie_breaking == 'lifo' else 1
+        self.max_expansions = max_expansions
+        self.time_limit = time_limit
+        self.stats = None
+
+    def run(self):
+        return self.search(self.model.init())
+
+    def search(self, s0):
+        stats = self.stats = SearchStatistics()
+        start = time.perf_counter()
+        result = self._search(s0, stats, start)
+        stats.time = time.perf_counter() - start
+        logging.info("Search finished with status \"{}\". {}".format(result.status, stats))
+        return result
+
+    def _search(self, s0, stats, start):
+        model, order = self.model, self.order
+        h_values = dict()  # The heuristic value of each evaluated state
+        g_values = dict()  # The cost of the cheapest known path to each generated state
+        closed = set()  # The expanded states
+
+        def evaluate(state):
+            h = h_values.get(state)
+            if h is None:
+                h = h_values[state] = self.heuristic(state)
+                stats.evaluated += 1
+                if h == DEAD_END:
+                    stats.dead_ends += 1
+            return h
+
+        open_ = []
+        counter = 0
+
+        def push(node, h):
+            nonlocal counter
+            counter += 1
+            heapq.heappush(open_, (self.weight_g * node.g + self.weight_h * h, h, order * counter, node))
+
+        root = make_root_node(s0)
+        h0 = evaluate(s0)
+        if h0 == DEAD_END:
+            return SearchResult('unsolvable', None, stats)
+        g_values[s0] = 0
+        push(root, h0)
+
+        while open_:
+            _, h, _, node = heapq.heappop(open_)
+            state = node.state
+            if node.g > g_values[state]:
+                continue  # A cheaper path to the state has been found since the node was inserted
+            if state in closed:
+                if not self.reopen:
+                    continue
+                stats.reopened += 1
+
+            if self.lazy:
+                h = evaluate(state)
+                if h == DEAD_END:
+                    continue
+
+            if model.is_goal(state):
+                logging.info("Goal found after {} expansions, with cost {}".format(stats.expanded, node.g))
+                return SearchResult('solved', node, stats)
+
+            limit = limit_reached(stats, start, self.max_expansions, self.time_limit)
+            if limit is not None:
+                return SearchResult(limit, None, stats)
+
+            closed.add(state)
+            stats.expanded += 1
+            for operator, successor in model.successors(state):
+                stats.generated += 1
+                g = node.g + model.cost(operator)
+                known = g_values.get(successor)
+                if known is not None and (known <= g or (not self.reopen and successor in closed)):
+                    continue
+                if self.lazy:
+                    g_values[successor] = g
+                    push(make_child_node(node, operator, successor, g), h)
+                else:
+                    h_successor = evaluate(successor)
+                    if h_successor != DEAD_END:
+                        g_values[successor] = g
+                        push(make_child_node(node, operator, successor, g), h_successor)
+
+        return SearchResult('unsolvable', None, stats)
+
+
+class AStar(BestFirstSearch):
+    """ A* search: nodes are expanded by increasing `g + h`. Solutions are optimal if the heuristic is admissible and
+    evaluation is eager. """
+    def __init__(self, model: SearchModel, heuristic, **kwargs):
+        super().__init__(model, heuristic, weight_g=1, weight_h=1, **kwargs)
+
+
+class WeightedAStar(BestFirstSearch):
+    """ Weighted A* search: nodes are expanded by increasing `g + weight * h`. With an admissible heuristic, the cost
+    of the solutions found is at most `weight` times the optimal cost. """
+    def __init__(self, model: SearchModel, heuristic, weight=2, **kwargs):
+        super().__init__(model, heuristic, weight_g=1, weight_h=weight, **kwargs)
+
+
+class GreedyBestFirstSearch(BestFirstSearch):
+    """ Greedy best-first search: nodes are expanded by increasing `h`, and states are never reopened """
+    def __init__(self, model: SearchModel, heuristic, **kwargs):
+        kwargs.setdefault('reopen', False)
+        super().__init__(model, heuristic, weight_g=0, weight_h=1, **kwargs)
+
+
+def limit_reached(stats, start, max_expansions, time_limit):
+    """ Return the status of a search that has reached its expansion or time limit, or None if it has not """
+    if 0 <= max_expansions <= stats.expanded:
+        return 'expansion limit'
+    if time_limit is not None and time.perf_counter() - start >= time_limit:
+        return 'time limit'
+    return None
+
+
+def extract_plan(node: SearchNode):
+    """ Return the list of operators that leads from the root of the search to the given node """
+    plan = []
+    while node.parent is not None:
+        plan.append(node.action)
+        node = node.parent
+    plan.reverse()
+    return plan
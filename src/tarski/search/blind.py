@@ -1,82 +1,160 @@
 import logging
+from array import array
 from collections import deque
 
 from .model import ForwardSearchModel
+from .packed import PackedState, StateRegistry, create_state_layout
 
 
 class BreadthFirstSearch:
-    """ Apply Breadth-First search to a FSTRIPS problem """
-    def __init__(self, model: ForwardSearchModel, max_expansions=-1):
+    """ Apply Breadth-First search to a FSTRIPS problem. States are packed with the given `StateLayout`, or with one
+    covering all fluent atoms of the problem if none is given, and registered in the search space as they are
+    generated, so that each state is expanded at most once. If `record_transitions` is true, the search space also
+    records every transition between the states, so that it can hold the full transition system of the problem. """
+    def __init__(self, model: ForwardSearchModel, max_expansions=-1, layout=None, record_transitions=False):
         self.model = model
         self.max_expansions = max_expansions
+        self.layout = layout
+        self.record_transitions = record_transitions
 
     def run(self):
         return self.search(self.model.init())
 
     def search(self, s0):
-        # create obj to track state space
-        space = SearchSpace()
+        if self.layout is None:
+            self.layout = s0.layout if isinstance(s0, PackedState) else create_state_layout(self.model.problem)
+        if not isinstance(s0, PackedState) or s0.layout is not self.layout:
+            s0 = self.layout.pack(s0)
 
-        iteration = 0
+        # create obj to track state space
+        space = SearchSpace(StateRegistry(self.layout), self.record_transitions)
         num_goals_found = 0
 
-        open_ = deque()  # fifo-queue storing the nodes which are next to explore
-        closed = set()
-
-        open_.append(make_root_node(s0))
+        open_ = deque()  # fifo-queue storing the ids of the states which are next to explore
+        root, _ = space.add(s0)
+        open_.append(root)
 
-        node_id = 0
         while open_:
-            iteration += 1
-            # logging.debug("brfs: Iteration {}, #unexplored={}".format(iteration, len(open_)))
-
-            node = open_.popleft()
-            is_goal = self.model.is_goal(node.state)
-
-            space.expand(node)
-
-            # we manage the closed list here to allow the parents update
-            if node.state in closed:
-                continue
-
-            closed.add(node.state)
-
-            node_id += 1
+            sid = open_.popleft()
+            state = space.registry.lookup(sid)
+            space.expand(sid)
 
             # exploring the node or if it is a goal node extracting the plan
-            if is_goal:
+            if self.model.is_goal(state):
                 num_goals_found += 1
                 logging.info("Goal found after {} expansions. Number of goal states found: {}".format(
-                    node_id, num_goals_found))
+                    space.num_expanded, num_goals_found))
 
-            if 0 <= self.max_expansions <= node_id:
-                logging.info("Max. expansions reached. # expanded: {}, # goals: {}".format(node_id, num_goals_found))
+            if 0 <= self.max_expansions <= space.num_expanded:
+                logging.info("Max. expansions reached. # expanded: {}, # goals: {}".format(
+                    space.num_expanded, num_goals_found))
                 return space
 
-            for operator, successor_state in self.model.successors(node.state):
-                open_.append(make_child_node(node, operator, successor_state))
+            for operator, successor_state in self.model.successors(state):
+                child, is_new = space.add(successor_state, sid, operator)
+                if is_new:
+                    open_.append(child)
 
-        logging.info("Search space exhausted. # expanded: {}, # goals: {}".format(node_id, num_goals_found))
+        logging.info("Search space exhausted. # expanded: {}, # goals: {}".format(space.num_expanded, num_goals_found))
         space.complete = True
         return space
 
 
 class SearchNode:
-    def __init__(self, state, parent, action):
+    __slots__ = ('state', 'parent', 'action', 'g')
+
+    def __init__(self, state, parent, action, g=0):
         self.state = state
         self.parent = parent
         self.action = action
+        self.g = g  # The cost of the path from the root node
 
 
 class SearchSpace:
-    """ A representation of a search space / transition system corresponding to some planning problem """
-    def __init__(self):
-        self.nodes = set()
-        self.last_node_id = 0
+    """ A representation of a search space / transition system corresponding to some planning problem.
+
+    States are kept once, in a `StateRegistry`, and search nodes are identified with the integer ids of their states:
+    the node of each state records the id of its parent state and the index of the operator that led to it, in typed
+    arrays, so that each node takes a few bytes on top of its packed state. Operators are stored once, and referred to
+    by their index in `operators`. If `record_transitions` is true, every transition (source id, operator index,
+    target id) added to the space is also recorded, in `transitions`. The `nodes` attribute offers a view of the
+    expanded nodes as records with the usual `state`, `parent` and `action` attributes.
+    """
+    def __init__(self, registry: StateRegistry, record_transitions=False):
+        self.registry = registry
+        self.parents = array('i')  # The id of the parent of each state, -1 for the root
+        self.actions = array('i')  # The index of the operator that leads to each state, -1 for the root
+        self.expanded = bytearray()
+        self.num_expanded = 0
+        self.operators = []
+        self.operator_indexes = dict()
+        self.transitions = array('i') if record_transitions else None
         self.complete = False  # Whether the state space contains all states reachable from the initial state
 
-    def expand(self, node: SearchNode):
-        self.nodes.add(node)
+    def add(self, state, parent=-1, operator=None):
+        """ Register the given state, reached from the state with id `parent` through the given operator, and return a
+        pair with the id of the state and whether it is new. Only the first parent of each state is kept. """
+        sid, is_new = self.registry.insert(state)
+        action = -1 if operator is None else self.operator_index(operator)
+        if is_new:
+            self.parents.append(parent)
+            self.actions.append(action)
+            self.expanded.append(0)
+        if self.transitions is not None and parent >= 0:
+            self.transitions.extend((parent, action, sid))
+        return sid, is_new
+
+    def operator_index(self, operator):
+        index = self.operator_indexes.get(id(operator))
+        if index is None:
+            index = self.operator_indexes[id(operator)] = len(self.operators)
+            self.operators.append(operator)  # Which also keeps the id of the operator from being reused
+        return index
+
+    def expand(self, sid):
+        if not self.expanded[sid]:
+            self.expanded[sid] = 1
+            self.num_expanded += 1
+
+    def node(self, sid):
+        return SpaceNode(self, sid)
+
+    @property
+    def nodes(self):
+        """ The list of (records of) the expanded nodes """
+        return [SpaceNode(self, sid) for sid in range(len(self.expanded)) if self.expanded[sid]]
+
+    def plan(self, sid):
+        """ Return the list of operators that leads from the root to the state with the given id """
+        plan = []
+        while self.parents[sid] >= 0:
+            plan.append(self.operators[self.actions[sid]])
+            sid = self.parents[sid]
+        plan.reverse()
+        return plan
+
+
+class SpaceNode:
+    """ A lightweight record of the node of a `SearchSpace` with a given state id """
+    __slots__ = ('space', 'id')
+
+    def __init__(self, space, sid):
+        self.space = space
+        self.id = sid
+
+    @property
+    def state(self):
+        return self.space.registry.lookup(self.id)
+
+    @property
+    def parent(self):
+        parent = self.space.parents[self.id]
+        return None if parent < 0 else SpaceNode(self.space, parent)
+
+    @property
+    def action(self):
+        action = self.space.actions[self.id]
+        return None if action < 0 else self.space.operators[action]
 
 
 def make_root_node(state):
@@ -84,6 +162,6 @@ def make_root_node(state):
     return SearchNode(state, None, None)
 
 
-def make_child_node(parent_node, action, state):
-    """ Construct an child search node """
-    return SearchNode(state, parent_node, action)
+def make_child_node(parent_node, action, state, g=None):
+    """ Construct an child search node, by default with a path cost one unit larger than that of its parent """
+    return SearchNode(state, parent_node, action, parent_node.g + 1 if g is None else g)
@@ -0,0 +1,45 @@
+"""
+    Heuristic functions for the heuristic search engines of the search module.
+"""
+import math
+
+from ..evaluators.compiled import compile_expression
+from ..fstrips.representation import collect_literals_from_conjunction
+from ..syntax import Tautology
+
+# The heuristic value of states from which the goal is known to be unreachable
+DEAD_END = math.inf
+
+
+class Heuristic:
+    """ The interface of heuristic functions: calling the heuristic on a state returns an estimate of the cost of
+    reaching the goal from the state, or `DEAD_END` if the goal is known to be unreachable from it. Any other callable
+    that behaves like this can be used by the search engines as well. """
+    def __call__(self, state):
+        return self.evaluate(state)
+
+    def evaluate(self, state):
+        raise NotImplementedError()
+
+
+class BlindHeuristic(Heuristic):
+    """ The heuristic that is 0 on goal states and the given cost, by default 1, on every other state """
+    def __init__(self, model, cost=1):
+        self.model = model
+        self.cost = cost
+
+    def evaluate(self, state):
+        return 0 if self.model.is_goal(state) else self.cost
+
+
+class GoalCountHeuristic(Heuristic):
+    """ The number of goal literals that are false in the state. The goal of the problem must be a conjunction of
+    literals; this heuristic is not admissible. """
+    def __init__(self, problem):
+        literals = set() if isinstance(problem.goal, Tautology) else collect_literals_from_conjunction(problem.goal)
+        if literals is None:
+            raise RuntimeError(f'Goal "{problem.goal}" of problem "{problem.name}" is not a conjunction of literals')
+        self.goals = [(compile_expression(atom), positive) for atom, positive in literals]
+
+    def evaluate(self, state):
+        return sum(1 for atom, positive in self.goals if bool(atom(state)) != positive)
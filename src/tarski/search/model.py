@@ -1,5 +1,11 @@
-
-from ..evaluators.simple import evaluate
+from ..evaluators.joins import ConjunctiveQuery, decompose_conjunction
+from ..evaluators.compiled import compile_expression, StaticDenotations
+from ..grounding.ops import approximate_symbol_fluency
+from ..syntax import create_substitution
+from ..syntax.transform.action_grounding import ground_problem_schemas_into_plain_operators, \
+    ground_schema_into_plain_operator
+from .applicability import apply
+from .successors import SuccessorGenerator
 
 
 class SearchModel:
@@ -12,19 +18,69 @@ class SearchModel:
     def is_goal(self, state):
         raise NotImplementedError()
 
+    def cost(self, operator):
+        """ The cost of applying the given operator, 1 by default """
+        return 1
 
-class ForwardSearchModel(SearchModel):
 
-    def __init__(self, problem):
+class ForwardSearchModel(SearchModel):
+    """ A forward (progression) search model over the given set of ground operators of the problem. If no operators
+    are given, all action schemas of the problem are exhaustively grounded the first time successors are requested.
+    The goal and the preconditions are compiled so that the denotation of the atoms and terms over static symbols is
+    retrieved from the initial state only once.
+    """
+    def __init__(self, problem, operators=None):
         self.problem = problem
+        self.operators = operators
+        _, static_symbols = approximate_symbol_fluency(problem)
+        self.static = StaticDenotations(static_symbols, problem.init)
+        self.goal = compile_expression(problem.goal, self.static)
+        self._generator = None
+
+    @property
+    def successor_generator(self):
+        if self._generator is None:
+            if self.operators is None:
+                self.operators = ground_problem_schemas_into_plain_operators(self.problem)
+            self._generator = SuccessorGenerator(self.operators, self.static)
+        return self._generator
 
     def init(self):
         return self.problem.init
 
+    def applicable(self, state):
+        """ Return an iterator over the ground operators applicable in the given state. """
+        return self.successor_generator.applicable(state)
+
     def successors(self, state):
-        # TODO We would need either to have the ground actions or to ground on-the-fly here
-        raise NotImplementedError()
+        for op in self.applicable(state):
+            yield op, apply(state, op)
 
     def is_goal(self, state):
-        state.evaluator = evaluate  # TODO This is a bit hacky
-        return state[self.problem.goal]  # This triggers the logical interpretation of the goal formula
+        return self.goal(state)
+
+
+class LiftedForwardSearchModel(ForwardSearchModel):
+    """ A forward search model that does not require grounding the problem in advance. The applicable instantiations
+    of each action schema are computed directly on every state, by answering the conjunctive query given by the
+    schema precondition over the extensions of the state. The cost per state is thus proportional to the number of
+    matches of the precondition atoms, not to the number of possible ground actions.
+    Ground operators are created on demand, the first time that they are found applicable.
+    """
+    def __init__(self, problem):
+        super().__init__(problem)
+        self.queries = []
+        for action in problem.actions.values():
+            atoms, filters = decompose_conjunction(action.precondition)
+            self.queries.append((action, ConjunctiveQuery(action.parameters, atoms, filters, self.static)))
+        self.cache = dict()
+
+    def applicable(self, state):
+        for action, query in self.queries:
+            for binding in query.answers(state):
+                key = (action.name, tuple(c.symbol for c in binding))
+                op = self.cache.get(key)
+                if op is None:
+                    substitution = create_substitution(action.parameters, binding)
+                    op = self.cache[key] = ground_schema_into_plain_operator(action, substitution)
+                yield op
@@ -0,0 +1,124 @@
+"""
+    Novelty tables, which record the atoms and pairs of atoms that have been true in some state seen so far.
+    Atoms are identified by their index in a `StateLayout`, and sets of atoms are given as (Python integer) bitsets,
+    as in the `atoms` attribute of a `PackedState`.
+"""
+from .. import modules
+
+
+class AtomNoveltyTable:
+    """ A table of the atoms seen so far, stored as a bit array """
+    def __init__(self):
+        self.seen = 0
+
+    def update(self, atoms):
+        """ Record the given bitset of atoms, and return true iff some of them had not been seen before """
+        new = atoms & ~self.seen
+        if new:
+            self.seen |= atoms
+        return bool(new)
+
+    def __len__(self):
+        return bin(self.seen).count('1')
+
+
+class PairNoveltyTable:
+    """ A table of the (unordered) pairs of atoms seen so far, including the pairs (p, p) of single atoms. Each pair
+    (p, q) with p <= q is encoded as the integer `p * num_atoms + q`, and the table is an open-addressing hash set of
+    these integers held in a NumPy array, so that its memory depends only on the number of pairs actually seen (at
+    most 16 bytes per pair), not on the square of the number of atoms, and all pairs of a state are looked up and
+    inserted at once, with vectorized operations.
+    """
+    EMPTY = -1
+
+    def __init__(self, num_atoms, capacity=1 << 16):
+        self.np = modules.import_numpy()
+        self.num_atoms = num_atoms
+        self.size = 0
+        self.bits = max(4, (capacity - 1).bit_length())
+        self.table = self.np.full(1 << self.bits, self.EMPTY, dtype=self.np.int64)
+        self._triangle = (0, None)  # The indexes of the upper triangle of the last square of pairs built, by size
+
+    def update(self, atoms):
+        """ Record all pairs of the given bitset of atoms, and return true iff some of them had not been seen before """
+        return self.insert(self.pairs(atoms)) > 0
+
+    def pairs(self, atoms):
+        """ Return the array with the encoding of all pairs of the given bitset of atoms """
+        np = self.np
+        indexes = atom_indexes(np, atoms, self.num_atoms)
+        size, triangle = self._triangle
+        if triangle is None or size != len(indexes):
+            # Only the last triangle is kept, as states with the same number of true atoms often come in a row
+            triangle = np.triu_indices(len(indexes))
+            self._triangle = (len(indexes), triangle)
+        return indexes[triangle[0]] * self.num_atoms + indexes[triangle[1]]
+
+    def insert(self, keys):
+        """ Insert the given array of distinct pair encodings, and return the number of them that were new """
+        np = self.np
+        if 2 * (self.size + len(keys)) > len(self.table):
+            self._grow(self.size + len(keys))
+        table, mask = self.table, len(self.table) - 1
+        slots = self._hash(keys)
+        inserted = 0
+        while len(keys):
+            values = table[slots]
+            pending = values != keys
+            keys, slots, values = keys[pending], slots[pending], values[pending]
+            empty = values == self.EMPTY
+            # Of the keys that probe the same empty slot, only the first one takes it; the others probe it again
+            candidates = np.flatnonzero(empty)
+            _, first = np.unique(slots[candidates], return_index=True)
+            winners = candidates[first]
+            table[slots[winners]] = keys[winners]
+            inserted += len(winners)
+
+            slots = np.where(empty, slots, (slots + 1) & mask)
+            remaining = np.ones(len(keys), dtype=bool)
+            remaining[winners] = False
+            keys, slots = keys[remaining], slots[remaining]
+        self.size += inserted
+        return inserted
+
+    def _hash(self, keys):
+        np = self.np
+        hashed = keys.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)  # i.e. Fibonacci hashing
+        return (hashed >> np.uint64(64 - self.bits)).astype(np.int64)
+
+    def _grow(self, size):
+        keys = self.table[self.table != self.EMPTY]
+        while 2 * size > (1 << self.bits):
+            self.bits += 1
+        self.table = self.np.full(1 << self.bits, self.EMPTY, dtype=self.np.int64)
+        self.size = 0
+        self.insert(keys)
+
+    def __len__(self):
+        return self.size
+
+
+class NoveltyTable:
+    """ A novelty table for tuples of up to `width` atoms, with width 1 or 2. The novelty of a state is the size of
+    the smallest tuple of atoms true in the state that was not true in any state previously evaluated with the same
+    table, or `width + 1` if there is no such tuple of size at most `width`. """
+    def __init__(self, num_atoms, width):
+        if width not in (1, 2):
+            raise RuntimeError(f'Unsupported novelty width: {width}')
+        self.width = width
+        self.atoms = AtomNoveltyTable()
+        self.pairs = PairNoveltyTable(num_atoms) if width == 2 else None
+
+    def evaluate(self, atoms):
+        """ Return the novelty of the state with the given bitset of atoms, and record all of its tuples """
+        novel = self.atoms.update(atoms)
+        if self.pairs is not None and self.pairs.update(atoms) and not novel:
+            return 2
+        return 1 if novel else self.width + 1
+
+
+def atom_indexes(np, atoms, num_atoms):
+    """ Return the sorted NumPy array of the indexes of the atoms of the given bitset """
+    data = atoms.to_bytes((num_atoms + 7) // 8, 'little')
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8), bitorder='little')
+    return np.flatnonzero(bits[:num_atoms])
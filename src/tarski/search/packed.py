@@ -0,0 +1,290 @@
+"""
+    A compact, integer-indexed representation of planning states.
+"""
+from array import array
+
+from ..model import Model, ExtensionalFunctionDefinition, wrap_tuple, unwrap_tuple
+from ..syntax import Predicate, Constant
+from ..syntax.sorts import Interval, int_encode_fn
+from ..util import SymbolIndex
+
+
+class StateLayout:
+    """ A StateLayout fixes the position of each ground state variable of a problem within a packed state.
+    Ground atoms (i.e. boolean state variables) are mapped to consecutive bits of a bitset, and function-valued state
+    variables to consecutive slots of a typed array. Object values are stored as integer codes, numeric values as
+    plain numbers. The denotation of any atom or term that does not correspond to a state variable is taken from the
+    given static model, which will usually be the initial state of the problem.
+
+    The state variables are typically those returned by the `ground_state_variables()` method of the
+    `LPGroundingStrategy` or of the `NaiveGroundingStrategy` classes.
+    """
+    def __init__(self, state_variables: SymbolIndex, static: Model):
+        self.language = static.language
+        self.static = static
+        self.evaluator = static.evaluator
+
+        # The bit index of each ground atom and the slot of each ground function term, keyed by the name of the
+        # symbol and the names of the objects in its binding
+        self.atoms = dict()
+        self.slots = dict()
+        self.variables = []  # The state variable for each atom index
+        self.slot_variables = []  # The state variable for each slot
+        self.fluent_symbols = set()
+        self.symbol_positions = dict()  # The atom indexes or slots of each fluent symbol
+        for variable in state_variables:
+            key = (variable.symbol.name, tuple(c.symbol for c in variable.binding))
+            if isinstance(variable.symbol, Predicate):
+                position = self.atoms[key] = len(self.variables)
+                self.variables.append(variable)
+            else:
+                position = self.slots[key] = len(self.slot_variables)
+                self.slot_variables.append(variable)
+            self.fluent_symbols.add(variable.symbol)
+            self.symbol_positions.setdefault(variable.symbol, []).append(position)
+
+        # Object-valued slots store the index of their value in the following table
+        self.objects = list(self.language.constants())
+        self.object_codes = {o.symbol: i for i, o in enumerate(self.objects)}
+
+        self.slot_sorts = [v.symbol.codomain for v in self.slot_variables]
+        integral = all(not s.builtin or (isinstance(s, Interval) and s.encode is int_encode_fn)
+                       for s in self.slot_sorts)
+        self.typecode = 'q' if integral else 'd'
+        self.undefined = -2 ** 63 if integral else float('nan')
+
+    @property
+    def num_atoms(self):
+        return len(self.variables)
+
+    @property
+    def num_slots(self):
+        return len(self.slot_variables)
+
+    def atom_index(self, predicate, point):
+        """ Return the bit index of the atom resulting from applying the given predicate to the given tuple of
+        constants, or None if that atom is not a state variable. """
+        return self.atoms.get((predicate.name, tuple(c.symbol for c in point)))
+
+    def slot_index(self, function, point):
+        """ Return the slot of the term resulting from applying the given function to the given tuple of constants,
+        or None if that term is not a state variable. """
+        return self.slots.get((function.name, tuple(c.symbol for c in point)))
+
+    def encode_value(self, slot, value: Constant):
+        if self.slot_sorts[slot].builtin:
+            return value.symbol
+        return self.object_codes[value.symbol]
+
+    def decode_value(self, slot, value):
+        if value != value or value == self.undefined:  # i.e. NaN or the sentinel for undefined values
+            raise KeyError(self.slot_variables[slot])
+        sort = self.slot_sorts[slot]
+        if sort.builtin:
+            return Constant(value, sort)
+        return self.objects[int(value)]
+
+    def pack(self, model: Model):
+        """ Return the packed state that corresponds to the given model. """
+        atoms = 0
+        values = array(self.typecode, [self.undefined]) * self.num_slots
+        for symbol in self.fluent_symbols:
+            if isinstance(symbol, Predicate):
+                for point in model.get_extension(symbol):
+                    index = self.atoms.get((symbol.name, tuple(ref.expr.symbol for ref in point)))
+                    if index is None:
+                        raise RuntimeError(f'Atom "{symbol.name}{point}" in model is not a state variable '
+                                           f'of the layout')
+                    atoms |= 1 << index
+            else:
+                for point, value in model.get_extension(symbol):
+                    slot = self.slots.get((symbol.name, tuple(ref.expr.symbol for ref in point)))
+                    if slot is None:
+                        raise RuntimeError(f'Term "{symbol.name}{point}" in model is not a state variable '
+                                           f'of the layout')
+                    values[slot] = self.encode_value(slot, value)
+        return PackedState(self, atoms, values)
+
+    def unpack(self, state):
+        """ Return a (regular) model equivalent to the given packed state. The model will share with the static model
+        of the layout the extensions of all static symbols. """
+        model = self.static.copy()
+        for symbol in self.fluent_symbols:
+            if isinstance(symbol, Predicate):
+                for point in list(model.get_extension(symbol)):
+                    model.remove(symbol, *unwrap_tuple(point))
+            else:
+                for point, _ in list(model.get_extension(symbol)):
+                    model.unset(symbol(*unwrap_tuple(point)))
+
+        for index, variable in enumerate(self.variables):
+            if (state.atoms >> index) & 1:
+                model.add(variable.symbol, *variable.binding)
+
+        for slot, variable in enumerate(self.slot_variables):
+            value = state.values[slot]
+            if value == value and value != self.undefined:
+                model.setx(variable.symbol(*variable.binding), self.decode_value(slot, value))
+        return model
+
+    def progress(self, state, adds, dels, assignments):
+        """ Return the packed state that results from applying the given changes to the given state. `adds` and
+        `dels` are lists of pairs (predicate, point), with `point` a tuple of constants, and are applied in that
+        order; `assignments` is a list of tuples (function, point, value), with `value` a constant. """
+        atoms = state.atoms
+        for predicate, point in dels:
+            atoms &= ~(1 << self._atom_index_or_fail(predicate, point))
+        for predicate, point in adds:
+            atoms |= 1 << self._atom_index_or_fail(predicate, point)
+
+        values = state.values
+        if assignments:
+            values = array(self.typecode, values)
+            for function, point, value in assignments:
+                slot = self.slot_index(function, point)
+                if slot is None:
+                    raise RuntimeError(f'Term "{function(*point)}" is not a state variable of the layout')
+                values[slot] = self.encode_value(slot, value)
+        return PackedState(self, atoms, values)
+
+    def _atom_index_or_fail(self, predicate, point):
+        index = self.atom_index(predicate, point)
+        if index is None:
+            raise RuntimeError(f'Atom "{predicate(*point)}" is not a state variable of the layout')
+        return index
+
+
+class PackedState:
+    """ A state represented as a bitset with the truth value of all ground atoms that are state variables, plus an
+    array with the values of all function-valued state variables, the meaning of which is given by a `StateLayout`.
+    Packed states are immutable and hashable, and offer the read-only interface of `Model` that the evaluators rely
+    on (i.e. methods `holds` and `value`), so that formulas can be evaluated on them as usual.
+    """
+    __slots__ = ('layout', 'atoms', 'values', '_hash')
+
+    def __init__(self, layout: StateLayout, atoms: int, values: array):
+        self.layout = layout
+        self.atoms = atoms
+        self.values = values
+        self._hash = None
+
+    @property
+    def language(self):
+        return self.layout.language
+
+    @property
+    def evaluator(self):
+        return self.layout.evaluator
+
+    def holds(self, predicate: Predicate, point):
+        """ Return true iff the given predicate is true on the given point in the current state """
+        index = self.layout.atom_index(predicate, point)
+        if index is None:
+            return self.layout.static.holds(predicate, point)
+        return (self.atoms >> index) & 1 == 1
+
+    def value(self, fun, point):
+        """ Return the value of the given function on the given point in the current state """
+        slot = self.layout.slot_index(fun, point)
+        if slot is None:
+            return self.layout.static.value(fun, point)
+        return self.layout.decode_value(slot, self.values[slot])
+
+    def get_extension(self, symbol):
+        """ Return the extension of the given (predicate or function) symbol in the state, in the same format used
+        by `Model.get_extension`. """
+        layout = self.layout
+        if symbol not in layout.fluent_symbols:
+            return layout.static.get_extension(symbol)
+
+        if isinstance(symbol, Predicate):
+            return {wrap_tuple(layout.variables[i].binding)
+                    for i in layout.symbol_positions[symbol] if (self.atoms >> i) & 1}
+
+        definition = ExtensionalFunctionDefinition()
+        for slot in layout.symbol_positions[symbol]:
+            value = self.values[slot]
+            if value == value and value != layout.undefined:
+                definition.set(tuple(layout.slot_variables[slot].binding), layout.decode_value(slot, value))
+        return definition
+
+    def true_atoms(self):
+        """ Return an iterator over the indexes of all ground atoms true in the state, in increasing order. """
+        atoms = self.atoms
+        while atoms:
+            lowest = atoms & -atoms
+            yield lowest.bit_length() - 1
+            atoms ^= lowest
+
+    def to_model(self):
+        return self.layout.unpack(self)
+
+    def as_atoms(self):
+        return self.to_model().as_atoms()
+
+    def __getitem__(self, arg):
+        try:
+            expr, sigma = arg
+            return self.evaluator(expr, self, sigma)
+        except (ValueError, TypeError):
+            return self.evaluator(arg, self)
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash((self.atoms, self.values.tobytes()))
+        return self._hash
+
+    def __eq__(self, other):
+        return self.__class__ is other.__class__ and self.layout is other.layout and self.atoms == other.atoms \
+            and self.values.tobytes() == other.values.tobytes()
+
+    def __str__(self):
+        return f'PackedState(num_true_atoms="{bin(self.atoms).count("1")}", num_values="{len(self.values)}")'
+    __repr__ = __str__
+
+
+class StateRegistry:
+    """ A registry that stores each distinct packed state of a given layout only once, and identifies it by a
+    consecutive integer id. Only the bitset of atoms of each state is kept, plus the bytes of its array of values if
+    the layout has function-valued state variables; `PackedState` objects are recreated on demand by `lookup`. """
+    def __init__(self, layout: StateLayout):
+        self.layout = layout
+        self.ids = dict()  # The id of each state, keyed by its atoms, or by its atoms and values
+        self.atoms = []
+        self.values = [] if layout.num_slots else None
+        self._empty = array(layout.typecode)
+
+    def insert(self, state: PackedState):
+        """ Return a pair with the id of the given state and whether it has just been registered """
+        if self.values is None:
+            key = state.atoms
+        else:
+            key = (state.atoms, state.values.tobytes())
+        sid = self.ids.get(key)
+        if sid is not None:
+            return sid, False
+        sid = self.ids[key] = len(self.atoms)
+        self.atoms.append(state.atoms)
+        if self.values is not None:
+            self.values.append(key[1])
+        return sid, True
+
+    def lookup(self, sid):
+        """ Return the packed state with the given id """
+        if self.values is None:
+            return PackedState(self.layout, self.atoms[sid], self._empty)
+        values = array(self.layout.typecode)
+        values.frombytes(self.values[sid])
+        return PackedState(self.layout, self.atoms[sid], values)
+
+    def __len__(self):
+        return len(self.atoms)
+
+
+def create_state_layout(problem, state_variables=None):
+    """ Create a state layout for the given problem. If no index of state variables is given, the state variables
+    are computed by exhaustively grounding the problem fluent symbols with the `NaiveGroundingStrategy`. """
+    if state_variables is None:
+        from ..grounding import NaiveGroundingStrategy
+        state_variables = NaiveGroundingStrategy(problem).ground_state_variables()
+    return StateLayout(state_variables, problem.init)
@@ -0,0 +1,333 @@
+"""
+    Parallel best-first search over a pool of worker processes with hash-based distribution of states (HDA*, see
+    Kishimoto, Fukunaga and Botea, "Scalable, Parallel Best-First Search for Optimal Sequential Planning", ICAPS 2009).
+"""
+import heapq
+import logging
+import multiprocessing
+import queue
+import time
+
+from .applicability import apply
+from .best_first import SearchResult, SearchStatistics
+from .blind import make_root_node, make_child_node
+from .heuristics import DEAD_END
+from .model import SearchModel, ForwardSearchModel, LiftedForwardSearchModel
+from .packed import PackedState, create_state_layout
+
+# The search run by the worker processes, which inherit it from the parent process when forked, so that neither the
+# model nor the heuristic need to be serialized
+_search = None
+
+
+def can_search_in_parallel():
+    """ Return true iff worker processes can be forked on this platform """
+    return 'fork' in multiprocessing.get_all_start_methods()
+
+
+class HashDistributedSearch:
+    """ A parallel best-first search in which each state is owned by one of `workers` processes, given by the hash of
+    its packed representation. Each worker keeps the open list and the duplicate detection table of the states it
+    owns, evaluates their heuristic value and expands them by increasing `weight_g * g + weight_h * h`; successors
+    owned by other workers are sent to them in batches through queues, once every `batch_size` expansions or whenever
+    the worker runs out of work.
+
+    Search nodes refer to their parent through the owner and local index of the parent node. When the search ends,
+    the plan is traced back by asking each owner in turn for the operator and parent of the next node.
+
+    If `optimal` is true, the search does not stop at the first solution: the cost of the best solution found so far
+    is shared by all workers, which discard every node with `g + h` no smaller than it, and the search terminates
+    when no worker has nodes left and no batch is in transit. The solution is then optimal if the heuristic is
+    admissible. Termination is detected with a shared counter of the batches sent but not yet processed, and a flag
+    for each idle worker, which are read and written under a common lock.
+
+    The search stops after `time_limit` seconds, if given, or once `max_expansions` expansions, if non-negative, have
+    been reported by the workers, which do so after each batch of expansions, so that the limit can be slightly
+    exceeded.
+
+    The model must be a `ForwardSearchModel` over ground operators; states are packed with the given `StateLayout`,
+    or with one covering all fluent atoms of the problem if none is given. Worker processes are forked, and thus
+    share the model and heuristic with the parent process at no cost. If some worker terminates unexpectedly, e.g.
+    because the heuristic raises an exception, the search is aborted with a `RuntimeError`.
+    """
+    def __init__(self, model: SearchModel, heuristic, workers=None, weight_g=1, weight_h=1, optimal=True,
+                 layout=None, batch_size=32, max_expansions=-1, time_limit=None):
+        if not isinstance(model, ForwardSearchModel) or isinstance(model, LiftedForwardSearchModel):
+            # Workers refer to operators by their index in the set of ground operators of the model, which must thus
+            # be fixed before the workers are forked
+            raise RuntimeError(f'Parallel search requires a forward search model over ground operators, '
+                               f'not a "{type(model).__name__}"')
+        self.model = model
+        self.heuristic = heuristic
+        self.workers = workers or multiprocessing.cpu_count()
+        self.weight_g = weight_g
+        self.weight_h = weight_h
+        self.optimal = optimal
+        self.layout = layout
+        self.batch_size = batch_size
+        self.max_expansions = max_expansions
+        self.time_limit = time_limit
+        self.stats = None
+        self.worker_stats = None
+
+    def run(self):
+        return self.search(self.model.init())
+
+    def search(self, s0):
+        if not can_search_in_parallel():
+            raise RuntimeError('Parallel search requires forking worker processes, which is not supported here')
+        if self.layout is None:
+            self.layout = s0.layout if isinstance(s0, PackedState) else create_state_layout(self.model.problem)
+        if not isinstance(s0, PackedState) or s0.layout is not self.layout:
+            s0 = self.layout.pack(s0)
+        _ = self.model.successor_generator  # Ground the problem before forking, so that workers share the operators
+        self.operators = self.model.operators
+        self.operator_index = {id(op): i for i, op in enumerate(self.operators)}
+
+        context = multiprocessing.get_context('fork')
+        self.lock = context.Lock()
+        self.in_transit = context.Value('q', 0, lock=False)  # The number of batches sent but not yet processed
+        self.idle = context.Array('b', self.workers, lock=False)
+        self.done = context.Value('b', 0, lock=False)
+        self.aborted = context.Value('b', 0, lock=False)  # Whether the expansion limit has been reached
+        self.expanded = context.Value('q', 0, lock=False)
+        self.incumbent = context.Value('d', DEAD_END, lock=False)  # The cost of the best solution found
+        self.incumbent_node = context.Array('q', [-1, -1], lock=False)  # Its owner and local index
+        self.inboxes = [context.Queue() for _ in range(self.workers)]
+        self.results = context.Queue()
+
+        global _search  # pylint: disable=global-statement
+        _search = self
+        start = time.perf_counter()
+        processes = [context.Process(target=_run_worker, args=(i, s0)) for i in range(self.workers)]
+        try:
+            for process in processes:
+                process.start()
+            status, plan = self._supervise(start, processes)
+            self.worker_stats = [None] * self.workers
+            for inbox in self.inboxes:
+                inbox.put(('stop', None))
+            for _ in range(self.workers):
+                index, stats = self._result(processes)
+                self.worker_stats[index] = stats
+            for process in processes:
+                process.join()
+        finally:
+            _search = None
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+        stats = self.stats = SearchStatistics()
+        for worker in self.worker_stats:
+            for attribute in ('expanded', 'evaluated', 'generated', 'reopened', 'dead_ends', 'pruned'):
+                setattr(stats, attribute, getattr(stats, attribute) + getattr(worker, attribute))
+        stats.time = time.perf_counter() - start
+        logging.info("Parallel search finished with status \"{}\". {}".format(status, stats))
+
+        node = None
+        if plan is not None:
+            node = make_root_node(s0)
+            for operator in plan:
+                node = make_child_node(node, operator, apply(node.state, operator), node.g + self.model.cost(operator))
+        return SearchResult(status, node, stats)
+
+    def _supervise(self, start, processes):
+        """ Wait for the workers to finish the search, and return the status of the search and the plan, if any """
+        while not self.done.value:
+            self._check_workers(processes, running=True)
+            if self.time_limit is not None and time.perf_counter() - start >= self.time_limit:
+                with self.lock:
+                    self.done.value = 1
+                return 'time limit', None
+            time.sleep(0.001)
+
+        if self.aborted.value:
+            return 'expansion limit', None
+        if self.incumbent.value == DEAD_END:
+            return 'unsolvable', None
+
+        plan, (owner, index) = [], self.incumbent_node[:]
+        while index >= 0:
+            self.inboxes[owner].put(('trace', index))
+            operator, (owner, index) = self._result(processes)
+            if operator >= 0:
+                plan.append(self.operators[operator])
+        plan.reverse()
+        return 'solved', plan
+
+    def _check_workers(self, processes, running=False):
+        """ Abort the search if some worker has failed, or has finished while the search is `running` """
+        for i, process in enumerate(processes):
+            if process.exitcode is not None and (running or process.exitcode != 0):
+                with self.lock:
+                    self.done.value = 1
+                raise RuntimeError(f'Search worker {i} terminated unexpectedly with exit code {process.exitcode}')
+
+    def _result(self, processes):
+        """ Return the next message sent by the workers to the parent process, checking that they are still alive """
+        while True:
+            try:
+                return self.results.get(timeout=0.01)
+            except queue.Empty:
+                self._check_workers(processes)
+
+    def owner(self, state):
+        return hash(state) % self.workers
+
+
+class HDAStar(HashDistributedSearch):
+    """ Hash-distributed A*: a parallel A* search that returns optimal solutions with admissible heuristics """
+    def __init__(self, model: SearchModel, heuristic, workers=None, **kwargs):
+        super().__init__(model, heuristic, workers, weight_g=1, weight_h=1, optimal=True, **kwargs)
+
+
+def _run_worker(index, s0):
+    _Worker(_search, index).run(s0)
+
+
+class _Worker:
+    """ The state of one of the worker processes of a `HashDistributedSearch` """
+    def __init__(self, search, index):
+        self.search = search
+        self.index = index
+        self.layout = search.layout
+        self.stats = SearchStatistics()
+        self.open = []
+        self.counter = 0
+        self.g_values = dict()  # The cost of the cheapest known path to each owned state
+        self.h_values = dict()
+        self.closed = set()
+        self.nodes = []  # For each local node, the pair (operator index, (owner, index) of the parent node)
+        self.reported = 0  # The number of expansions already added to the shared count
+        self.requests = []
+        self.outboxes = [[] for _ in range(search.workers)]
+
+    def run(self, s0):
+        search = self.search
+        if search.owner(s0) == self.index:
+            self.insert(s0.atoms, s0.values, 0, -1, (-1, -1))
+
+        inbox = search.inboxes[self.index]
+        while not search.done.value:
+            self.receive(inbox, block=False)
+            if self.open:
+                self.expand()
+                self.flush()
+                continue
+
+            with search.lock:
+                search.idle[self.index] = 1
+                if search.in_transit.value == 0 and all(search.idle):
+                    search.done.value = 1
+            self.receive(inbox, block=True)
+
+        self.serve(inbox)
+
+    def receive(self, inbox, block):
+        """ Insert the nodes of all batches in the inbox, waiting briefly for one if `block` is true """
+        search = self.search
+        while True:
+            try:
+                message = inbox.get(timeout=0.001) if block else inbox.get_nowait()
+            except queue.Empty:
+                return
+            kind, batch = message
+            if kind != 'nodes':  # A request sent once the search is over, which is served afterwards
+                self.requests.append(message)
+                return
+            with search.lock:
+                search.idle[self.index] = 0
+            for atoms, values, g, operator, parent in batch:
+                self.insert(atoms, values, g, operator, parent)
+            with search.lock:
+                search.in_transit.value -= 1
+            block = False
+
+    def insert(self, atoms, values, g, operator, parent):
+        search = self.search
+        state = PackedState(self.layout, atoms, values)
+        known = self.g_values.get(state)
+        if known is not None and known <= g:
+            return
+        h = self.h_values.get(state)
+        if h is None:
+            h = self.h_values[state] = search.heuristic(state)
+            self.stats.evaluated += 1
+            if h == DEAD_END:
+                self.stats.dead_ends += 1
+        if h == DEAD_END:
+            return
+        if state in self.closed:
+            self.stats.reopened += 1
+        self.g_values[state] = g
+        self.nodes.append((operator, parent))
+        self.counter += 1
+        f = search.weight_g * g + search.weight_h * h
+        heapq.heappush(self.open, (f, h, -self.counter, g, len(self.nodes) - 1, state))
+
+    def expand(self):
+        search, model = self.search, self.search.model
+        for _ in range(search.batch_size):
+            if not self.open or search.done.value:
+                break
+            _, h, _, g, node, state = heapq.heappop(self.open)
+            if g > self.g_values[state]:
+                continue
+            if g + h >= search.incumbent.value:
+                self.stats.pruned += 1
+                continue
+
+            if model.is_goal(state):
+                with search.lock:
+                    if g < search.incumbent.value:
+                        search.incumbent.value = g
+                        search.incumbent_node[:] = [self.index, node]
+                    if not search.optimal:
+                        search.done.value = 1
+                continue
+
+            self.closed.add(state)
+            self.stats.expanded += 1
+            for operator, successor in model.successors(state):
+                self.stats.generated += 1
+                message = (successor.atoms, successor.values, g + model.cost(operator),
+                           search.operator_index[id(operator)], (self.index, node))
+                owner = search.owner(successor)
+                if owner == self.index:
+                    self.insert(*message)
+                else:
+                    self.outboxes[owner].append(message)
+
+        with search.lock:
+            search.expanded.value += self.stats.expanded - self.reported
+            self.reported = self.stats.expanded
+            if 0 <= search.max_expansions <= search.expanded.value:
+                search.aborted.value = 1
+                search.done.value = 1
+
+    def flush(self):
+        """ Send the batches of nodes owned by other workers """
+        search = self.search
+        if search.done.value:
+            return
+        for owner, batch in enumerate(self.outboxes):
+            if batch:
+                with search.lock:
+                    search.in_transit.value += 1
+                search.inboxes[owner].put(('nodes', batch))
+                self.outboxes[owner] = []
+
+    def serve(self, inbox):
+        """ Once the search is over, answer the requests to trace back the plan, until asked to stop """
+        search = self.search
+        while True:
+            kind, content = self.requests.pop(0) if self.requests else inbox.get()
+            if kind == 'trace':
+                search.results.put(self.nodes[content])
+            elif kind == 'stop':
+                search.results.put((self.index, self.stats))
+                # Batches sent to workers that have already stopped are of no use: do not wait for them to be read
+                for other in search.inboxes:
+                    other.cancel_join_thread()
+                return
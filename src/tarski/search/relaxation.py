@@ -0,0 +1,286 @@
+"""
+    Delete-relaxation heuristics (h_max, h_add and h_FF) over an integer-indexed representation of a ground STRIPS
+    task, computed with NumPy arrays.
+"""
+from .. import modules
+from ..evaluators.simple import evaluate
+from ..fstrips import AddEffect, DelEffect
+from ..fstrips.representation import collect_literals_from_conjunction
+from ..grounding.ops import approximate_symbol_fluency
+from ..syntax import Constant, Predicate, Tautology
+from ..syntax.transform.action_grounding import ground_problem_schemas_into_plain_operators
+from .heuristics import Heuristic, DEAD_END
+from .packed import PackedState
+
+
+class RelaxedTask:
+    """ The delete relaxation of a set of ground STRIPS operators, possibly with negated preconditions and
+    conditional effects, decomposed into unary operators: one for each add effect of each operator, whose
+    preconditions are the positive preconditions of the operator plus those of the effect condition. Delete effects
+    and negative literals are ignored, and literals over static symbols (including builtin ones) are evaluated once
+    in the initial state of the problem; operators with some false static precondition are discarded.
+
+    Fluent atoms are identified by consecutive integers, and all per-atom and per-unary-operator information is held
+    in NumPy arrays: the number of preconditions, the effect and the cost of each unary operator, and, in compressed
+    sparse row format, the preconditions of each unary operator and the unary operators that have each atom as a
+    precondition.
+    """
+    def __init__(self, problem, operators, costs=None):
+        np = self.np = modules.import_numpy()
+        self.problem = problem
+        self.operators = list(operators)
+        fluents, _ = approximate_symbol_fluency(problem)
+        self.fluent_predicates = {s for s in fluents if isinstance(s, Predicate)}
+        self.atoms = []  # The key (predicate name, tuple of object names) of each atom
+        self.atom_index = dict()
+
+        preconditions, effects, unary_costs, origins = [], [], [], []
+        for index, op in enumerate(self.operators):
+            pre = self._conditions(op.precondition, op)
+            if pre is None:
+                continue
+            cost = 1 if costs is None else costs[index]
+            for eff in op.effects:
+                if isinstance(eff, DelEffect):
+                    continue
+                if not isinstance(eff, AddEffect):
+                    raise RuntimeError(f'Effect "{eff}" of operator "{op}" is not a STRIPS effect')
+                condition = self._conditions(eff.condition, op)
+                if condition is None:
+                    continue
+                preconditions.append(sorted(set(pre + condition)))
+                effects.append(self._index(eff.atom, op))
+                unary_costs.append(cost)
+                origins.append(index)
+
+        self.goals = self._conditions(problem.goal, problem.goal)
+        self.unsolvable = self.goals is None  # i.e. the goal has some false static literal
+        self.goals = np.array(sorted(set(self.goals or [])), dtype=np.int64)
+
+        # The unary operators
+        self.preconditions = preconditions  # As lists of atom indexes, for the extraction of relaxed plans
+        self.num_preconditions = np.array([len(pre) for pre in preconditions], dtype=np.int64)
+        self.effect = np.array(effects, dtype=np.int64)
+        self.cost = np.array(unary_costs, dtype=np.float64)
+        self.origin = np.array(origins, dtype=np.int64)  # The index of the operator of each unary operator
+        self.free = np.flatnonzero(self.num_preconditions == 0)
+
+        # The unary operators that have each atom as a precondition, in CSR format
+        num_atoms = len(self.atoms)
+        occurrences = [[] for _ in range(num_atoms)]
+        for u, pre in enumerate(preconditions):
+            for atom in pre:
+                occurrences[atom].append(u)
+        self.offsets = np.zeros(num_atoms + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum([len(x) for x in occurrences])
+        self.triggered = np.array([u for x in occurrences for u in x], dtype=np.int64)
+        self._packed_indexes = dict()
+
+    @property
+    def num_atoms(self):
+        return len(self.atoms)
+
+    def _index(self, atom, element):
+        if not all(isinstance(t, Constant) for t in atom.subterms):
+            raise RuntimeError(f'Atom "{atom}" in "{element}" is not ground')
+        key = (atom.predicate.name, tuple(t.symbol for t in atom.subterms))
+        index = self.atom_index.get(key)
+        if index is None:
+            index = self.atom_index[key] = len(self.atoms)
+            self.atoms.append(key)
+        return index
+
+    def _conditions(self, phi, element):
+        """ Return the list of indexes of the fluent atoms in the positive literals of the given conjunction, or None
+        if some static literal in it is false. """
+        literals = set() if isinstance(phi, Tautology) else collect_literals_from_conjunction(phi)
+        if literals is None:
+            raise RuntimeError(f'Formula "{phi}" in "{element}" is not a conjunction of literals')
+        atoms = []
+        for atom, positive in literals:
+            if atom.predicate in self.fluent_predicates:
+                if positive:
+                    atoms.append(self._index(atom, element))
+            elif bool(evaluate(atom, self.problem.init)) != positive:
+                return None
+        return atoms
+
+    def state_atoms(self, state):
+        """ Return the array of indexes of the atoms of the task that are true in the given state, which can be a
+        model or a `PackedState`. """
+        np = self.np
+        if isinstance(state, PackedState):
+            layout = state.layout
+            indexes = self._packed_indexes.get(id(layout))
+            if indexes is None or indexes[0] is not layout:
+                mapping = np.array([self.atom_index.get((v.symbol.name, tuple(c.symbol for c in v.binding)), -1)
+                                    for v in layout.variables], dtype=np.int64)
+                indexes = self._packed_indexes[id(layout)] = (layout, mapping)
+            mapping = indexes[1]
+            data = state.atoms.to_bytes((len(mapping) + 7) // 8, 'little')
+            bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8), bitorder='little')[:len(mapping)]
+            atoms = mapping[np.flatnonzero(bits)]
+            return atoms[atoms >= 0]
+
+        atoms = []
+        for predicate in self.fluent_predicates:
+            for point in state.get_extension(predicate):
+                index = self.atom_index.get((predicate.name, tuple(ref.expr.symbol for ref in point)))
+                if index is not None:
+                    atoms.append(index)
+        return np.array(atoms, dtype=np.int64)
+
+    def explore(self, atoms, additive):
+        """ Compute the h_add (if `additive`) or h_max cost of each atom from the state where the given atoms are
+        true, by the generalized Dijkstra algorithm: atoms are settled in order of increasing cost, all the atoms with
+        the same cost at once, and each unary operator fires when the counter of its preconditions not yet settled
+        drops to zero. The exploration stops as soon as all goal atoms are settled.
+
+        Return a pair with the array of atom costs (infinity for unreachable atoms) and the array with the unary
+        operator that achieves each atom at its cost (-1 for the atoms that are true in the state).
+        """
+        np = self.np
+        cost = np.full(self.num_atoms, np.inf)
+        cost[atoms] = 0
+        supporter = np.full(self.num_atoms, -1, dtype=np.int64)
+        settled = np.zeros(self.num_atoms, dtype=bool)
+        counter = self.num_preconditions.copy()
+        accumulated = np.zeros(len(counter))  # The sum or maximum of the costs of the preconditions of each operator
+        self._fire(self.free, accumulated, cost, supporter, settled)
+
+        open_cost = cost.copy()
+        while True:
+            m = open_cost.min()
+            if m == np.inf:
+                break
+            frontier = np.flatnonzero(open_cost == m)
+            settled[frontier] = True
+            open_cost[frontier] = np.inf
+            if settled[self.goals].all():
+                break
+
+            triggered = self._triggered_by(frontier)
+            if not len(triggered):
+                continue
+            ops, counts = np.unique(triggered, return_counts=True)
+            counter[ops] -= counts
+            if additive:
+                accumulated[ops] += counts * m
+            else:
+                accumulated[ops] = m  # Atoms are settled by increasing cost: m is the largest precondition cost
+            ready = ops[counter[ops] == 0]
+            if len(ready):
+                updated = self._fire(ready, accumulated, cost, supporter, settled)
+                open_cost[updated] = cost[updated]
+        return cost, supporter
+
+    def _triggered_by(self, atoms):
+        """ The unary operators that have some of the given atoms as precondition, once per occurrence """
+        np = self.np
+        starts = self.offsets[atoms]
+        lengths = self.offsets[atoms + 1] - starts
+        total = lengths.sum()
+        if not total:
+            return np.zeros(0, dtype=np.int64)
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        return self.triggered[positions]
+
+    def _fire(self, ready, accumulated, cost, supporter, settled):
+        """ Update the cost of the effects of the given unary operators, and return the array of updated atoms """
+        np = self.np
+        effects = self.effect[ready]
+        candidates = self.cost[ready] + accumulated[ready]
+        improves = ~settled[effects] & (candidates < cost[effects])
+        ready, effects, candidates = ready[improves], effects[improves], candidates[improves]
+        np.minimum.at(cost, effects, candidates)
+        best = candidates == cost[effects]
+        supporter[effects[best]] = ready[best]
+        return effects
+
+    def relaxed_plan(self, atoms, cost, supporter):
+        """ Return the set of unary operators of the relaxed plan that achieves the goal from the state where the given
+        atoms are true, following the best supporters found by `explore`. """
+        in_state = self.np.zeros(self.num_atoms, dtype=bool)
+        in_state[atoms] = True
+        plan, marked = set(), set()
+        stack = self.goals.tolist()
+        while stack:
+            atom = stack.pop()
+            if atom in marked or in_state[atom]:
+                continue
+            marked.add(atom)
+            u = int(supporter[atom])
+            if u not in plan:
+                plan.add(u)
+                stack.extend(self.preconditions[u])
+        return plan
+
+
+class RelaxationHeuristic(Heuristic):
+    """ The base class of the heuristics computed on the delete relaxation of the ground operators of the given
+    `ForwardSearchModel`, with the operator costs given by the model. """
+    additive = True
+
+    def __init__(self, model):
+        if model.operators is None:
+            model.operators = ground_problem_schemas_into_plain_operators(model.problem)
+        self.model = model
+        self.task = RelaxedTask(model.problem, model.operators, [model.cost(op) for op in model.operators])
+
+    def evaluate(self, state):
+        if self.task.unsolvable:
+            return DEAD_END
+        atoms = self.task.state_atoms(state)
+        cost, supporter = self.task.explore(atoms, self.additive)
+        goal_costs = cost[self.task.goals]
+        if (goal_costs == DEAD_END).any():
+            return DEAD_END
+        return self._value(atoms, goal_costs, cost, supporter)
+
+    def _value(self, atoms, goal_costs, cost, supporter):
+        raise NotImplementedError()
+
+
+class HMaxHeuristic(RelaxationHeuristic):
+    """ The h_max heuristic: the maximum over the goal atoms of the cost of the most expensive precondition path to
+    them in the delete relaxation. It is admissible. """
+    additive = False
+
+    def _value(self, atoms, goal_costs, cost, supporter):
+        return float(goal_costs.max()) if len(goal_costs) else 0
+
+
+class HAddHeuristic(RelaxationHeuristic):
+    """ The h_add heuristic: the sum over the goal atoms of their cost in the delete relaxation, where the cost of a
+    set of atoms is the sum of the costs of its elements. It is not admissible. """
+    def _value(self, atoms, goal_costs, cost, supporter):
+        return float(goal_costs.sum())
+
+
+class FFHeuristic(RelaxationHeuristic):
+    """ The FF heuristic: the cost of a relaxed plan extracted backwards from the goal with the best supporters of
+    h_add. The operators of the relaxed plan whose positive preconditions (and those of the effect through which they
+    enter the plan) hold in the evaluated state are its preferred operators, which are available through
+    `preferred_operators` after each evaluation. """
+    def __init__(self, model):
+        super().__init__(model)
+        self.preferred = []
+
+    def evaluate(self, state):
+        self.preferred = []
+        return super().evaluate(state)
+
+    def _value(self, atoms, goal_costs, cost, supporter):
+        task = self.task
+        plan = task.relaxed_plan(atoms, cost, supporter)
+        operators = {int(task.origin[u]) for u in plan}
+        in_state = set(atoms.tolist())
+        preferred = {int(task.origin[u]) for u in plan if in_state.issuperset(task.preconditions[u])}
+        self.preferred = [task.operators[i] for i in sorted(preferred)]
+        return sum(self.model.cost(task.operators[i]) for i in operators)
+
+    def preferred_operators(self, state=None):
+        """ Return the preferred operators of the given state, or of the last evaluated state if none is given """
+        if state is not None:
+            self.evaluate(state)
+        return self.preferred
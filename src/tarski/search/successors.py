@@ -0,0 +1,168 @@
+"""
+    Efficient computation of the set of ground operators applicable in a given state.
+"""
+from collections import Counter
+
+from ..evaluators.compiled import compile_expression
+from ..syntax import Atom, CompoundTerm, Constant, Tautology, BuiltinPredicateSymbol, is_and, is_neg
+
+
+class MatchTreeNode:
+    """ A node of the match tree. Nodes that test some state variable send the search down to the child that
+    corresponds to the value of that variable in the state, as well as to the child that holds the operators that do
+    not care about the variable. """
+    __slots__ = ('probe', 'children', 'dontcare', 'operators')
+
+    def __init__(self):
+        self.probe = None  # A function mapping a state to the value of the state variable tested by the node
+        self.children = dict()
+        self.dontcare = None
+        self.operators = []  # The operators whose (simple) preconditions have all been tested on the way to the node
+
+
+class SuccessorGenerator:
+    """ A successor generator in the style of a match tree (or precondition decision tree) over a given set of ground
+    operators, which allows to retrieve the operators applicable in a state without evaluating the precondition
+    of each of them.
+
+    Each conjunct of an operator precondition that is a (possibly negated) ground atom or an equality between a
+    ground function term and a constant is considered a test on a state variable, and is encoded in the tree.
+    The remaining conjuncts, if any, are evaluated on the state for each operator that reaches a leaf of the tree.
+    State variables are tested in order of decreasing frequency in the operator preconditions, which keeps the tree
+    small. Operators with contradictory preconditions are never returned. If a table of static denotations is given,
+    it is used when evaluating the residual conjuncts.
+    """
+    def __init__(self, operators, static=None):
+        self.root = MatchTreeNode()
+        self.num_operators = 0
+
+        entries = []
+        counts = Counter()
+        probes = dict()
+        for op in operators:
+            conditions = dict()
+            residual = []
+            if not compile_precondition(op.precondition, conditions, residual, probes):
+                continue  # The operator can never be applied
+            counts.update(conditions.keys())
+            entries.append((op, conditions, [compile_expression(phi, static) for phi in residual]))
+
+        # Rank state variables by decreasing number of operators that test them
+        ranking = {key: rank for rank, (key, _) in enumerate(counts.most_common())}
+        order = [key for key, _ in counts.most_common()]
+
+        work = [(self.root, [(op, sorted((ranking[k], v) for k, v in conditions.items()), residual, 0)
+                             for op, conditions, residual in entries])]
+        while work:
+            node, items = work.pop()
+            pending = []
+            for item in items:
+                op, tests, residual, position = item
+                if position == len(tests):
+                    node.operators.append((op, residual))
+                    self.num_operators += 1
+                else:
+                    pending.append(item)
+
+            if not pending:
+                continue
+
+            tested = min(item[1][item[3]][0] for item in pending)
+            node.probe = probes[order[tested]]
+            partitions, dontcare = dict(), []
+            for op, tests, residual, position in pending:
+                rank, value = tests[position]
+                if rank == tested:
+                    partitions.setdefault(value, []).append((op, tests, residual, position + 1))
+                else:
+                    dontcare.append((op, tests, residual, position))
+
+            for value, children in partitions.items():
+                node.children[value] = child = MatchTreeNode()
+                work.append((child, children))
+            if dontcare:
+                node.dontcare = MatchTreeNode()
+                work.append((node.dontcare, dontcare))
+
+    def applicable(self, state):
+        """ Return an iterator over all operators applicable in the given state. """
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            for op, residual in node.operators:
+                if all(phi(state) for phi in residual):
+                    yield op
+
+            if node.probe is not None:
+                child = node.children.get(node.probe(state))
+                if child is not None:
+                    stack.append(child)
+                if node.dontcare is not None:
+                    stack.append(node.dontcare)
+
+
+def compile_precondition(phi, conditions, residual, probes):
+    """ Decompose the given ground precondition into a set of tests on state variables, which are added to the
+    `conditions` dictionary, and a list of residual formulas. Return False if the precondition is found to be
+    contradictory, True otherwise. """
+    if isinstance(phi, Tautology):
+        return True
+
+    if is_and(phi):
+        return all(compile_precondition(sub, conditions, residual, probes) for sub in phi.subformulas)
+
+    test = as_state_variable_test(phi, probes)
+    if test is None:
+        residual.append(phi)
+        return True
+
+    key, value = test
+    if conditions.setdefault(key, value) != value:
+        return False
+    return True
+
+
+def as_state_variable_test(phi, probes):
+    """ Return a pair (key, value) if the given formula is a test on the value of a state variable, or None if it is
+    not. The probe that retrieves the value of the state variable from a state is registered in `probes`. """
+    value = True
+    if is_neg(phi):
+        value = False
+        phi = phi.subformulas[0]
+
+    if not isinstance(phi, Atom) or not all(isinstance(t, Constant) for t in phi.subterms):
+        if value and isinstance(phi, Atom) and phi.predicate.name == BuiltinPredicateSymbol.EQ:
+            return as_function_value_test(phi, probes)
+        return None
+
+    predicate, point = phi.predicate, tuple(phi.subterms)
+    if predicate.builtin:
+        return None
+
+    key = (predicate, tuple(c.symbol for c in point))
+    if key not in probes:
+        probes[key] = lambda state: state.holds(predicate, point)
+    return key, value
+
+
+def as_function_value_test(phi, probes):
+    lhs, rhs = phi.subterms
+    if isinstance(lhs, Constant):
+        lhs, rhs = rhs, lhs
+
+    if not isinstance(lhs, CompoundTerm) or not isinstance(rhs, Constant) or lhs.symbol.builtin or \
+            not all(isinstance(t, Constant) for t in lhs.subterms):
+        return None
+
+    function, point = lhs.symbol, tuple(lhs.subterms)
+    key = (function, tuple(c.symbol for c in point))
+    if key not in probes:
+        probes[key] = lambda state: probe_value(state, function, point)
+    return key, rhs.symbol
+
+
+def probe_value(state, function, point):
+    try:
+        return state.value(function, point).symbol
+    except KeyError:  # The value of the term is undefined in the state
+        return None
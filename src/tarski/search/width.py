@@ -0,0 +1,172 @@
+"""
+    Width-based search engines: IW(k), serialized IW (SIW) and best-first width search (BFWS), see e.g.
+    Lipovetzky and Geffner, "Width and Serialization of Classical Planning Problems" (ECAI 2012) and "Best-First
+    Width Search: Exploration and Exploitation in Classical Planning" (AAAI 2017).
+"""
+import heapq
+import logging
+import time
+from collections import deque
+
+from .best_first import SearchResult, SearchStatistics, limit_reached
+from .blind import make_root_node, make_child_node
+from .heuristics import GoalCountHeuristic
+from .model import SearchModel
+from .novelty import NoveltyTable
+from .packed import PackedState, create_state_layout
+
+
+class WidthBasedSearch:
+    """ The base class of width-based search engines. The novelty of states is computed over the indexes that the
+    given `StateLayout` assigns to their atoms. If no layout is given and the states of the model are packed, their
+    own layout is used; otherwise, a layout with all ground fluent atoms of the problem is created. Function-valued
+    state variables are disregarded.
+    """
+    def __init__(self, model: SearchModel, layout=None, max_expansions=-1, time_limit=None):
+        self.model = model
+        self.layout = layout
+        self.max_expansions = max_expansions
+        self.time_limit = time_limit
+        self.stats = None
+
+    def run(self):
+        return self.search(self.model.init())
+
+    def search(self, s0):
+        if self.layout is None:
+            self.layout = s0.layout if isinstance(s0, PackedState) else create_state_layout(self.model.problem)
+        stats = self.stats = SearchStatistics()
+        start = time.perf_counter()
+        status, node = self._search(make_root_node(s0), stats, start)
+        stats.time = time.perf_counter() - start
+        logging.info("Search finished with status \"{}\". {}".format(status, stats))
+        return SearchResult(status, node, stats)
+
+    def _search(self, root, stats, start):
+        raise NotImplementedError()
+
+    def atoms(self, state):
+        """ Return the bitset of the atoms true in the given state """
+        if isinstance(state, PackedState) and state.layout is self.layout:
+            return state.atoms
+        return self.layout.pack(state).atoms
+
+    def new_table(self, width):
+        return NoveltyTable(self.layout.num_atoms, width)
+
+
+class IteratedWidthSearch(WidthBasedSearch):
+    """ IW(k): a breadth-first search that prunes every generated state whose novelty is greater than `width`, i.e.
+    that does not make true any tuple of at most `width` atoms for the first time in the search. The search is
+    incomplete, and runs in time exponential in `width` only: IW(1) generates at most one state per atom, and IW(2)
+    one per pair of atoms. Duplicate states are never novel, hence no closed list is needed. """
+    def __init__(self, model: SearchModel, width=1, **kwargs):
+        super().__init__(model, **kwargs)
+        self.width = width
+
+    def _search(self, root, stats, start, goal=None):
+        goal = goal or self.model.is_goal
+        if goal(root.state):
+            return 'solved', root
+
+        table = self.new_table(self.width)
+        table.evaluate(self.atoms(root.state))
+        open_ = deque([root])
+        while open_:
+            node = open_.popleft()
+            limit = limit_reached(stats, start, self.max_expansions, self.time_limit)
+            if limit is not None:
+                return limit, None
+
+            stats.expanded += 1
+            for operator, successor in self.model.successors(node.state):
+                stats.generated += 1
+                stats.evaluated += 1
+                if table.evaluate(self.atoms(successor)) > self.width:
+                    stats.pruned += 1
+                    continue
+                child = make_child_node(node, operator, successor, node.g + self.model.cost(operator))
+                if goal(successor):
+                    return 'solved', child
+                open_.append(child)
+        return 'failed', None
+
+
+class SerializedIteratedWidthSearch(WidthBasedSearch):
+    """ SIW: the goal, a conjunction of literals, is achieved one literal at a time, each through a run of IW(1),
+    IW(2), ..., up to IW(`max_width`), from the state reached by the previous run, until a state is found that
+    satisfies one more goal literal than the current state, as well as all the goal literals that it satisfies. """
+    def __init__(self, model: SearchModel, max_width=2, **kwargs):
+        super().__init__(model, **kwargs)
+        self.max_width = max_width
+        self.goals = GoalCountHeuristic(model.problem).goals
+
+    def satisfied(self, state):
+        """ Return the set of indexes of the goal literals satisfied by the given state """
+        return {i for i, (atom, positive) in enumerate(self.goals) if bool(atom(state)) == positive}
+
+    def _search(self, root, stats, start):
+        node, achieved = root, self.satisfied(root.state)
+        while not self.model.is_goal(node.state):
+            def subgoal(state, achieved_=achieved):
+                satisfied = self.satisfied(state)
+                return len(satisfied) > len(achieved_) and satisfied >= achieved_
+
+            for width in range(1, self.max_width + 1):
+                iw = IteratedWidthSearch(self.model, width, layout=self.layout, max_expansions=self.max_expansions,
+                                         time_limit=self.time_limit)
+                status, result = iw._search(node, stats, start, subgoal)  # pylint: disable=protected-access
+                if status == 'solved':
+                    break
+                if status != 'failed':
+                    return status, None
+            else:
+                return 'failed', None
+            node, achieved = result, self.satisfied(result.state)
+        return 'solved', node
+
+
+class BestFirstWidthSearch(WidthBasedSearch):
+    """ BFWS(f5): a greedy best-first search that expands nodes by increasing novelty `w`, breaking ties by
+    increasing number `#g` of unsatisfied goal literals, and then in FIFO order. The novelty of each state is computed
+    with respect to the states previously generated with the same `#g` (with values 1, 2 and 3, the latter meaning
+    greater than 2), so that reaching more goals resets the exploration. Unlike IW, no state is pruned because of its
+    novelty, which makes the search complete. """
+    def __init__(self, model: SearchModel, width=2, **kwargs):
+        super().__init__(model, **kwargs)
+        self.width = width
+        self.goal_count = GoalCountHeuristic(model.problem)
+
+    def _search(self, root, stats, start):
+        tables = dict()  # The novelty table of each goal count
+
+        def evaluate(state):
+            stats.evaluated += 1
+            gc = self.goal_count(state)
+            table = tables.get(gc)
+            if table is None:
+                table = tables[gc] = self.new_table(self.width)
+            return table.evaluate(self.atoms(state)), gc
+
+        open_, counter = [], 0
+        generated = {root.state}
+        heapq.heappush(open_, (*evaluate(root.state), counter, root))
+        while open_:
+            _, _, _, node = heapq.heappop(open_)
+            if self.model.is_goal(node.state):
+                return 'solved', node
+
+            limit = limit_reached(stats, start, self.max_expansions, self.time_limit)
+            if limit is not None:
+                return limit, None
+
+            stats.expanded += 1
+            for operator, successor in self.model.successors(node.state):
+                stats.generated += 1
+                if successor in generated:
+                    continue
+                generated.add(successor)
+                counter += 1
+                child = make_child_node(node, operator, successor, node.g + self.model.cost(operator))
+                heapq.heappush(open_, (*evaluate(successor), counter, child))
+        return 'unsolvable', None
@@ -1,6 +1,7 @@
 
-from ...syntax import symref, term_substitution, Constant, create_substitution, VariableBinding
+from ...syntax import symref, Constant, create_substitution, VariableBinding
 from ...fstrips.action import Action, PlainOperator
+from .templates import schema_template
 
 
 def ground_schema_into_plain_operator(action: Action, substitution):
@@ -8,6 +9,8 @@ def ground_schema_into_plain_operator(action: Action, substitution):
     :param action: A formula, term, FSTRIPS action, or FSTRIPS action effect.
     :param substitution: A dictionary from TermReferences (expected to be Variables) to Constants.
     :return: The result of applying the substituion to the element.
+    The operator shares with the schema only the leaves of its expressions that do not mention any parameter (see
+    `ExpressionTemplate`).
     """
     for param in action.parameters:
         c = substitution.get(symref(param))
@@ -16,11 +19,11 @@ def ground_schema_into_plain_operator(action: Action, substitution):
         if not isinstance(c, Constant):
             raise RuntimeError(f'Can only ground action schemas with constant terms')
 
-    paramlist = ', '.join(substitution[symref(p)].name for p in action.parameters)
+    values = [substitution[symref(p)] for p in action.parameters]
+    paramlist = ', '.join(c.name for c in values)
     name = f'{action.name}({paramlist})'
 
-    precondition = term_substitution(action.precondition, substitution, inplace=False)
-    effects = [term_substitution(eff, substitution, inplace=False) for eff in action.effects]
+    precondition, effects = schema_template(action).instantiate(values)
     return PlainOperator(action.language, name, precondition, effects)
 
 
@@ -40,11 +43,11 @@ def ground_schema(action: Action, grounding):
         if not isinstance(c, Constant):
             raise RuntimeError(f'Can only ground action schemas with constant terms')
 
-    paramlist = ', '.join(subst[symref(p)].name for p in action.parameters)
+    values = [subst[symref(p)] for p in action.parameters]
+    paramlist = ', '.join(c.name for c in values)
     name = f'{action.name}({paramlist})'
 
-    precondition = term_substitution(action.precondition, subst, inplace=False)
-    effects = [term_substitution(eff, subst, inplace=False) for eff in action.effects]
+    precondition, effects = schema_template(action).instantiate(values)
 
     return Action(lang, name, VariableBinding(), precondition, effects)
 
@@ -56,3 +59,25 @@ def ground_schema_into_plain_operator_from_grounding(action: Action, grounding):
     binding = [lang.get_constant(name) if isinstance(name, str) else name for name in grounding]
     subst = create_substitution(action.parameters, binding)
     return ground_schema_into_plain_operator(action, subst)
+
+
+def ground_problem_schemas_into_plain_operators(problem, grounding=None):
+    """ Return the list of plain operators that result from grounding all action schemas of the given problem
+    with the parameter groundings computed by the given grounding strategy. If no strategy is given, all possible
+    parameter groundings are considered, as done by the `NaiveGroundingStrategy`. """
+    if grounding is None:
+        from ...grounding import NaiveGroundingStrategy
+        grounding = NaiveGroundingStrategy(problem)
+    return [ground_schema_into_plain_operator_from_grounding(problem.get_action(name), binding)
+            for name, bindings in grounding.ground_actions().items() for binding in bindings]
+
+
+def iterate_plain_operators(problem, grounding=None, budget=None):
+    """ Return an iterator over the plain operators returned by `ground_problem_schemas_into_plain_operators`, which
+    are created lazily, one at a time, so that they can be e.g. written to disk with constant memory. If a `budget` is
+    given and the estimated number of ground actions exceeds it, `GroundingTooLarge` is raised right away. """
+    if grounding is None:
+        from ...grounding import NaiveGroundingStrategy
+        grounding = NaiveGroundingStrategy(problem)
+    return (ground_schema_into_plain_operator_from_grounding(problem.get_action(name), binding)
+            for name, binding in grounding.iterate_ground_actions(budget))
@@ -0,0 +1,140 @@
+"""
+    Precompiled templates for the repeated instantiation of formulas, terms and effects with different values for the
+    same set of variables, e.g. to ground an action schema once for each of its parameter groundings.
+"""
+import copy
+import weakref
+
+from ..symrefs import symref
+from ..formulas import CompoundFormula, QuantifiedFormula, Atom, Formula, Tautology, Contradiction
+from ..terms import Term, CompoundTerm, Variable, Constant, IfThenElse
+from .errors import SubstitutionError
+from .substitutions import TermSubstitution, create_substitution
+
+_SEQUENCE, _SINGLE = True, False
+
+
+class ExpressionTemplate:
+    """ A formula, term or FSTRIPS effect compiled for its instantiation with different values for the given list of
+    variables. The result of `instantiate(values)` is the same as that of applying the substitution that maps the
+    i-th variable to the i-th value with `term_substitution`, but without a deep copy of the element: the positions
+    in which the variables occur are found once, when the template is created, and each instantiation creates
+    (shallow) copies of the inner nodes of the element only. Leaves, i.e. constants, variables, tautologies and
+    contradictions, as well as the symbols of the language, are shared between the element and all of its
+    instantiations, so that instantiations can be modified in place without affecting the element.
+    """
+    def __init__(self, element, variables):
+        self.element = element
+        self.variables = list(variables)
+        slots = {symref(v): i for i, v in enumerate(self.variables)}
+        instantiate = _compile(element, slots)
+        self._instantiate = instantiate if instantiate is not None else lambda values: element
+
+    def instantiate(self, values):
+        """ Return the instantiation of the template with the given values for its variables, in order """
+        return self._instantiate(values)
+
+
+class SchemaTemplate:
+    """ The precondition and effects of an action schema compiled into templates over the schema parameters. """
+    def __init__(self, action):
+        self.action = action
+        self.source = (action.precondition, tuple(action.effects))
+        self.precondition = ExpressionTemplate(action.precondition, action.parameters)
+        self.effects = [ExpressionTemplate(eff, action.parameters) for eff in action.effects]
+
+    def instantiate(self, values):
+        """ Return a pair with the precondition and the list of effects of the schema instantiated with the given
+        values for its parameters, in order """
+        return self.precondition.instantiate(values), [eff.instantiate(values) for eff in self.effects]
+
+
+_schema_templates = weakref.WeakKeyDictionary()
+
+
+def schema_template(action):
+    """ Return the template of the given action schema. Templates are computed once and reused for as long as the
+    schema lives, unless its precondition or effects are replaced. """
+    template = _schema_templates.get(action)
+    if template is None or template.source[0] is not action.precondition or \
+            template.source[1] != tuple(action.effects):
+        template = _schema_templates[action] = SchemaTemplate(action)
+    return template
+
+
+def _fields(node):
+    """ Return the attributes of the given node that hold its children, together with whether each of them is a
+    sequence of children or a single child, or None if the node is not of a type known to the template compiler. """
+    from ... import fstrips as fs
+    if isinstance(node, (Atom, CompoundTerm)):
+        return (('subterms', _SEQUENCE), )
+    if isinstance(node, CompoundFormula):
+        return (('subformulas', _SEQUENCE), )
+    if isinstance(node, QuantifiedFormula):
+        return (('formula', _SINGLE), )
+    if isinstance(node, IfThenElse):
+        return ('condition', _SINGLE), ('subterms', _SEQUENCE)
+    if isinstance(node, (fs.AddEffect, fs.DelEffect)):
+        return ('condition', _SINGLE), ('atom', _SINGLE)
+    if isinstance(node, fs.LiteralEffect):
+        return ('condition', _SINGLE), ('lit', _SINGLE)
+    if isinstance(node, fs.FunctionalEffect):
+        return ('condition', _SINGLE), ('lhs', _SINGLE), ('rhs', _SINGLE)
+    if isinstance(node, fs.UniversalEffect):
+        return ('condition', _SINGLE), ('effects', _SEQUENCE)
+    return None
+
+
+def _compile(node, slots):
+    """ Return a function that maps the values of the variables in `slots` to the instantiation of the given node,
+    or None if the node is a leaf that does not mention any of the variables, and can thus be shared by all
+    instantiations. """
+    from ... import fstrips as fs
+    if isinstance(node, Variable):
+        index = slots.get(symref(node))
+        return None if index is None else lambda values: values[index]
+
+    if isinstance(node, (Tautology, Contradiction, Constant)) or not isinstance(node, (Formula, Term, fs.BaseEffect)):
+        return None
+
+    if isinstance(node, (QuantifiedFormula, fs.UniversalEffect)) and any(symref(x) in slots for x in node.variables):
+        raise SubstitutionError(node, slots, 'Attempted to substitute variable bound by quantifier')
+
+    fields = _fields(node)
+    if fields is None:  # Resort to the (slower) generic substitution procedure
+        return lambda values: _substitute(node, slots, values)
+
+    children = []
+    for attribute, is_sequence in fields:
+        value = getattr(node, attribute)
+        if is_sequence:
+            functions = [_compile(x, slots) or _constant(x) for x in value]
+            children.append((attribute, type(value) if isinstance(value, (tuple, list)) else tuple, functions))
+        else:
+            children.append((attribute, None, _compile(value, slots) or _constant(value)))
+
+    cls = node.__class__
+
+    def instantiate(values):
+        instance = cls.__new__(cls)
+        instance.__dict__.update(node.__dict__)
+        for attribute_, container, function in children:
+            if container is None:
+                setattr(instance, attribute_, function(values))
+            else:
+                setattr(instance, attribute_, container([f(values) for f in function]))
+        return instance
+    return instantiate
+
+
+def _constant(value):
+    return lambda values: value
+
+
+def _substitute(node, slots, values):
+    variables = [None] * len(slots)
+    for ref, index in slots.items():
+        variables[index] = ref.expr
+    element = copy.deepcopy(node)
+    TermSubstitution(create_substitution(variables, values)).visit(element)
+    return element
@@ -3,6 +3,18 @@ import hashlib
 import sys
 
 
+_MASK64 = 2**64 - 1
+
+
+def mix64(value):
+    """ Scramble the bits of the given integer into a well-distributed 64-bit integer, using the finalizer of
+    the SplitMix64 pseudo-random generator. Meant to derive random-looking keys from (poorly distributed) hashes. """
+    value &= _MASK64
+    value = ((value ^ (value >> 30)) * 0xbf58476d1ce4e5b9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94d049bb133111eb) & _MASK64
+    return value ^ (value >> 31)
+
+
 def int_to_bytes(value):
     return value.to_bytes((value.bit_length() + 7) // 8, 'big', signed=True) or b'\0'
 
@@ -0,0 +1,65 @@
+from collections import deque
+
+from tarski.analysis.invariants import synthesize_invariants
+from tarski.benchmarks.blocksworld import generate_strips_blocksworld_problem
+from tarski.fstrips.fdr import translate_to_fdr, NONE_OF_THOSE
+from tarski.grounding import LPGroundingStrategy
+from tarski.io.sas import SASWriter
+from tarski.search import BreadthFirstSearch, ForwardSearchModel
+
+from ..common.gripper import create_sample_problem
+
+
+def reachable_fdr_states(task):
+    """ Return the set of FDR states reachable from the initial state, plus whether some of them is a goal """
+    init = tuple(task.init)
+    seen, queue = {init}, deque([init])
+    while queue:
+        state = queue.popleft()
+        for op in task.operators:
+            if any(state[var] != value for var, value in op.prevail) or \
+                    any(pre != -1 and state[var] != pre for _, var, pre, _ in op.effects):
+                continue
+            successor = list(state)
+            for conditions, var, _, post in op.effects:
+                if all(state[v] == x for v, x in conditions):
+                    successor[var] = post
+            successor = tuple(successor)
+            if successor not in seen:
+                seen.add(successor)
+                queue.append(successor)
+    return seen, any(all(s[var] == value for var, value in task.goal) for s in seen)
+
+
+def test_blocksworld_invariants():
+    problem = generate_strips_blocksworld_problem(4)
+    invariants = sorted(str(i) for i in synthesize_invariants(problem))
+    assert invariants == ['{clear(?0), holding(?0), on(*, ?0)}', '{handempty(), holding(*)}',
+                          '{holding(?0), on(?0, *), ontable(?0)}']
+
+    task = translate_to_fdr(problem, LPGroundingStrategy(problem, solver='datalog'))
+    # Each block is either on some block, on the table or held, which is encoded in one variable per block
+    assert sorted(len(v.values) for v in task.variables) == [2, 2, 2, 2, 5, 5, 5, 5, 5]
+    assert task.state_size() < 29  # The number of atoms
+
+
+def test_fdr_translation_preserves_reachable_states():
+    problem = create_sample_problem()
+    task = translate_to_fdr(problem, LPGroundingStrategy(problem, solver='datalog'))
+    assert sum(1 for v in task.variables if NONE_OF_THOSE in v.values) == 4  # The location of each ball
+
+    states, solvable = reachable_fdr_states(task)
+    space = BreadthFirstSearch(ForwardSearchModel(problem)).run()
+    assert space.complete and solvable
+    assert len(states) == len(space.nodes)
+
+
+def test_sas_writer():
+    problem = generate_strips_blocksworld_problem(3)
+    task = translate_to_fdr(problem, LPGroundingStrategy(problem, solver='datalog'))
+    lines = SASWriter(task).print().splitlines()
+    assert lines[:7] == ['begin_version', '3', 'end_version', 'begin_metric', '0', 'end_metric',
+                         str(len(task.variables))]
+    assert lines.count('begin_operator') == len(task.operators) == lines.count('end_operator')
+    assert 'begin_operator' in lines and lines[lines.index('begin_operator') + 1] == 'pick-up b1'
+    assert lines[-1] == '0'
@@ -7,7 +7,9 @@ from tarski import errors
 
 from ..common import blocksworld, numeric
 from tarski.evaluators.simple import evaluate
-from tarski.syntax import Constant, ite, symref
+from tarski.evaluators.compiled import compile_expression, StaticDenotations
+from tarski.evaluators.joins import ConjunctiveQuery, decompose_conjunction
+from tarski.syntax import Constant, ite, symref, exists, forall
 from tarski.theories import Theory
 from tarski.modules import import_scipy_special
 
@@ -302,6 +304,97 @@ def test_blocksworld_add_and_remove():
     assert evaluate(clear(b1), model) is False
 
 
+def test_model_copies_share_unmodified_extensions():
+    lang = tarski.benchmarks.blocksworld.generate_fstrips_bw_language()
+    clear, loc = lang.get('clear', 'loc')
+    b1, b2, table = lang.get('b1', 'b2', 'table')
+
+    model = Model(lang)
+    model.add(clear, b1)
+    model.setx(loc(b1), table)
+    model.setx(loc(b2), table)
+
+    copied = model.copy()
+    assert copied.get_extension(clear) is model.get_extension(clear)
+    assert copied.get_extension(loc) is model.get_extension(loc)
+
+    # Modifying the copy must not affect the original, and the other way round
+    copied.add(clear, b2)
+    copied.remove(clear, b1)
+    assert evaluate(clear(b2), copied) and not evaluate(clear(b1), copied)
+    assert evaluate(clear(b1), model) and not evaluate(clear(b2), model)
+    assert copied.get_extension(loc) is model.get_extension(loc)
+
+    model.setx(loc(b1), b2)
+    assert evaluate(loc(b1), model) == b2 and evaluate(loc(b1), copied) == table
+
+
+def test_model_hashing_and_equality():
+    lang = tarski.benchmarks.blocksworld.generate_fstrips_bw_language()
+    clear, loc = lang.get('clear', 'loc')
+    b1, b2, table = lang.get('b1', 'b2', 'table')
+
+    m1, m2 = Model(lang), Model(lang)
+    m1.add(clear, b1)
+    m1.add(clear, b2)
+    m1.setx(loc(b1), table)
+    m2.setx(loc(b1), b2)
+    m2.add(clear, b2)
+    m2.add(clear, b1)
+    assert m1 != m2
+    m2.setx(loc(b1), table)
+    # Models with the same denotations are equal and have the same hash, regardless of how they were built
+    assert m1 == m2 and hash(m1) == hash(m2) and len({m1, m2}) == 1
+
+    copied = m1.copy()
+    assert copied == m1 and hash(copied) == hash(m1)
+    copied.remove(clear, b1)
+    assert copied != m1
+    copied.add(clear, b1)
+    assert copied == m1 and hash(copied) == hash(m1)
+
+
+def test_evaluation_under_substitution():
+    lang = tarski.benchmarks.blocksworld.generate_fstrips_bw_language()
+    clear, loc = lang.get('clear', 'loc')
+    b1, b2, table = lang.get('b1', 'b2', 'table')
+    x, y = lang.variable('x', 'block'), lang.variable('y', 'place')
+
+    model = Model(lang)
+    model.add(clear, b1)
+    model.setx(loc(b1), table)
+    assert evaluate(clear(x) & (loc(x) == y), model, {symref(x): b1, symref(y): table})
+    assert not evaluate(clear(x), model, {symref(x): b2})
+    with pytest.raises(errors.UnboundVariable):
+        evaluate(clear(x), model)
+
+
+def test_conjunctive_query_answers():
+    lang = tarski.benchmarks.blocksworld.generate_fstrips_bw_language(nblocks=3)
+    clear, loc = lang.get('clear', 'loc')
+    b1, b2, b3, table = lang.get('b1', 'b2', 'b3', 'table')
+    x, y = lang.variable('x', 'block'), lang.variable('y', 'place')
+
+    model = Model(lang)
+    model.setx(loc(b1), b2)
+    model.setx(loc(b2), table)
+    model.setx(loc(b3), table)
+    model.add(clear, b1)
+    model.add(clear, b3)
+    model.add(clear, table)
+
+    # Blocks x that are clear and on some place y, plus the clear places y that x could be moved to
+    atoms, filters = decompose_conjunction(clear(x) & (loc(x) == y))
+    assert len(atoms) == 2 and not filters
+    answers = {tuple(c.symbol for c in a) for a in ConjunctiveQuery([x, y], atoms).answers(model)}
+    assert answers == {('b1', 'b2'), ('b3', 'table')}
+
+    atoms, filters = decompose_conjunction(clear(x) & clear(y) & (x != y) & (loc(x) != y))
+    answers = {tuple(c.symbol for c in a) for a in ConjunctiveQuery([x, y], atoms, filters).answers(model)}
+    # Variable x ranges over blocks only, even if "clear" is defined over all places
+    assert answers == {('b1', 'b3'), ('b1', 'table'), ('b3', 'b1')}
+
+
 def test_zero_ary_predicate_set():
     L = tarski.language()
 
@@ -492,3 +585,111 @@ def test_matrix_evaluation_case_2():
     x0.setx(z(), 3.0)
     # print(x0[I @ v][2, 0])
     assert x0[I @ v][2, 0].is_syntactically_equal(lang.constant(3.0, lang.Real))
+
+
+def test_compiled_evaluation():
+    from tarski.syntax.arithmetic.special import max, abs
+    lang = tarski.language('arith', [Theory.EQUALITY, Theory.ARITHMETIC, Theory.SPECIAL])
+    x = lang.function('x', lang.Integer)
+    y = lang.function('y', lang.Integer)
+    z = lang.function('z', lang.Real)
+    p = lang.predicate('p', lang.Integer)
+    v = lang.variable('v', lang.Integer)
+
+    model = Model(lang)
+    model.evaluator = evaluate
+    model.setx(x(), 1)
+    model.setx(y(), 2)
+    model.setx(z(), -1.5)
+    model.add(p, 3)
+
+    tau = ite((x() <= y()) & ~(x() == y()), x() + 2, y() * 3)
+    expressions = [tau, x() + y() == 3, p(x()) | (y() > x()), p(v), max(z(), y()),
+                   abs(z()), (x() / y()) < 1]
+    sigma = {symref(v): lang.constant(3, lang.Integer)}
+    for expression in expressions:
+        expected = evaluate(expression, model, sigma)
+        value = compile_expression(expression)(model, sigma)
+        assert value == expected if isinstance(expected, bool) else value.symbol == expected.symbol
+
+    with pytest.raises(errors.UnboundVariable):
+        compile_expression(p(v))(model)
+
+
+def test_quantified_formula_evaluation():
+    from tarski.syntax.transform.quantifier_elimination import remove_quantifiers, QuantifierEliminationMode
+    lang = tarski.benchmarks.blocksworld.generate_fstrips_bw_language(nblocks=3)
+    clear, loc = lang.get('clear', 'loc')
+    b1, b2, b3, table = lang.get('b1', 'b2', 'b3', 'table')
+    x, z = lang.variable('x', 'block'), lang.variable('z', 'block')
+    y = lang.variable('y', 'place')
+
+    model = Model(lang)
+    model.setx(loc(b1), b2)
+    model.setx(loc(b2), table)
+    model.setx(loc(b3), table)
+    model.add(clear, b1)
+    model.add(clear, b3)
+    model.add(clear, table)
+
+    formulas = [exists(x, clear(x)), forall(x, clear(x)), forall(x, clear(loc(x)) | clear(x)),
+                exists(x, y, (loc(x) == y) & clear(y)), forall(x, exists(y, (loc(x) == y) & clear(y))),
+                forall(x, z, (x != z) | (loc(x) == loc(z))), exists(x, ~clear(x) & forall(z, loc(z) != x)),
+                exists(x, clear(x) & (loc(x) == y))]
+    expected = [True, False, True, True, False, True, False, True]
+    sigma = {symref(y): table}
+    for phi, value in zip(formulas, expected):
+        assert evaluate(phi, model, sigma) is value
+        assert evaluate(remove_quantifiers(lang, phi, QuantifierEliminationMode.All), model, sigma) is value
+
+
+def test_quantified_formula_evaluation_over_different_languages():
+    # Structurally equal formulas of different languages must be evaluated over the objects of their own language
+    for names, expected in [(['a', 'b'], True), (['a', 'b', 'c'], False)]:
+        lang = tarski.language()
+        block = lang.sort('block')
+        p = lang.predicate('p', block)
+        model = Model(lang)
+        for name in names:
+            lang.constant(name, block)
+        if 'c' in names:
+            model.add(p, lang.get('c'))
+        x = lang.variable('x', block)
+        assert evaluate(forall(x, ~p(x)), model) is expected
+        assert evaluate(exists(x, p(x)), model) is not expected
+
+
+def test_quantified_formula_evaluation_over_builtin_sorts():
+    lang = tarski.language(theories=[Theory.EQUALITY, Theory.ARITHMETIC])
+    p = lang.predicate('p', lang.Integer)
+    model = Model(lang)
+    model.evaluator = evaluate
+    model.add(p, 3)
+    x = lang.variable('x', lang.Integer)
+    assert evaluate(exists(x, p(x)), model) is True
+    assert evaluate(exists(x, p(x) & (x > 5)), model) is False
+    assert evaluate(forall(x, ~p(x) | (x < 5)), model) is True
+
+
+def test_compiled_evaluation_with_static_denotations():
+    from tarski.benchmarks.counters import generate_fstrips_counters_problem
+    from tarski.grounding.ops import approximate_symbol_fluency
+    problem = generate_fstrips_counters_problem(ncounters=3)
+    lang = problem.language
+    value, max_int = lang.get('value', 'max_int')
+    c1, c2 = lang.get('c1', 'c2')
+
+    _, statics = approximate_symbol_fluency(problem)
+    static = StaticDenotations(statics, problem.init)
+    assert static.is_static(max_int) and not static.is_static(value)
+
+    # The denotation of static terms is always taken from the table of static denotations
+    state, full = Model(lang), problem.init.copy()
+    for model in (state, full):
+        model.setx(value(c1), 5)
+        model.setx(value(c2), 2)
+
+    for phi in (value(c1) < max_int(), value(c2) + 1 < max_int() - 3, value(c1) > max_int() - 1):
+        assert compile_expression(phi, static)(state) == evaluate(phi, full)
+        with pytest.raises(errors.UndefinedTerm):
+            evaluate(phi, state)
@@ -1,9 +1,11 @@
 import tarski.benchmarks.blocksworld
 from tarski.fstrips.action import PlainOperator
-from tarski.grounding import ProblemGrounding
+from tarski.fstrips import AddEffect, DelEffect
+from tarski.grounding import ProblemGrounding, NaiveGroundingStrategy
 from tarski.search.applicability import is_applicable, apply
 from tarski.syntax import symref
-from tarski.syntax.transform.action_grounding import ground_schema_into_plain_operator
+from tarski.syntax.transform.action_grounding import ground_schema_into_plain_operator, \
+    ground_schema_into_plain_operator_from_grounding
 from tarski.evaluators.simple import evaluate
 
 from tests.common import blocksworld
@@ -28,10 +30,20 @@ def test_action_grounding_bw():
     assert isinstance(ground, PlainOperator) and \
         str(ground.precondition) == '(on(b1,b2) and clear(b1) and handempty())'
 
-    # assert is_applicable(problem.init, ground)
-    # successor = apply(problem.init, ground)
-    # assert successor[holding(b1)]
-    # assert successor[clear(b2)]
-
-
 
+def test_operator_application_bw():
+    problem = tarski.benchmarks.blocksworld.generate_strips_blocksworld_problem()
+    init = problem.init
+    groundings = NaiveGroundingStrategy(problem).ground_actions()
+    operators = [ground_schema_into_plain_operator_from_grounding(problem.get_action(name), binding)
+                 for name, bindings in groundings.items() for binding in bindings]
+
+    applicable = [op for op in operators if is_applicable(init, op)]
+    assert applicable
+
+    for op in applicable:
+        successor = apply(init, op)
+        for eff in op.effects:
+            # Blocksworld has no operator that adds and deletes the same atom
+            assert successor[eff.atom] is isinstance(eff, AddEffect)
+            assert init[eff.atom] is isinstance(eff, DelEffect)  # The original state is left untouched
@@ -0,0 +1,37 @@
+import os
+
+from tarski.benchmarks.blocksworld import generate_strips_blocksworld_problem
+from tarski.grounding import CompiledDomain, LPGroundingStrategy, problem_fingerprint
+from tarski.io import FstripsReader
+
+
+HERE = os.path.dirname(os.path.realpath(__file__))
+VISITALL = os.path.join(HERE, '..', 'data', 'pddl', 'ipc', 'visitall-sat11-strips')
+
+
+def sorted_groundings(strategy):
+    actions = {name: sorted(tuple(map(str, g)) for g in groundings)
+               for name, groundings in strategy.ground_actions().items()}
+    return sorted(map(str, strategy.ground_state_variables())), actions
+
+
+def test_compiled_domain_grounding():
+    domain = CompiledDomain()
+    for nblocks in [3, 5, 4]:
+        problem = generate_strips_blocksworld_problem(nblocks)
+        expected = sorted_groundings(LPGroundingStrategy(problem, solver='datalog'))
+        assert sorted_groundings(domain.grounding_strategy(problem, solver='datalog')) == expected
+
+    # The template of the action schemas is computed once for all problems
+    assert len(domain.templates) == 1
+
+
+def test_compiled_domain_reading():
+    domain_file = os.path.join(VISITALL, 'domain.pddl')
+    instance_file = os.path.join(VISITALL, 'problem12.pddl')
+    expected = FstripsReader(raise_on_error=True).read_problem(domain_file, instance_file)
+
+    domain = CompiledDomain(domain_file, raise_on_error=True)
+    first, second = domain.read_instance(instance_file), domain.read_instance(instance_file)
+    assert first is not second and first.language is not second.language
+    assert problem_fingerprint(first) == problem_fingerprint(second) == problem_fingerprint(expected)
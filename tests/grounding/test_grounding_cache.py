@@ -0,0 +1,68 @@
+import os
+
+from tarski.benchmarks.blocksworld import generate_strips_blocksworld_problem
+from tarski.grounding import LPGroundingStrategy, NaiveGroundingStrategy, GroundingCache, problem_fingerprint
+from tarski.grounding.cache import encode_relations, decode_relations
+
+from tests.common.gripper import create_sample_problem
+
+
+def test_relation_encoding():
+    relations = {'on': [('a', 'b'), ('b', 'c')], 'handempty': [()], 'clear': [], 'é': [('x', 'é', 'x')]}
+    assert decode_relations(encode_relations(relations)) == relations
+
+
+def test_problem_fingerprint():
+    assert problem_fingerprint(create_sample_problem()) == problem_fingerprint(create_sample_problem())
+
+    problem = create_sample_problem()
+    at, ball1, rooma = problem.language.get('at', 'ball1', 'rooma')
+    problem.init.remove(at, ball1, rooma)
+    assert problem_fingerprint(problem) != problem_fingerprint(create_sample_problem())
+
+
+def test_lp_grounding_cache(tmp_path, monkeypatch):
+    cache = GroundingCache(str(tmp_path))
+    grounding = LPGroundingStrategy(create_sample_problem(), solver='datalog', cache=cache)
+    actions, variables = grounding.ground_actions(), grounding.ground_state_variables()
+
+    # A hit does not create nor solve any logic program
+    monkeypatch.setattr(LPGroundingStrategy, '_compute_model', lambda self: None)
+    grounding = LPGroundingStrategy(create_sample_problem(), solver='datalog', cache=cache)
+    assert grounding.ground_actions() == actions
+    assert {str(v) for v in grounding.ground_state_variables()} == {str(v) for v in variables}
+
+
+def test_naive_grounding_cache(tmp_path):
+    cache = GroundingCache(str(tmp_path))
+    problem = create_sample_problem()
+    expected = NaiveGroundingStrategy(problem).ground_actions()
+    expected_variables = NaiveGroundingStrategy(problem).ground_state_variables()
+    for _ in range(2):
+        grounding = NaiveGroundingStrategy(problem, cache=cache)
+        assert grounding.ground_actions() == expected
+        assert list(grounding.ground_state_variables()) == list(expected_variables)
+    assert len(os.listdir(str(tmp_path))) == 2
+
+    # Different options result in different cache entries
+    NaiveGroundingStrategy(problem, ignore_symbols={'free'}, cache=cache).ground_state_variables()
+    assert len(os.listdir(str(tmp_path))) == 3
+
+
+def test_grounding_cache_eviction(tmp_path):
+    cache = GroundingCache(str(tmp_path), max_size=0)
+    NaiveGroundingStrategy(create_sample_problem(), cache=cache).ground_actions()
+    assert not os.listdir(str(tmp_path))
+
+    cache = GroundingCache(str(tmp_path))
+    problems = [generate_strips_blocksworld_problem(n) for n in (3, 4, 5)]
+    keys = [cache.key(p, 'test') for p in problems]
+    for key in keys:
+        cache.put(key, {'x': [(key, )]})
+    os.utime(os.path.join(str(tmp_path), keys[0] + '.bin'), (0, 0))  # The least recently used entry
+
+    sizes = {name: os.path.getsize(os.path.join(str(tmp_path), name)) for name in os.listdir(str(tmp_path))}
+    cache.max_size = sum(sizes.values()) - 1
+    cache.put(keys[1], {'x': [(keys[1], )]})
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[1]) == {"x": [(keys[1], )]} and cache.get(keys[2]) == {"x": [(keys[2], )]}
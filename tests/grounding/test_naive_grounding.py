@@ -1,9 +1,14 @@
+import pytest
+
 from tarski.benchmarks.blocksworld import generate_fstrips_blocksworld_problem, generate_strips_blocksworld_problem
 from tarski.grounding import ProblemGrounding, NaiveGroundingStrategy, create_all_possible_state_variables
 from tarski.grounding.naive import instantiation
 from tarski.util import SymbolIndex
 from tarski.syntax import create_substitution
 from tarski.grounding.naive.actions import ActionGrounder
+from tarski.grounding.parallel import can_ground_in_parallel
+from tarski.grounding.errors import GroundingTooLarge
+from tarski.syntax.transform.action_grounding import iterate_plain_operators
 from tarski.grounding.naive.sensors import SensorGrounder
 from tarski.grounding.naive.constraints import ConstraintGrounder
 from tarski.grounding.naive.diff_constraints import DifferentialConstraintGrounder
@@ -12,6 +17,7 @@ from tarski.grounding.naive.reactions import ReactionGrounder
 from ..fstrips.contingent import localize
 from ..fstrips.hybrid.tasks import create_particles_world, create_billiards_world
 from tests.common.blocksworld import create_4blocks_task
+from tests.common.gripper import create_sample_problem
 from tests.common import parcprinter
 
 
@@ -152,6 +158,54 @@ def test_problem_grounding_on_bw():
             'loc(b4)'] == as_list2(variables)
 
 
+@pytest.mark.skipif(not can_ground_in_parallel(), reason='Worker processes cannot be forked on this platform')
+def test_parallel_naive_grounding():
+    for problem in [parcprinter.create_small_task(), generate_strips_blocksworld_problem(10)]:
+        sequential = NaiveGroundingStrategy(problem).ground_actions()
+        parallel = NaiveGroundingStrategy(problem, workers=3).ground_actions()
+        assert list(parallel.keys()) == list(sequential.keys())
+        assert all([[str(c) for c in g] for g in parallel[name]] == [[str(c) for c in g] for g in sequential[name]]
+                   for name in sequential)
+
+        pruned = NaiveGroundingStrategy(problem, static_pruning=True, workers=2).ground_actions()
+        expected = NaiveGroundingStrategy(problem, static_pruning=True).ground_actions()
+        assert all(sorted(str(g) for g in pruned[name]) == sorted(str(g) for g in expected[name]) for name in expected)
+
+
+def test_naive_grounding_with_static_pruning():
+    problem = create_sample_problem()
+    grounding = NaiveGroundingStrategy(problem, static_pruning=True)
+    actions = grounding.ground_actions()
+    assert len(actions['pick']) == len(actions['drop']) == 16  # Same as with the LP-based reachability analysis
+    assert len(actions['move']) == 2
+
+    # Only the builtin inequality in the precondition of "stack" is static
+    actions = NaiveGroundingStrategy(generate_strips_blocksworld_problem(), static_pruning=True).ground_actions()
+    expected = {'pick-up': 4, 'put-down': 4, 'stack': 12, 'unstack': 16}
+    assert all(len(groundings) == expected[schema] for schema, groundings in actions.items())
+
+
+def test_lazy_naive_grounding_with_budget():
+    problem = generate_strips_blocksworld_problem(6)
+    grounding = NaiveGroundingStrategy(problem)
+    assert grounding.estimate_action_groundings() == {'pick-up': 6, 'put-down': 6, 'stack': 36, 'unstack': 36}
+    assert grounding.estimate_state_variables() == len(grounding.ground_state_variables()) == 6 * 6 + 6 + 6 + 6 + 1
+
+    actions = grounding.ground_actions()
+    lazy = list(grounding.iterate_ground_actions(budget=84))
+    assert [(name, str(g)) for name, g in lazy] == [(name, str(g)) for name in actions for g in actions[name]]
+    assert [str(x) for x in grounding.iterate_state_variables()] == \
+           [str(x) for x in grounding.ground_state_variables()]
+
+    with pytest.raises(GroundingTooLarge):
+        grounding.iterate_ground_actions(budget=83)
+    with pytest.raises(GroundingTooLarge):
+        grounding.iterate_state_variables(budget=10)
+
+    operators = iterate_plain_operators(problem, NaiveGroundingStrategy(problem, static_pruning=True), budget=100)
+    assert sum(1 for _ in operators) == 6 + 6 + 30 + 36
+
+
 def test_all_state_variables_can_be_evaluated_in_init_parcprinter():
     prob = parcprinter.create_small_task()
     index = ProblemGrounding(prob)
@@ -0,0 +1,70 @@
+from tarski.benchmarks.blocksworld import generate_strips_blocksworld_problem
+from tarski.fstrips import AddEffect, DelEffect
+from tarski.grounding import NaiveGroundingStrategy, LPGroundingStrategy, RelevanceGroundingStrategy
+from tarski.search import ForwardSearchModel, AStar, BlindHeuristic
+from tarski.search.packed import create_state_layout
+from tarski.syntax import land
+
+from ..common.gripper import create_sample_problem
+
+
+def create_bw_with_irrelevant_actions():
+    problem = generate_strips_blocksworld_problem(4)
+    lang = problem.language
+    b1, b2, on, clear, handempty = lang.get('b1', 'b2', 'on', 'clear', 'handempty')
+    problem.goal = on(b1, b2)
+    painted, polished = lang.predicate('painted', 'object'), lang.predicate('polished', 'object')
+    x = lang.variable('x', 'object')
+    problem.action('paint', [x], clear(x), [AddEffect(painted(x))])
+    problem.action('polish', [x], land(painted(x), handempty()), [AddEffect(polished(x)), DelEffect(painted(x))])
+    return problem
+
+
+def test_relevance_prunes_irrelevant_actions_and_variables():
+    problem = create_bw_with_irrelevant_actions()
+    strategy = NaiveGroundingStrategy(problem)
+    relevant = RelevanceGroundingStrategy(strategy)
+
+    actions = relevant.ground_actions()
+    assert actions['paint'] == actions['polish'] == []
+    assert all(actions[name] == list(strategy.ground_actions()[name])
+               for name in ['pick-up', 'put-down', 'stack', 'unstack'])
+
+    variables = sorted(str(v) for v in relevant.ground_state_variables())
+    assert not any(v.startswith(('painted', 'polished')) for v in variables)
+    assert len(variables) == len(strategy.ground_state_variables()) - 8
+
+    # Once the goal requires something to be polished, painting becomes relevant too
+    b1, polished = problem.language.get('b1', 'polished')
+    problem.goal = land(problem.goal, polished(b1))
+    actions = RelevanceGroundingStrategy(NaiveGroundingStrategy(problem)).ground_actions()
+    assert [str(g[0]) for g in actions['paint']] == [str(g[0]) for g in actions['polish']] == ['b1']
+
+
+def test_relevance_removes_irrelevant_effects():
+    problem = create_bw_with_irrelevant_actions()
+    lang = problem.language
+    touched = lang.predicate('touched', 'object')
+    pickup = problem.get_action('pick-up')
+    pickup.effects.append(AddEffect(touched(pickup.parameters[0])))
+    relevant = RelevanceGroundingStrategy(NaiveGroundingStrategy(problem))
+
+    operators = relevant.ground_operators()
+    assert [op.name for op in operators if op.name.startswith('pick-up')] == \
+        [f'pick-up({b[0].name})' for b in relevant.ground_actions()['pick-up']]
+    assert not any('touched' in str(eff) for op in operators for eff in op.effects)
+    assert not any(str(v).startswith('touched') for v in relevant.ground_state_variables())
+
+    # The pruned operators can be used to search over the state variables that have not been pruned
+    layout = create_state_layout(problem, relevant.ground_state_variables())
+    model = ForwardSearchModel(problem, operators)
+    result = AStar(model, BlindHeuristic(model)).search(layout.pack(problem.init))
+    assert result.solved
+
+
+def test_relevance_over_lp_grounding():
+    problem = create_sample_problem()
+    relevant = RelevanceGroundingStrategy(LPGroundingStrategy(problem, solver='datalog'))
+    actions = relevant.ground_actions()
+    assert len(actions['pick']) == len(actions['drop']) == 16
+    assert len(actions['move']) == 2
@@ -0,0 +1,37 @@
+import os
+import shutil
+
+import pytest
+
+from tarski.errors import ExternalCommandError, OutOfMemoryError
+from tarski.reachability import create_reachability_lp, run_clingo, run_clingo_streaming, parse_model
+from tarski.utils.command import silentremove
+
+from ..common.gripper import create_sample_problem
+
+
+@pytest.mark.skipif(shutil.which("gringo") is None, reason='The "gringo" binary is not on the PATH')
+def test_streaming_gringo_matches_file_based_gringo():
+    problem = create_sample_problem()
+    lp, tr = create_reachability_lp(problem)
+    model_filename, theory_filename = run_clingo(lp)
+    expected = parse_model(model_filename, tr)
+    silentremove(model_filename)
+    silentremove(theory_filename)
+
+    model = run_clingo_streaming(lambda stream: create_reachability_lp(problem, lp=stream)[1])
+    assert model == expected
+
+
+@pytest.mark.parametrize("message, exception", [("std::bad_alloc", OutOfMemoryError),
+                                                ("some error", ExternalCommandError)])
+def test_streaming_gringo_errors(tmp_path, monkeypatch, message, exception):
+    # Use a fake gringo that fails right away, to check that errors are reported as in the file-based execution
+    gringo = tmp_path / "gringo"
+    gringo.write_text(f"#!/bin/sh\necho '{message}' >&2\nexit 1\n")
+    gringo.chmod(0o755)
+    monkeypatch.setenv("PATH", str(tmp_path) + os.pathsep + os.environ.get("PATH", ""))
+
+    problem = create_sample_problem()
+    with pytest.raises(exception):
+        run_clingo_streaming(lambda stream: create_reachability_lp(problem, lp=stream)[1])
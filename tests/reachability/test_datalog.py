@@ -0,0 +1,73 @@
+import shutil
+
+import pytest
+
+from tarski.benchmarks.blocksworld import generate_strips_blocksworld_problem
+from tarski.grounding import LPGroundingStrategy
+from tarski.grounding.errors import ReachabilityLPUnsolvable, GroundingTooLarge
+from tarski.grounding.lp_grounding import compute_action_groundings
+from tarski.reachability import create_reachability_lp, run_clingo, parse_model, run_datalog
+from tarski.reachability.asp import LogicProgram, LPAtom, Translator
+from tarski.utils.command import silentremove
+
+from ..common.gripper import create_sample_problem
+from ..common.simple import create_simple_problem
+
+
+def test_datalog_on_handcrafted_program():
+    lp = LogicProgram()
+    for x, y in [("a", "b"), ("b", "c"), ("c", "d"), ("d", "b")]:
+        lp.rule(LPAtom("edge", [x, y]))
+    lp.rule(LPAtom("path", ["X", "Y"]), [LPAtom("edge", ["X", "Y"])])
+    lp.rule(LPAtom("path", ["X", "Z"]), [LPAtom("path", ["X", "Y"]), LPAtom("edge", ["Y", "Z"])])
+    lp.rule(LPAtom("cycle", ["X"]), [LPAtom("path", ["X", "X"])])
+    lp.rule(LPAtom("other", ["X", "Y"]), [LPAtom("path", ["X", "Y"]), LPAtom("!=", ["X", "Y"], infix=True)])
+    lp.rule(LPAtom("start", ["X"]), [LPAtom("=", ["X", "a"], infix=True)])
+    lp.rule(LPAtom("small", ["X"]), [LPAtom("=", ["X", 3], infix=True)])
+    lp.rule(LPAtom("big", ["X"]), [LPAtom("small", ["Y"]), LPAtom("=", ["X", "Y"], infix=True),
+                                   LPAtom(">", ["X", 2], infix=True)])
+    lp.rule(LPAtom("goal"), [LPAtom("start", ["X"]), LPAtom("path", ["X", "d"])])
+
+    model = run_datalog(lp, Translator())
+    assert model["path"] == {(x, y) for x in "abcd" for y in "bcd"} - {("b", "a")}
+    assert model["cycle"] == {("b", ), ("c", ), ("d", )}
+    assert ("b", "b") not in model["other"] and ("a", "b") in model["other"]
+    assert model["big"] == {("3", )}
+    assert model["goal"] == {()}
+
+
+def test_datalog_grounding_without_gringo():
+    problem = create_sample_problem()
+    grounding = LPGroundingStrategy(problem, solver='datalog')
+    actions = grounding.ground_actions()
+    assert len(actions['pick']) == len(actions['drop']) == 16
+    assert len(actions['move']) == 2
+    assert len(grounding.ground_state_variables()) == 20
+    assert sorted(str(x) for x in grounding.iterate_state_variables(budget=144)) == \
+        sorted(str(x) for x in grounding.ground_state_variables())
+    assert sum(1 for _ in grounding.iterate_ground_actions()) == 34
+    with pytest.raises(GroundingTooLarge):
+        grounding.iterate_ground_actions(budget=sum(grounding.estimate_action_groundings().values()) - 1)
+
+    problem = create_simple_problem()
+    p, a = problem.language.get("p", "a")
+    assert compute_action_groundings(problem, solver='datalog')["negate"] == {('a', )}
+    problem.init.remove(p, a)
+    problem.goal = p(a)
+    with pytest.raises(ReachabilityLPUnsolvable):
+        _ = compute_action_groundings(problem, solver='datalog')
+
+
+@pytest.mark.skipif(shutil.which("gringo") is None, reason='The "gringo" binary is not on the PATH')
+@pytest.mark.parametrize("generator", [create_sample_problem, create_simple_problem,
+                                       lambda: generate_strips_blocksworld_problem(8)])
+def test_datalog_matches_gringo(generator):
+    problem = generator()
+    for ground_actions in (True, False):
+        for inequalities in (True, False):
+            lp, tr = create_reachability_lp(problem, ground_actions, inequalities)
+            model_filename, theory_filename = run_clingo(lp)
+            expected = parse_model(model_filename, tr)
+            silentremove(model_filename)
+            silentremove(theory_filename)
+            assert run_datalog(lp, tr) == expected
@@ -1,8 +1,29 @@
 """
  Tests for the Search module
 """
-from tarski.benchmarks.blocksworld import generate_fstrips_blocksworld_problem
-from tarski.search import ForwardSearchModel, BreadthFirstSearch
+from tarski.benchmarks.blocksworld import generate_fstrips_blocksworld_problem, generate_strips_blocksworld_problem
+from tarski.benchmarks.counters import generate_fstrips_counters_problem
+from tarski.evaluators.simple import evaluate
+from tarski.search import SearchModel, ForwardSearchModel, BreadthFirstSearch
+from tarski.search.applicability import is_applicable, apply
+from tarski.search.successors import SuccessorGenerator
+from tarski.syntax.transform.action_grounding import ground_problem_schemas_into_plain_operators
+
+
+class GroundSearchModel(SearchModel):
+    """ A search model over the full set of ground operators of a problem """
+    def __init__(self, problem):
+        self.problem = problem
+        self.operators = ground_problem_schemas_into_plain_operators(problem)
+
+    def init(self):
+        return self.problem.init
+
+    def successors(self, state):
+        return [(op, apply(state, op)) for op in self.operators if is_applicable(state, op)]
+
+    def is_goal(self, state):
+        return evaluate(self.problem.goal, state)
 
 
 def test_forward_search_model():
@@ -25,5 +46,56 @@ def test_basic_search():
     # TODO ...
 
 
+def test_breadth_first_search_detects_duplicates():
+    problem = generate_strips_blocksworld_problem(nblocks=3)
+    space = BreadthFirstSearch(GroundSearchModel(problem)).run()
+
+    # 3-block blocksworld with a hand has 22 reachable states; each one must be expanded exactly once
+    assert space.complete
+    assert len(space.nodes) == 22
+    assert len({node.state for node in space.nodes}) == 22
+
+
+def test_successor_generator_matches_linear_scan():
+    for problem in (generate_strips_blocksworld_problem(nblocks=3), generate_fstrips_blocksworld_problem(nblocks=3),
+                    generate_fstrips_counters_problem(ncounters=2)):
+        operators = ground_problem_schemas_into_plain_operators(problem)
+        generator = SuccessorGenerator(operators)
+        space = BreadthFirstSearch(ForwardSearchModel(problem, operators)).run()
+        assert space.complete
+
+        for node in space.nodes:
+            expected = sorted(op.name for op in operators if is_applicable(node.state, op))
+            assert sorted(op.name for op in generator.applicable(node.state)) == expected
+
+
+def test_forward_search_model_successors():
+    problem = generate_strips_blocksworld_problem(nblocks=3)
+    model = ForwardSearchModel(problem)
+    space = BreadthFirstSearch(model).run()
+    assert model.successor_generator.root.probe is not None
+    assert space.complete and len(space.nodes) == 22
+    assert any(model.is_goal(node.state) for node in space.nodes)
+
+
+def test_search_space_registry_and_transitions():
+    problem = generate_strips_blocksworld_problem(nblocks=3)
+    model = ForwardSearchModel(problem)
+    space = BreadthFirstSearch(model, record_transitions=True).run()
+    assert space.complete and len(space.registry) == space.num_expanded == 22
+
+    # States are registered once, and can be retrieved from their ids
+    for sid in range(len(space.registry)):
+        assert space.registry.insert(space.registry.lookup(sid)) == (sid, False)
 
+    # Each state is reached from the root through the (shortest) plan given by the parent and action arrays
+    for node in space.nodes:
+        state = model.init()
+        for operator in space.plan(node.id):
+            state = apply(state, operator)
+        assert space.registry.insert(space.registry.layout.pack(state)) == (node.id, False)
 
+    # The transition system has one transition per applicable operator in each state
+    transitions = [tuple(space.transitions[i:i + 3]) for i in range(0, len(space.transitions), 3)]
+    assert len(transitions) == sum(len(list(model.applicable(node.state))) for node in space.nodes)
+    assert all(space.operators[a] in model.applicable(space.registry.lookup(s)) for s, a, _ in transitions)
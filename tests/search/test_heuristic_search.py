@@ -0,0 +1,71 @@
+"""
+ Tests for the heuristic search engines
+"""
+from collections import deque
+
+from tarski.benchmarks.blocksworld import generate_strips_blocksworld_problem
+from tarski.search import ForwardSearchModel, AStar, WeightedAStar, GreedyBestFirstSearch, BlindHeuristic, \
+    GoalCountHeuristic, DEAD_END
+from tarski.search.applicability import is_applicable, apply
+
+
+def optimal_plan_length(model):
+    """ The length of the shortest plan, computed by a plain breadth-first search """
+    init = model.init()
+    distance, queue = {init: 0}, deque([init])
+    while queue:
+        state = queue.popleft()
+        if model.is_goal(state):
+            return distance[state]
+        for _, successor in model.successors(state):
+            if successor not in distance:
+                distance[successor] = distance[state] + 1
+                queue.append(successor)
+    return None
+
+
+def assert_valid_plan(model, result):
+    assert result.solved and len(result.plan) == result.cost
+    state = model.init()
+    for operator in result.plan:
+        assert is_applicable(state, operator)
+        state = apply(state, operator)
+    assert model.is_goal(state)
+
+
+def test_heuristic_search_engines():
+    problem = generate_strips_blocksworld_problem(nblocks=4)
+    model = ForwardSearchModel(problem)
+    optimal = optimal_plan_length(model)
+
+    blind = AStar(model, BlindHeuristic(model)).run()
+    assert_valid_plan(model, blind)
+    assert blind.cost == optimal
+
+    for lazy in (False, True):
+        for engine in (GreedyBestFirstSearch(model, GoalCountHeuristic(problem), lazy=lazy),
+                       WeightedAStar(model, GoalCountHeuristic(problem), weight=3, lazy=lazy, tie_breaking='fifo')):
+            result = engine.run()
+            assert_valid_plan(model, result)
+            assert result.stats.expanded <= result.stats.evaluated <= result.stats.generated + 1
+
+    assert AStar(model, BlindHeuristic(model), lazy=True).run().cost == optimal
+
+
+def test_heuristic_search_limits():
+    problem = generate_strips_blocksworld_problem(nblocks=3)
+    on, b1 = problem.language.get('on', 'b1')
+    problem.goal = on(b1, b1)
+    model = ForwardSearchModel(problem)
+
+    result = AStar(model, BlindHeuristic(model)).run()
+    assert result.status == 'unsolvable' and result.plan is None
+    assert result.stats.expanded == 22  # All reachable states of the 3-block blocksworld
+
+    result = GreedyBestFirstSearch(model, BlindHeuristic(model), max_expansions=5).run()
+    assert result.status == 'expansion limit' and result.stats.expanded == 5
+
+    assert AStar(model, BlindHeuristic(model), time_limit=0).run().status == 'time limit'
+
+    result = AStar(model, lambda state: DEAD_END).run()
+    assert result.status == 'unsolvable' and result.stats.dead_ends == 1 and result.stats.expanded == 0
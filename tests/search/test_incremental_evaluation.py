@@ -0,0 +1,38 @@
+"""
+ Tests for the incremental evaluation of formulas along state trajectories
+"""
+import random
+
+from tarski.benchmarks.blocksworld import generate_strips_blocksworld_problem, generate_fstrips_blocksworld_problem
+from tarski.benchmarks.counters import generate_fstrips_counters_problem
+from tarski.evaluators.incremental import IncrementalEvaluator
+from tarski.evaluators.simple import evaluate
+from tarski.search import ForwardSearchModel
+from tarski.search.applicability import progress
+from tarski.syntax import exists
+
+
+def test_incremental_evaluation_along_random_walks():
+    rng = random.Random(7)
+    for problem in (generate_strips_blocksworld_problem(), generate_fstrips_blocksworld_problem(),
+                    generate_fstrips_counters_problem()):
+        model = ForwardSearchModel(problem)
+        formulas = [problem.goal, ~problem.goal | problem.goal]
+        if problem.language.has_predicate('clear'):
+            clear = problem.language.get('clear')
+            x = problem.language.variable('x', clear.domain[0])
+            formulas.append(exists(x, clear(x)) & ~problem.goal)
+        evaluators = [IncrementalEvaluator(phi) for phi in formulas]
+
+        state = problem.init
+        evaluations = [e.evaluate(state) for e in evaluators]
+        for _ in range(50):
+            op = rng.choice(list(model.applicable(state)))
+            state, changes = progress(state, op)
+            evaluations = [e.progress(ev, state, changes) for e, ev in zip(evaluators, evaluations)]
+
+            for phi, evaluation in zip(formulas, evaluations):
+                assert evaluation.value == evaluate(phi, state)
+
+            unsatisfied = sum(1 for g in problem.goal.subformulas if not evaluate(g, state))
+            assert evaluations[0].num_unsatisfied() == unsatisfied
@@ -0,0 +1,30 @@
+"""
+ Tests for the lifted successor generation
+"""
+from tarski.benchmarks.blocksworld import generate_strips_blocksworld_problem, generate_fstrips_blocksworld_problem
+from tarski.benchmarks.counters import generate_fstrips_counters_problem
+from tarski.search import ForwardSearchModel, LiftedForwardSearchModel, BreadthFirstSearch
+from tarski.search.packed import create_state_layout
+
+
+def test_lifted_and_ground_successors_coincide():
+    for problem in (generate_strips_blocksworld_problem(nblocks=3), generate_fstrips_blocksworld_problem(nblocks=3),
+                    generate_fstrips_counters_problem(ncounters=2)):
+        ground, lifted = ForwardSearchModel(problem), LiftedForwardSearchModel(problem)
+        layout = create_state_layout(problem)
+        space = BreadthFirstSearch(ground).run()
+        assert space.complete
+
+        for node in space.nodes:
+            expected = sorted(op.name for op in ground.applicable(node.state))
+            assert sorted(op.name for op in lifted.applicable(node.state)) == expected
+            # Lifted successor generation works on packed states as well
+            assert sorted(op.name for op in lifted.applicable(layout.pack(node.state))) == expected
+
+
+def test_lifted_search_without_grounding():
+    problem = generate_strips_blocksworld_problem(nblocks=3)
+    model = LiftedForwardSearchModel(problem)
+    space = BreadthFirstSearch(model).run()
+    assert space.complete and len(space.nodes) == 22
+    assert model.operators is None  # The problem has not been grounded
@@ -0,0 +1,134 @@
+"""
+ Tests for the packed state representation
+"""
+import pytest
+
+import tarski
+from tarski.benchmarks.blocksworld import generate_strips_blocksworld_problem, generate_fstrips_blocksworld_problem
+from tarski.benchmarks.counters import generate_fstrips_counters_problem
+from tarski.evaluators.batch import evaluate_batch
+from tarski.evaluators.simple import evaluate
+from tarski.grounding import NaiveGroundingStrategy
+from tarski.grounding.naive_grounding import ground_symbols_exhaustively
+from tarski.model import Model
+from tarski.modules import import_numpy
+from tarski.search import ForwardSearchModel, BreadthFirstSearch
+from tarski.search.applicability import is_applicable, apply
+from tarski.search.packed import StateLayout, create_state_layout
+from tarski.syntax.transform.action_grounding import ground_schema_into_plain_operator_from_grounding
+from tarski.theories import Theory
+
+
+def ground_problem_operators(problem):
+    groundings = NaiveGroundingStrategy(problem).ground_actions()
+    return [ground_schema_into_plain_operator_from_grounding(problem.get_action(name), binding)
+            for name, bindings in groundings.items() for binding in bindings]
+
+
+def test_packing_and_unpacking():
+    problem = generate_strips_blocksworld_problem()
+    clear, handempty = problem.language.get('clear', 'handempty')
+    layout = create_state_layout(problem)
+    state = layout.pack(problem.init)
+    assert layout.num_atoms == 29 and layout.num_slots == 0
+
+    assert state.holds(handempty, ()) and evaluate(handempty(), state)
+    assert len(list(state.true_atoms())) == len(problem.init.as_atoms())
+
+    model = state.to_model()
+    assert {str(a) for a in model.as_atoms()} == {str(a) for a in problem.init.as_atoms()}
+    assert layout.pack(model) == state and hash(layout.pack(model)) == hash(state)
+
+
+def test_packed_states_with_function_values():
+    problem = generate_fstrips_counters_problem(ncounters=3)
+    value, max_int = problem.language.get('value', 'max_int')
+    c1 = problem.language.get('c1')
+    layout = create_state_layout(problem)
+    state = layout.pack(problem.init)
+    assert layout.num_atoms == 0 and layout.num_slots == 3
+
+    # max_int is static, hence its value is not stored in the packed state
+    assert state.value(value, (c1, )).symbol == 0 and state[max_int()].symbol == 6
+    assert not evaluate(problem.goal, state)
+    assert layout.unpack(state) == problem.init
+
+    # Function values undefined in the packed state must not be taken from the initial state when unpacking
+    model = problem.init.copy()
+    model.unset(value(c1))
+    with pytest.raises(KeyError):
+        model.unset(value(c1))
+    unpacked = layout.unpack(layout.pack(model))
+    assert unpacked == model and hash(unpacked) == hash(model) and unpacked != problem.init
+
+
+def test_progression_of_packed_states():
+    for problem in (generate_strips_blocksworld_problem(), generate_fstrips_blocksworld_problem(),
+                    generate_fstrips_counters_problem()):
+        layout = create_state_layout(problem)
+        state = layout.pack(problem.init)
+        for operator in ground_problem_operators(problem):
+            assert is_applicable(state, operator) == is_applicable(problem.init, operator)
+            if is_applicable(state, operator):
+                successor = apply(state, operator)
+                assert successor == layout.pack(apply(problem.init, operator))
+                assert successor != state
+                assert state == layout.pack(problem.init)  # Packed states are immutable
+
+
+def test_batch_evaluation():
+    try:
+        import_numpy()
+    except ImportError:
+        pytest.skip('Please install the "arithmetic" extra to run the full suite of tests')
+
+    problem = generate_fstrips_counters_problem(ncounters=3)
+    value, max_int = problem.language.get('value', 'max_int')
+    c1, c2 = problem.language.get('c1', 'c2')
+    layout = create_state_layout(problem)
+    states = [layout.pack(node.state) for node in BreadthFirstSearch(ForwardSearchModel(problem)).run().nodes]
+
+    for phi in (problem.goal, value(c1) + 2 * value(c2) <= max_int(), ~(value(c1) < value(c2)) | (value(c2) > 3)):
+        assert list(evaluate_batch(phi, states)) == [evaluate(phi, s) for s in states]
+    assert list(evaluate_batch(value(c1) * value(c2), states)) == [evaluate(value(c1) * value(c2), s).symbol
+                                                                  for s in states]
+
+    problem = generate_fstrips_blocksworld_problem()
+    loc, clear = problem.language.get('loc', 'clear')
+    b1, table = problem.language.get('b1', 'table')
+    layout = create_state_layout(problem)
+    states = [layout.pack(node.state) for node in BreadthFirstSearch(ForwardSearchModel(problem)).run().nodes]
+
+    for phi in (problem.goal, clear(loc(b1)), ~clear(b1) | (loc(b1) == table)):
+        assert list(evaluate_batch(phi, states)) == [evaluate(phi, s) for s in states]
+    assert [c.symbol for c in evaluate_batch(loc(b1), states)] == [evaluate(loc(b1), s).symbol for s in states]
+
+
+def test_batch_evaluation_with_real_valued_slots():
+    try:
+        import_numpy()
+    except ImportError:
+        pytest.skip('Please install the "arithmetic" extra to run the full suite of tests')
+
+    lang = tarski.language('weights', theories=[Theory.EQUALITY, Theory.ARITHMETIC])
+    place = lang.sort('place')
+    block = lang.sort('block', place)
+    loc, weight = lang.function('loc', block, place), lang.function('weight', block, lang.Real)
+    table, b1, b2 = lang.constant('table', place), lang.constant('b1', block), lang.constant('b2', block)
+
+    models = []
+    for location, w in ((b2, 1.5), (table, 2.5)):
+        model = Model(lang)
+        model.evaluator = evaluate
+        model.setx(loc(b1), location)
+        model.setx(loc(b2), table)
+        model.setx(weight(b1), w)
+        model.setx(weight(b2), 1.0)
+        models.append(model)
+
+    # The values of all slots, including the codes of the objects, are stored as floating-point numbers
+    layout = StateLayout(ground_symbols_exhaustively([loc, weight]), models[0])
+    assert layout.typecode == 'd'
+    states = [layout.pack(model) for model in models]
+    assert [c.symbol for c in evaluate_batch(loc(b1), states)] == ['b2', 'table']
+    assert list(evaluate_batch(weight(b1) + weight(b2), states)) == [2.5, 3.5]
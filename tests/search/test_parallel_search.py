@@ -0,0 +1,57 @@
+"""
+ Tests for the parallel hash-distributed search
+"""
+import pytest
+
+from tarski.benchmarks.blocksworld import generate_strips_blocksworld_problem
+from tarski.search import ForwardSearchModel, LiftedForwardSearchModel, AStar, HDAStar, HashDistributedSearch, \
+    BlindHeuristic, HMaxHeuristic, FFHeuristic
+from tarski.search.parallel import can_search_in_parallel
+
+from .test_heuristic_search import assert_valid_plan
+
+pytestmark = pytest.mark.skipif(not can_search_in_parallel(),
+                                reason='Worker processes cannot be forked on this platform')
+
+
+def test_hda_star_finds_optimal_plans():
+    problem = generate_strips_blocksworld_problem(nblocks=5)
+    model = ForwardSearchModel(problem)
+    optimal = AStar(model, HMaxHeuristic(model)).run().cost
+
+    for workers in (1, 3):
+        result = HDAStar(model, HMaxHeuristic(model), workers=workers).run()
+        assert_valid_plan(model, result)
+        assert result.cost == optimal
+
+    result = HashDistributedSearch(model, FFHeuristic(model), workers=2, weight_g=0, optimal=False).run()
+    assert_valid_plan(model, result)
+
+
+def test_hda_star_termination_and_limits():
+    problem = generate_strips_blocksworld_problem(nblocks=3)
+    on, b1 = problem.language.get('on', 'b1')
+    problem.goal = on(b1, b1)
+    model = ForwardSearchModel(problem)
+
+    result = HDAStar(model, BlindHeuristic(model), workers=3).run()
+    assert result.status == 'unsolvable' and result.plan is None
+    assert result.stats.expanded >= 22  # All reachable states, some of them possibly more than once
+
+    result = HDAStar(model, BlindHeuristic(model), workers=2, batch_size=1, max_expansions=5).run()
+    assert result.status == 'expansion limit' and result.stats.expanded < 22
+
+
+def test_hda_star_failures():
+    problem = generate_strips_blocksworld_problem(nblocks=3)
+    lifted = LiftedForwardSearchModel(problem)
+    with pytest.raises(RuntimeError):
+        HDAStar(lifted, BlindHeuristic(lifted))
+
+    def failing_heuristic(state):
+        raise ValueError(state)
+
+    # The search is aborted, rather than waiting forever for the workers that have died
+    model = ForwardSearchModel(problem)
+    with pytest.raises(RuntimeError, match='terminated unexpectedly'):
+        HDAStar(model, failing_heuristic, workers=2).run()
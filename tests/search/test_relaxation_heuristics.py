@@ -0,0 +1,74 @@
+"""
+ Tests for the delete-relaxation heuristics
+"""
+import numpy as np
+
+from tarski.benchmarks.blocksworld import generate_strips_blocksworld_problem
+from tarski.search import ForwardSearchModel, AStar, GreedyBestFirstSearch, BlindHeuristic, HMaxHeuristic, \
+    HAddHeuristic, FFHeuristic, DEAD_END
+from tarski.search.applicability import is_applicable
+from tarski.search.packed import create_state_layout
+
+from .test_heuristic_search import assert_valid_plan
+
+
+def reference_costs(task, atoms, combine):
+    """ The h_max or h_add costs of all atoms, computed by a naive fixpoint iteration """
+    cost = [DEAD_END] * task.num_atoms
+    for atom in atoms:
+        cost[atom] = 0
+    changed = True
+    while changed:
+        changed = False
+        for u, pre in enumerate(task.preconditions):
+            value = task.cost[u] + combine([cost[p] for p in pre] or [0])
+            effect = task.effect[u]
+            if value < cost[effect]:
+                cost[effect], changed = value, True
+    return cost
+
+
+def test_relaxation_heuristics_match_reference():
+    problem = generate_strips_blocksworld_problem(nblocks=4)
+    model = ForwardSearchModel(problem)
+    hmax, hadd, hff = HMaxHeuristic(model), HAddHeuristic(model), FFHeuristic(model)
+    task = hadd.task
+
+    states = [problem.init] + [s for _, s in model.successors(problem.init)]
+    for state in states:
+        atoms = task.state_atoms(state).tolist()
+        for heuristic, combine in ((hmax, max), (hadd, sum)):
+            expected = reference_costs(task, atoms, combine)
+            goal_costs = [expected[g] for g in task.goals]
+            assert heuristic(state) == combine(goal_costs or [0])
+            cost, _ = task.explore(np.array(atoms, dtype=np.int64), heuristic.additive)
+            assert all(cost[g] == expected[g] for g in task.goals)
+
+        assert hmax(state) <= hff(state) <= hadd(state)
+        assert (hff(state) == 0) == model.is_goal(state)
+        assert all(is_applicable(state, op) for op in hff.preferred_operators())
+        assert hff.preferred_operators() or model.is_goal(state)
+
+    # Packed states are evaluated as the corresponding models
+    layout = create_state_layout(problem)
+    assert all(hff(layout.pack(state)) == hff(state) and hadd(layout.pack(state)) == hadd(state) for state in states)
+
+
+def test_search_with_relaxation_heuristics():
+    problem = generate_strips_blocksworld_problem(nblocks=5)
+    model = ForwardSearchModel(problem)
+
+    optimal = AStar(model, HMaxHeuristic(model)).run()
+    assert_valid_plan(model, optimal)
+    assert optimal.cost == AStar(model, BlindHeuristic(model)).run().cost
+
+    for heuristic in (HAddHeuristic(model), FFHeuristic(model)):
+        assert_valid_plan(model, GreedyBestFirstSearch(model, heuristic, lazy=True).run())
+
+
+def test_relaxation_heuristics_detect_dead_ends():
+    problem = generate_strips_blocksworld_problem(nblocks=3)
+    on, b1 = problem.language.get('on', 'b1')
+    problem.goal = on(b1, b1)
+    model = ForwardSearchModel(problem)
+    assert all(H(model)(problem.init) == DEAD_END for H in (HMaxHeuristic, HAddHeuristic, FFHeuristic))
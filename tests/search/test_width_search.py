@@ -0,0 +1,81 @@
+"""
+ Tests for the novelty tables and the width-based search engines
+"""
+import itertools
+import random
+
+from tarski.benchmarks.blocksworld import generate_strips_blocksworld_problem
+from tarski.search import ForwardSearchModel, IteratedWidthSearch, SerializedIteratedWidthSearch, BestFirstWidthSearch
+from tarski.search.novelty import PairNoveltyTable, NoveltyTable
+from tarski.search.packed import create_state_layout
+
+from .test_heuristic_search import assert_valid_plan
+
+
+class PackedForwardSearchModel(ForwardSearchModel):
+    def __init__(self, problem):
+        super().__init__(problem)
+        self.layout = create_state_layout(problem)
+
+    def init(self):
+        return self.layout.pack(self.problem.init)
+
+
+def test_pair_novelty_table_on_many_atoms():
+    num_atoms, rng = 100000, random.Random(12)
+    table, seen = PairNoveltyTable(num_atoms, capacity=64), set()
+    for _ in range(200):
+        atoms = rng.sample(range(num_atoms), 40) if rng.random() < 0.5 else rng.sample(range(60), 10)
+        pairs = {(min(p, q), max(p, q)) for p, q in itertools.combinations_with_replacement(atoms, 2)}
+        assert table.update(sum(1 << a for a in atoms)) == (not pairs <= seen)
+        seen.update(pairs)
+    assert len(table) == len(seen)
+    assert len(table.table) < 4 * len(seen)
+
+
+def test_novelty_of_states():
+    table = NoveltyTable(10, width=2)
+    assert table.evaluate(0b0011) == 1
+    assert table.evaluate(0b0110) == 1
+    assert table.evaluate(0b0101) == 2  # Atoms 0 and 2 have been seen, but not together
+    assert table.evaluate(0b0111) == 3
+    assert NoveltyTable(10, width=1).evaluate(0) == 2
+
+
+def test_iterated_width_on_atomic_goals():
+    problem = generate_strips_blocksworld_problem(nblocks=4)
+    on, holding = problem.language.get('on', 'holding')
+    blocks = [problem.language.get(f'b{i}') for i in range(1, 5)]
+
+    num_atoms = create_state_layout(problem).num_atoms
+    goals = [holding(b) for b in blocks] + [on(b1, b2) for b1, b2 in itertools.permutations(blocks, 2)]
+    for goal in goals:
+        problem.goal = goal
+        model = ForwardSearchModel(problem)
+        result = IteratedWidthSearch(model, width=1).run()
+        assert result.stats.expanded <= num_atoms + 1  # Each expanded state but the root makes some atom true
+        if result.solved:
+            assert_valid_plan(model, result)
+        assert_valid_plan(model, IteratedWidthSearch(model, width=2).run())
+
+    problem.goal = on(blocks[0], blocks[0])
+    result = IteratedWidthSearch(ForwardSearchModel(problem), width=2).run()
+    assert result.status == 'failed' and result.stats.pruned > 0
+
+
+def test_serialized_and_best_first_width_search():
+    for nblocks in (3, 5):
+        problem = generate_strips_blocksworld_problem(nblocks=nblocks)
+        for model in (ForwardSearchModel(problem), PackedForwardSearchModel(problem)):
+            # SIW is incomplete, and might fail to achieve some goal of the (random) instance
+            result = SerializedIteratedWidthSearch(model).run()
+            assert result.status in ('solved', 'failed')
+            if result.solved:
+                assert_valid_plan(model, result)
+            assert_valid_plan(model, BestFirstWidthSearch(model).run())
+
+    problem = generate_strips_blocksworld_problem(nblocks=3)
+    on, b1 = problem.language.get('on', 'b1')
+    problem.goal = on(b1, b1)
+    result = BestFirstWidthSearch(ForwardSearchModel(problem)).run()
+    assert result.status == 'unsolvable' and result.stats.expanded == 22
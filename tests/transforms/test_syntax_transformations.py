@@ -10,7 +10,9 @@ from tarski.syntax.transform.prenex import to_prenex_negation_normal_form
 from tarski.syntax.transform import CNFTransformation, QuantifierElimination, remove_quantifiers, \
     QuantifierEliminationMode
 from tarski.syntax.transform import NegatedBuiltinAbsorption
-from tarski.syntax.transform.errors import TransformationError
+from tarski.syntax.transform.errors import TransformationError, SubstitutionError
+from tarski.syntax.transform.templates import ExpressionTemplate, SchemaTemplate
+from tarski.syntax.transform.action_grounding import ground_schema, ground_schema_into_plain_operator_from_grounding
 
 
 def test_nnf_conjunction():
@@ -207,3 +209,45 @@ def test_cnf_conversion_complex():
     result = remove_quantifiers(lang, to_prenex_negation_normal_form(lang, phi), QuantifierEliminationMode.All)
     transf = CNFTransformation.rewrite(lang, result)
     assert len(transf.clauses) == 126
+
+
+def test_expression_templates():
+    problem = tarski.benchmarks.blocksworld.generate_strips_blocksworld_problem()
+    lang = problem.language
+    b1, b2, on, clear, handempty = lang.get('b1', 'b2', 'on', 'clear', 'handempty')
+    x, y, z = lang.variable('x', 'object'), lang.variable('y', 'object'), lang.variable('z', 'object')
+
+    static = handempty()
+    phi = land(on(x, y), static, exists(z, on(z, x)), flat=True)
+    template = ExpressionTemplate(phi, [x, y])
+    result = template.instantiate([b1, b2])
+    expected = term_substitution(phi, {symref(x): b1, symref(y): b2}, inplace=False)
+    assert str(result) == str(expected) == '(on(b1,b2) and handempty() and exists z : (on(z,b1)))'
+    assert str(phi) == '(on(x,y) and handempty() and exists z : (on(z,x)))'  # The template is left untouched
+    # Subformulas without the template variables are copied too, and only leaves are shared
+    assert result.subformulas[1] is not static and str(result.subformulas[1]) == str(static)
+
+    assert ExpressionTemplate(clear(b1), [x]).instantiate([b2]) is not None
+    with pytest.raises(SubstitutionError):
+        ExpressionTemplate(exists(z, on(z, x)), [z])
+
+    for action in problem.actions.values():
+        values = [b1, b2, b1][:len(action.parameters)]
+        precondition, effects = SchemaTemplate(action).instantiate(values)
+        substitution = create_substitution(action.parameters, values)
+        assert str(precondition) == str(term_substitution(action.precondition, substitution))
+        assert [str(eff) for eff in effects] == [str(term_substitution(eff, substitution)) for eff in action.effects]
+
+
+def test_ground_schemas_do_not_share_expressions_with_the_schema():
+    problem = tarski.benchmarks.blocksworld.generate_strips_blocksworld_problem()
+    b1, clear = problem.language.get('b1', 'clear')
+    pickup = problem.get_action('pick-up')
+    precondition, effects = str(pickup.precondition), [str(eff) for eff in pickup.effects]
+
+    for ground in (ground_schema(pickup, ['b1']), ground_schema_into_plain_operator_from_grounding(pickup, ['b1'])):
+        for eff in ground.effects:
+            eff.condition = ~clear(b1)
+            eff.atom.subterms = [b1]
+        ground.precondition.subformulas = [clear(b1)]
+    assert str(pickup.precondition) == precondition and [str(eff) for eff in pickup.effects] == effects